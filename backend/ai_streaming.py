@@ -0,0 +1,44 @@
+"""
+Server-sent events for LearnHub's AI endpoints
+Each text chunk from `LlmChat.stream_message` is sent as `data: {"delta": ...}`,
+followed by an `event: done` (or `event: error`) message. When the client
+disconnects, Starlette cancels the response, which closes the generator and,
+with it, the upstream provider stream, so we stop paying for unread tokens.
+"""
+
+from typing import Optional
+import json
+import logging
+
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Stop nginx from buffering the stream
+}
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def stream_chat(request: Request, chat, message) -> StreamingResponse:
+    async def events():
+        chunks = chat.stream_message(message)
+        try:
+            async for text in chunks:
+                if await request.is_disconnected():
+                    return
+                yield sse_event({"delta": text})
+            yield sse_event({}, "done")
+        except Exception as e:
+            logger.error(f"AI stream failed: {e}")
+            yield sse_event({"detail": "AI service temporarily unavailable"}, "error")
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
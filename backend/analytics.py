@@ -0,0 +1,189 @@
+"""
+Admin analytics for LearnHub
+Totals are computed with $group pipelines inside MongoDB, and time series
+are served from a `daily_rollups` collection that is incremented as
+payments, enrollments and signups happen.
+"""
+
+from datetime import datetime, timezone, timedelta, date
+from typing import Optional
+from pymongo import UpdateOne
+import logging
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("day", "week", "month")
+METRICS = ("revenue", "enrollments", "signups")
+MAX_RANGE_DAYS = 366 * 3
+
+# Rollup scopes: one row per (scope, scope_id, date)
+PLATFORM = "platform"
+COURSE = "course"
+INSTRUCTOR = "instructor"
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _rollup_update(day: str, scope: str, scope_id: Optional[str], **incs) -> UpdateOne:
+    return UpdateOne(
+        {"scope": scope, "scope_id": scope_id, "date": day},
+        {"$inc": incs},
+        upsert=True
+    )
+
+
+async def record_enrollment(db, course: dict, amount: float = 0.0):
+    """Count an enrollment (and its revenue) on the platform, course and instructor rollups"""
+    await _record_course_rollups(db, course, enrollments=1, revenue=float(amount or 0))
+
+
+async def record_revenue(db, course: dict, amount: float):
+    """Revenue from a payment that didn't create an enrollment (the buyer was already enrolled)"""
+    await _record_course_rollups(db, course, revenue=float(amount or 0))
+
+
+async def _record_course_rollups(db, course: dict, **incs):
+    day = _today()
+    operations = [
+        _rollup_update(day, PLATFORM, None, **incs),
+        _rollup_update(day, COURSE, course['id'], **incs),
+    ]
+    if course.get('instructor_id'):
+        operations.append(_rollup_update(day, INSTRUCTOR, course['instructor_id'], **incs))
+    try:
+        await db.daily_rollups.bulk_write(operations, ordered=False)
+    except Exception as e:
+        # Rollups are derived data; a rebuild will repair any gap
+        logger.error(f"Failed to update rollups for course {course.get('id')}: {e}")
+
+
+async def record_signup(db):
+    try:
+        await db.daily_rollups.bulk_write([_rollup_update(_today(), PLATFORM, None, signups=1)])
+    except Exception as e:
+        logger.error(f"Failed to update signup rollup: {e}")
+
+
+async def totals(db) -> dict:
+    """Platform totals without loading payment documents into Python"""
+    rows = await db.payments.aggregate([
+        {"$match": {"payment_status": "paid"}},
+        {"$group": {"_id": None, "revenue": {"$sum": "$amount"}, "count": {"$sum": 1}}}
+    ]).to_list(1)
+    revenue = rows[0]['revenue'] if rows else 0.0
+    return {
+        "total_users": await db.users.estimated_document_count(),
+        "total_courses": await db.courses.count_documents({"status": "published"}),
+        "total_enrollments": await db.enrollments.estimated_document_count(),
+        "total_revenue": revenue,
+        "paid_payments": rows[0]['count'] if rows else 0,
+    }
+
+
+def _period_key(day: date, granularity: str) -> str:
+    if granularity == "week":
+        return (day - timedelta(days=day.weekday())).isoformat()  # ISO week's Monday
+    if granularity == "month":
+        return day.isoformat()[:7]
+    return day.isoformat()
+
+
+async def timeseries(db, start: date, end: date, granularity: str = "day",
+                     scope: str = PLATFORM, scope_id: Optional[str] = None) -> list:
+    """Bucketed metrics for [start, end], read only from daily_rollups"""
+    buckets = {}
+    day = start
+    while day <= end:
+        buckets.setdefault(_period_key(day, granularity), {m: 0 for m in METRICS})
+        day += timedelta(days=1)
+
+    cursor = db.daily_rollups.find({
+        "scope": scope,
+        "scope_id": scope_id,
+        "date": {"$gte": start.isoformat(), "$lte": end.isoformat()}
+    }, {"_id": 0})
+    async for row in cursor:
+        bucket = buckets[_period_key(date.fromisoformat(row['date']), granularity)]
+        for metric in METRICS:
+            bucket[metric] += row.get(metric, 0)
+
+    return [{"period": period, **values} for period, values in buckets.items()]
+
+
+async def _grouped_by_day(collection, match: dict, date_field: str, group_key: Optional[str], value: Optional[str] = None):
+    """[(scope_id, day, count, value_sum)] grouped on the first 10 chars of an ISO date"""
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "scope_id": f"${group_key}" if group_key else None,
+                "date": {"$substrBytes": [date_field, 0, 10]},
+            },
+            "count": {"$sum": 1},
+            "value": {"$sum": f"${value}" if value else 0},
+        }},
+    ]
+    return [
+        (row['_id']['scope_id'], row['_id']['date'], row['count'], row['value'])
+        async for row in collection.aggregate(pipeline)
+    ]
+
+
+async def rebuild_rollups(db) -> int:
+    """Recompute rollups from payments, enrollments and users.
+    Only days that ended before the rebuild started are rewritten: live $inc
+    updates always target today, so they can't race the rebuild's $set, and
+    today's rows are left to them. Rows are replaced in place, never wiped, so
+    the timeseries stays readable while this runs."""
+    cutoff = _today()
+    stamp = datetime.now(timezone.utc).isoformat()
+    rollups = {}
+
+    def add(scope, scope_id, day, **values):
+        if day >= cutoff:
+            return
+        row = rollups.setdefault((scope, scope_id, day), {m: 0 for m in METRICS})
+        for metric, amount in values.items():
+            row[metric] += amount
+
+    # Course -> instructor for attributing course rows
+    instructor_of = {
+        c['id']: c.get('instructor_id')
+        async for c in db.courses.find({}, {"_id": 0, "id": 1, "instructor_id": 1})
+    }
+
+    paid_date = {"$ifNull": ["$paid_at", "$created_at"]}
+    for course_id, day, _, revenue in await _grouped_by_day(
+            db.payments, {"payment_status": "paid"}, paid_date, "course_id", "amount"):
+        add(PLATFORM, None, day, revenue=revenue)
+        add(COURSE, course_id, day, revenue=revenue)
+        if instructor_of.get(course_id):
+            add(INSTRUCTOR, instructor_of[course_id], day, revenue=revenue)
+
+    for course_id, day, count, _ in await _grouped_by_day(
+            db.enrollments, {"enrolled_at": {"$type": "string"}}, "$enrolled_at", "course_id"):
+        add(PLATFORM, None, day, enrollments=count)
+        add(COURSE, course_id, day, enrollments=count)
+        if instructor_of.get(course_id):
+            add(INSTRUCTOR, instructor_of[course_id], day, enrollments=count)
+
+    for _, day, count, _ in await _grouped_by_day(db.users, {"created_at": {"$type": "string"}}, "$created_at", None):
+        add(PLATFORM, None, day, signups=count)
+
+    operations = [
+        UpdateOne(
+            {"scope": scope, "scope_id": scope_id, "date": day},
+            {"$set": {**values, "rebuilt_at": stamp}},
+            upsert=True
+        )
+        for (scope, scope_id, day), values in rollups.items()
+    ]
+    for i in range(0, len(operations), 1000):
+        await db.daily_rollups.bulk_write(operations[i:i + 1000], ordered=False)
+    # Closed-day rows with no source data any more (e.g. deleted courses)
+    await db.daily_rollups.delete_many({"date": {"$lt": cutoff}, "rebuilt_at": {"$ne": stamp}})
+
+    logger.info(f"Rebuilt {len(operations)} daily rollups")
+    return len(operations)
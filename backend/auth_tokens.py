@@ -0,0 +1,100 @@
+"""
+Self-contained access-token claims for LearnHub
+Access tokens carry the identity fields request handlers authorize on, plus a
+per-user `token_version`. Bumping a user's version revokes every token issued
+before it; each worker holds the current versions in memory and refreshes
+them from Mongo on an interval, so no request needs a user lookup.
+"""
+
+from typing import Dict, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Compact claim names
+VERSION_CLAIM = "tv"
+NAME_CLAIM = "name"
+EMAIL_CLAIM = "email"
+ROLE_CLAIM = "role"
+ACTIVE_CLAIM = "act"
+
+
+def identity_claims(user_doc: dict) -> dict:
+    """Claims for a user document (or User.model_dump())"""
+    return {
+        "sub": user_doc["id"],
+        NAME_CLAIM: user_doc.get("name"),
+        EMAIL_CLAIM: user_doc.get("email"),
+        ROLE_CLAIM: user_doc.get("role", "student"),
+        ACTIVE_CLAIM: user_doc.get("is_active", True),
+        VERSION_CLAIM: user_doc.get("token_version", 0),
+    }
+
+
+def user_fields(payload: dict) -> dict:
+    """User model fields recoverable from a versioned token"""
+    return {
+        "id": payload["sub"],
+        "name": payload.get(NAME_CLAIM),
+        "email": payload.get(EMAIL_CLAIM),
+        "role": payload.get(ROLE_CLAIM, "student"),
+        "is_active": payload.get(ACTIVE_CLAIM, True),
+    }
+
+
+class TokenVersions:
+    """user id -> current token_version; users never bumped are at 0 and not stored"""
+
+    def __init__(self, refresh_interval: float = 30):
+        self.refresh_interval = refresh_interval
+        self._versions: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def current(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def observe(self, user_id: str, version: int):
+        """Record a version read from Mongo ahead of the next refresh"""
+        if version > self.current(user_id):
+            self._versions[user_id] = version
+
+    async def refresh(self, db):
+        versions = {}
+        async for doc in db.users.find(
+                {"token_version": {"$gt": 0}}, {"_id": 0, "id": 1, "token_version": 1}):
+            versions[doc["id"]] = doc["token_version"]
+        # Versions only grow; merging keeps a bump() made while the scan ran
+        for user_id, version in self._versions.items():
+            if version > versions.get(user_id, 0):
+                versions[user_id] = version
+        self._versions = versions
+
+    async def bump(self, db, user_id: str) -> int:
+        """Revoke all of a user's outstanding tokens; returns the new version"""
+        doc = await db.users.find_one_and_update(
+            {"id": user_id},
+            {"$inc": {"token_version": 1}},
+            projection={"_id": 0, "token_version": 1},
+            return_document=True
+        )
+        version = doc["token_version"] if doc else self.current(user_id) + 1
+        self._versions[user_id] = version
+        return version
+
+    async def _refresh_forever(self, db):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                logger.error(f"Token version refresh failed: {e}")
+
+    async def start(self, db):
+        await self.refresh(db)
+        self._task = asyncio.create_task(self._refresh_forever(db))
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
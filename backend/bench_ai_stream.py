@@ -0,0 +1,145 @@
+"""
+AI Streaming Benchmark for LearnHub Backend
+===========================================
+Starts fake_llm.py on a local port and asks the same question concurrently
+through LlmChat.send_message (the old /ai/tutor path) and through
+LlmChat.stream_message (what /ai/tutor/stream serves). Reports time to first
+visible text and total time. It then streams through ai_streaming over a real
+HTTP connection, disconnects after a few events and checks that the upstream
+stream was cancelled instead of running to completion.
+
+Usage:
+    python bench_ai_stream.py [requests] [first_token_ms] [token_ms]
+
+Runs entirely offline.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def pct(samples, p) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+
+async def timed_send(chat, message):
+    started = time.perf_counter()
+    await chat.send_message(message)
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+async def timed_stream(chat, message):
+    started = time.perf_counter()
+    first = None
+    async for _ in chat.stream_message(message):
+        if first is None:
+            first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+async def compare(count: int):
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+    def chat():
+        return LlmChat(api_key="fake", system_message="You are a tutor").with_model("groq", "llama-70b")
+
+    message = UserMessage(text="Explain recursion")
+    rows = {}
+    for label, run in (("send_message (old)", timed_send), ("stream_message (new)", timed_stream)):
+        results = await asyncio.gather(*(run(chat(), message) for _ in range(count)))
+        rows[label] = ([r[0] for r in results], [r[1] for r in results])
+    return rows
+
+
+async def check_cancellation(llm_base: str, read_events: int) -> dict:
+    import ai_streaming
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+    app = FastAPI()
+
+    @app.post("/stream")
+    async def stream(request: Request):
+        # Its own key, so the registry builds a client on this server's event loop
+        chat = LlmChat(api_key="fake-server").with_model("groq", "llama-70b")
+        return ai_streaming.stream_chat(request, chat, UserMessage(text="Explain recursion"))
+
+    port = free_port()
+    server = serve(app, port)
+    async with httpx.AsyncClient() as client:
+        before = (await client.get(f"{llm_base}/stats")).json()
+        received = 0
+        async with client.stream("POST", f"http://127.0.0.1:{port}/stream") as response:
+            content_type = response.headers["content-type"]
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    received += 1
+                    if received == read_events:
+                        break
+        # Give both servers a moment to notice the closed connections
+        await asyncio.sleep(1)
+        after = (await client.get(f"{llm_base}/stats")).json()
+    server.should_exit = True
+    return {
+        "content_type": content_type,
+        "events_read": received,
+        "cancelled": after["cancelled"] - before["cancelled"],
+        "completed": after["completed"] - before["completed"],
+        "tokens_sent": after["tokens_sent"] - before["tokens_sent"],
+    }
+
+
+async def main(count: int, llm_base: str):
+    rows = await compare(count)
+    cancel = await check_cancellation(llm_base, read_events=5)
+
+    print("\n" + "=" * 70)
+    print(f"{count} concurrent questions, first token {os.environ['FAKE_LLM_FIRST_TOKEN_MS']} ms, "
+          f"{os.environ['FAKE_LLM_TOKEN_MS']} ms/token, {os.environ['FAKE_LLM_TOKENS']} tokens")
+    print("-" * 70)
+    print(f"{'':22} {'first text p50':>15} {'p95':>8} {'total p50':>11} {'p95':>8}  (ms)")
+    for label, (first, total) in rows.items():
+        print(f"{label:22} {pct(first, .5):15.0f} {pct(first, .95):8.0f} "
+              f"{pct(total, .5):11.0f} {pct(total, .95):8.0f}")
+    print("-" * 70)
+    print(f"Disconnect after {cancel['events_read']} events ({cancel['content_type']}): "
+          f"upstream cancelled={cancel['cancelled']} completed={cancel['completed']} "
+          f"tokens generated={cancel['tokens_sent']}/{os.environ['FAKE_LLM_TOKENS']}")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    # fake_llm and the LLM client read these at import time
+    os.environ['FAKE_LLM_FIRST_TOKEN_MS'] = sys.argv[2] if len(sys.argv) > 2 else "400"
+    os.environ['FAKE_LLM_TOKEN_MS'] = sys.argv[3] if len(sys.argv) > 3 else "20"
+    os.environ.setdefault('FAKE_LLM_TOKENS', "120")
+    port = free_port()
+    os.environ['GROQ_BASE_URL'] = f"http://127.0.0.1:{port}/v1"
+    import fake_llm
+    llm = serve(fake_llm.app, port)
+    asyncio.run(main(requests, f"http://127.0.0.1:{port}"))
+    llm.should_exit = True
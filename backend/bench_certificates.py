@@ -0,0 +1,76 @@
+"""
+Certificate Rendering Benchmark for LearnHub Backend
+====================================================
+Renders a burst of distinct certificates through CertificateRenderer with
+rendering inline on the event loop (workers=0, the old behaviour) and with
+process pools of 1, 2, 4 and 8 warm workers. Reports certificates per second
+and how late a 10 ms heartbeat on the same loop ran, i.e. how long other
+requests would have stalled.
+
+Usage:
+    python bench_certificates.py [certificates] [worker counts...]
+
+Speed-up flattens out once workers exceed the machine's cores.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from certificate_render import CertificateRenderer
+
+HEARTBEAT = 0.01
+
+
+async def run(workers: int, count: int) -> dict:
+    renderer = CertificateRenderer(workers)
+    renderer.start()
+    await renderer.warm()
+
+    done = asyncio.Event()
+    worst_lag = 0.0
+
+    async def heartbeat():
+        nonlocal worst_lag
+        while not done.is_set():
+            due = time.perf_counter() + HEARTBEAT
+            await asyncio.sleep(HEARTBEAT)
+            worst_lag = max(worst_lag, time.perf_counter() - due)
+
+    beat = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        renderer.render(
+            user_name=f"Student {i}",
+            course_title="Introduction to Distributed Systems",
+            completion_date="October 17, 2026",
+            certificate_id=f"bench-{i}"
+        )
+        for i in range(count)
+    ))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await beat
+    renderer.shutdown()
+    return {"rate": count / elapsed, "elapsed": elapsed, "lag_ms": worst_lag * 1000}
+
+
+async def main(count: int, worker_counts):
+    results = [(w, await run(w, count)) for w in worker_counts]
+    baseline = results[0][1]["rate"]
+
+    print("\n" + "=" * 60)
+    print(f"{count} certificates, {os.cpu_count()} CPU cores")
+    print("-" * 60)
+    print(f"{'workers':>10} {'certs/s':>10} {'speed-up':>10} {'worst loop lag ms':>20}")
+    for workers, r in results:
+        label = "inline" if workers == 0 else str(workers)
+        print(f"{label:>10} {r['rate']:10.1f} {r['rate'] / baseline:9.2f}x {r['lag_ms']:20.1f}")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    counts = [int(a) for a in sys.argv[2:]] or [0, 1, 2, 4, 8]
+    asyncio.run(main(total, counts))
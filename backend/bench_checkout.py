@@ -0,0 +1,120 @@
+"""
+Checkout Throughput Benchmark for LearnHub Backend
+==================================================
+Starts fake_stripe.py on a local port and creates a burst of checkout
+sessions concurrently, first with the synchronous stripe SDK called from
+async code (the old StripeCheckout) and then with the pooled
+StripeHTTPClient. Reports sessions per second and the worst event-loop lag.
+
+Usage:
+    python bench_checkout.py [sessions] [fake_latency_ms]
+
+Runs entirely offline.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+import stripe
+import uvicorn
+
+from emergentintegrations.payments.stripe.checkout import (
+    CheckoutSessionRequest, StripeCheckout, StripeHTTPClient
+)
+
+API_KEY = "sk_test_bench"
+HEARTBEAT = 0.01
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_stripe(port: int) -> uvicorn.Server:
+    import fake_stripe
+    server = uvicorn.Server(uvicorn.Config(fake_stripe.app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def checkout_request(i: int) -> CheckoutSessionRequest:
+    return CheckoutSessionRequest(
+        amount=49.99,
+        currency="usd",
+        success_url="http://localhost:3000/payment/success?session_id={CHECKOUT_SESSION_ID}",
+        cancel_url="http://localhost:3000/payment/cancel",
+        metadata={"user_id": f"user-{i}", "course_id": "course-bench"}
+    )
+
+
+async def sdk_checkout(i: int):
+    """What the old StripeCheckout did: a blocking SDK call inside a coroutine"""
+    request = checkout_request(i)
+    stripe.checkout.Session.create(
+        payment_method_types=["card"],
+        line_items=[{"price_data": {"currency": request.currency, "unit_amount": int(request.amount * 100),
+                                    "product_data": {"name": "Course Purchase"}}, "quantity": 1}],
+        mode="payment",
+        success_url=request.success_url,
+        cancel_url=request.cancel_url,
+        metadata=request.metadata,
+    )
+
+
+async def measure(make_call, count: int) -> dict:
+    done = asyncio.Event()
+    worst_lag = 0.0
+
+    async def heartbeat():
+        nonlocal worst_lag
+        while not done.is_set():
+            due = time.perf_counter() + HEARTBEAT
+            await asyncio.sleep(HEARTBEAT)
+            worst_lag = max(worst_lag, time.perf_counter() - due)
+
+    beat = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    await asyncio.gather(*(make_call(i) for i in range(count)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await beat
+    return {"rate": count / elapsed, "elapsed": elapsed, "lag_ms": worst_lag * 1000}
+
+
+async def main(count: int):
+    port = free_port()
+    server = start_fake_stripe(port)
+    base = f"http://127.0.0.1:{port}"
+
+    stripe.api_key = API_KEY
+    stripe.api_base = base
+    old = await measure(sdk_checkout, count)
+
+    client = StripeHTTPClient(api_base=base)
+    checkout = StripeCheckout(api_key=API_KEY, client=client)
+    new = await measure(lambda i: checkout.create_checkout_session(checkout_request(i)), count)
+    await client.aclose()
+    server.should_exit = True
+
+    print("\n" + "=" * 64)
+    print(f"{count} checkout sessions, fake Stripe latency {os.environ['FAKE_STRIPE_LATENCY_MS']} ms")
+    print("-" * 64)
+    print(f"{'':22} {'sessions/s':>11} {'total s':>9} {'worst loop lag ms':>19}")
+    for label, r in (("sync SDK (old)", old), ("pooled httpx (new)", new)):
+        print(f"{label:22} {r['rate']:11.1f} {r['elapsed']:9.2f} {r['lag_ms']:19.1f}")
+    print("=" * 64 + "\n")
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    # fake_stripe reads its latency at import time
+    os.environ['FAKE_STRIPE_LATENCY_MS'] = sys.argv[2] if len(sys.argv) > 2 else "80"
+    asyncio.run(main(sessions))
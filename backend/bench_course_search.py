@@ -0,0 +1,116 @@
+"""
+Course Search Benchmark for LearnHub Backend
+===========================================
+Compares p50/p95 latency of the old case-insensitive $regex search with the
+weighted text-index search on a scratch database of synthetic courses.
+
+Usage:
+    python bench_course_search.py [num_courses] [num_queries]
+
+Uses MONGO_URL from .env and a throwaway database (BENCH_DB_NAME, default
+learnhub_bench) that is dropped at the end.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+import db_indexes
+
+load_dotenv('.env')
+
+WORDS = (
+    "python javascript react design marketing finance data science machine learning "
+    "photography writing business excel cloud security networking guitar drawing "
+    "cooking fitness yoga spanish french leadership productivity sql docker kubernetes "
+    "statistics algebra calculus physics chemistry biology history music piano"
+).split()
+CATEGORIES = ["Development", "Business", "Design", "Marketing", "Music", "Health"]
+
+
+def synthetic_course(i: int) -> dict:
+    title_words = random.sample(WORDS, 3)
+    return {
+        "id": str(uuid.uuid4()),
+        "instructor_id": str(uuid.uuid4()),
+        "title": f"{' '.join(w.title() for w in title_words)} Course {i}",
+        "description": " ".join(random.choices(WORDS, k=60)),
+        "meta_keywords": ", ".join(random.sample(WORDS, 4)),
+        "category": random.choice(CATEGORIES),
+        "price": round(random.uniform(0, 200), 2),
+        "status": "published",
+        "language": random.choice(["English", "Urdu", "Spanish"]),
+        "created_at": f"2025-01-01T00:00:{i % 60:02d}+00:00",
+    }
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def time_queries(run_query, terms):
+    samples = []
+    for term in terms:
+        started = time.perf_counter()
+        await run_query(term)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def main(num_courses: int, num_queries: int):
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[os.environ.get('BENCH_DB_NAME', 'learnhub_bench')]
+    await db.courses.drop()
+
+    print(f"Seeding {num_courses} synthetic courses...")
+    batch = []
+    for i in range(num_courses):
+        batch.append(synthetic_course(i))
+        if len(batch) == 5000:
+            await db.courses.insert_many(batch)
+            batch = []
+    if batch:
+        await db.courses.insert_many(batch)
+    await db.courses.create_indexes(db_indexes.INDEXES["courses"])
+
+    terms = [random.choice(WORDS) for _ in range(num_queries)]
+
+    async def regex_search(term):
+        await db.courses.find({
+            "status": "published",
+            "$or": [
+                {"title": {"$regex": term, "$options": "i"}},
+                {"description": {"$regex": term, "$options": "i"}},
+            ],
+        }, {"_id": 0}).limit(20).to_list(20)
+
+    async def text_search(term):
+        await db.courses.find(
+            {"status": "published", "$text": {"$search": term}},
+            {"_id": 0, "score": {"$meta": "textScore"}},
+        ).sort([("score", {"$meta": "textScore"}), ("id", 1)]).limit(20).to_list(20)
+
+    # Warm up caches so both paths are measured hot
+    await regex_search("python")
+    await text_search("python")
+
+    print("\n" + "=" * 60)
+    for name, run in (("$regex (old)", regex_search), ("$text (new)", text_search)):
+        samples = await time_queries(run, terms)
+        print(f"{name:14} p50={percentile(samples, 50):8.2f} ms  p95={percentile(samples, 95):8.2f} ms")
+    print("=" * 60 + "\n")
+
+    await client.drop_database(db.name)
+    client.close()
+
+
+if __name__ == "__main__":
+    courses = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(main(courses, queries))
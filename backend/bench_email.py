@@ -0,0 +1,103 @@
+"""
+Email Throughput Benchmark for LearnHub Backend
+===============================================
+Starts email_sink.py on a local port and sends a burst of single-recipient
+emails, first with a new SendGridAPIClient and a blocking .send() per message
+(the old path) and then through the pooled EmailTransport. Reports emails
+per second, worst event-loop lag, and retries when the sink throttles.
+
+Usage:
+    python bench_email.py [emails] [sink_latency_ms] [sink_fail_rate]
+
+Runs entirely offline.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+import uvicorn
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail
+
+from email_transport import EmailTransport
+
+API_KEY = "SG.bench"
+SENDER = "bench@learnhub.local"
+HTML = "<p>" + "Lorem ipsum dolor sit amet. " * 200 + "</p>"
+HEARTBEAT = 0.01
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_sink(port: int) -> uvicorn.Server:
+    import email_sink
+    server = uvicorn.Server(uvicorn.Config(email_sink.app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def measure(make_call, count: int) -> dict:
+    done = asyncio.Event()
+    worst_lag = 0.0
+
+    async def heartbeat():
+        nonlocal worst_lag
+        while not done.is_set():
+            due = time.perf_counter() + HEARTBEAT
+            await asyncio.sleep(HEARTBEAT)
+            worst_lag = max(worst_lag, time.perf_counter() - due)
+
+    beat = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    results = await asyncio.gather(*(make_call(i) for i in range(count)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    done.set()
+    await beat
+    failures = sum(1 for r in results if isinstance(r, Exception))
+    return {"rate": (count - failures) / elapsed, "lag_ms": worst_lag * 1000, "failures": failures}
+
+
+async def main(count: int):
+    port = free_port()
+    server = start_sink(port)
+    base = f"http://127.0.0.1:{port}"
+
+    async def sdk_send(i: int):
+        # What send_email did: new client, blocking send, inside a coroutine
+        message = Mail(from_email=SENDER, to_emails=f"student{i}@example.com", subject="Bench", html_content=HTML)
+        SendGridAPIClient(API_KEY, host=base).send(message)
+
+    old = await measure(sdk_send, count)
+
+    transport = EmailTransport(API_KEY, api_base=base, backoff_base=0.05)
+    new = await measure(lambda i: transport.send(f"student{i}@example.com", "Bench", HTML, SENDER), count)
+    await transport.aclose()
+    server.should_exit = True
+
+    print("\n" + "=" * 68)
+    print(f"{count} emails, sink latency {os.environ['EMAIL_SINK_LATENCY_MS']} ms, "
+          f"fail rate {os.environ['EMAIL_SINK_FAIL_RATE']}")
+    print("-" * 68)
+    print(f"{'':24} {'emails/s':>9} {'failed':>7} {'worst loop lag ms':>19}")
+    for label, r in (("SendGrid SDK (old)", old), ("EmailTransport (new)", new)):
+        print(f"{label:24} {r['rate']:9.1f} {r['failures']:7} {r['lag_ms']:19.1f}")
+    print(f"EmailTransport retries: {transport.retries}")
+    print("=" * 68 + "\n")
+
+
+if __name__ == "__main__":
+    emails = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    # email_sink reads these at import time
+    os.environ['EMAIL_SINK_LATENCY_MS'] = sys.argv[2] if len(sys.argv) > 2 else "60"
+    os.environ['EMAIL_SINK_FAIL_RATE'] = sys.argv[3] if len(sys.argv) > 3 else "0"
+    asyncio.run(main(emails))
@@ -0,0 +1,120 @@
+"""
+Login Load Benchmark for LearnHub Backend
+=========================================
+Fires a burst of concurrent logins at a minimal app while a second client
+polls an unrelated endpoint, and reports that endpoint's latency percentiles.
+Runs once with bcrypt verified inline on the event loop (the old behaviour)
+and once through the bounded PasswordHasher pool.
+
+Usage:
+    python bench_login.py [concurrent_logins] [bcrypt_rounds] [hash_workers]
+
+Runs in-process over httpx's ASGI transport; no server or database needed.
+Rounds default to 12, passlib's default cost; lower them for a quicker run.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from passlib.context import CryptContext
+
+from password_hashing import HasherSaturated, PasswordHasher
+
+PASSWORD = "correct horse battery staple"
+PING_INTERVAL = 0.005
+
+
+def build_app(context: CryptContext, stored_hash: str, hasher=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if hasher is None:
+            ok = context.verify(PASSWORD, stored_hash)
+        else:
+            try:
+                ok = await hasher.verify(PASSWORD, stored_hash)
+            except HasherSaturated:
+                raise HTTPException(status_code=429, detail="Busy")
+        return {"ok": ok}
+
+    @app.get("/courses")
+    async def courses():
+        return {"courses": []}
+
+    return app
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(app: FastAPI, logins: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        done = asyncio.Event()
+        latencies = []
+
+        async def poll():
+            # Latency is measured from when each request was due, so time spent
+            # waiting for a blocked event loop counts against the endpoint
+            due = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                await client.get("/courses")
+                now = time.perf_counter()
+                latencies.append((now - due) * 1000)
+                due = max(due + PING_INTERVAL, now)
+
+        poller = asyncio.create_task(poll())
+        await asyncio.sleep(0.05)  # Baseline samples before the burst
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.post("/login") for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await poller
+
+    statuses = [r.status_code for r in responses]
+    return {
+        "elapsed": elapsed,
+        "ok": statuses.count(200),
+        "rejected": statuses.count(429),
+        "samples": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+    }
+
+
+async def main(logins: int, rounds: int, workers: int):
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    stored_hash = context.hash(PASSWORD)
+
+    inline = await run(build_app(context, stored_hash), logins)
+    hasher = PasswordHasher(context, workers=workers, max_queue=logins)
+    pooled = await run(build_app(context, stored_hash, hasher), logins)
+    hasher.shutdown()
+
+    print("\n" + "=" * 72)
+    print(f"{logins} concurrent logins, bcrypt cost {rounds}, {workers} hash workers")
+    print("-" * 72)
+    print(f"{'':16} {'logins/s':>9} {'429s':>5} {'samples':>8} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, r in (("inline (old)", inline), ("pooled (new)", pooled)):
+        print(f"{label:16} {r['ok'] / r['elapsed']:9.1f} {r['rejected']:5} {r['samples']:8} "
+              f"{r['p50']:8.1f} {r['p99']:8.1f} {r['max']:8.1f}")
+    print("-" * 72)
+    print("Latency columns are for GET /courses while the logins run")
+    print("=" * 72 + "\n")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cost = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    pool = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    asyncio.run(main(count, cost, pool))
@@ -0,0 +1,149 @@
+"""
+Newsletter Rendering Benchmark for LearnHub Backend
+===================================================
+Measures the CPU cost of producing the email body for 10,000 recipients:
+- per recipient: the old full f-string render for every subscriber
+- compiled + link splice: compile once, then splice in each unsubscribe link
+- compiled + SendGrid: compile once, then build per-recipient substitution
+  personalizations (what the batched dispatcher sends)
+
+Usage:
+    python bench_newsletter_render.py [recipients] [content_paragraphs]
+
+Pure CPU; no database or network needed.
+"""
+
+import sys
+import time
+import uuid
+
+import newsletter
+
+FRONTEND_URL = "http://localhost:3000"
+
+
+def legacy_render(blog_post, unsubscribe_token):
+    """The f-string send_newsletter_email used to build for each subscriber"""
+    course_url = f"{FRONTEND_URL}/courses/{blog_post['course_id']}" if blog_post.get('course_id') else FRONTEND_URL
+    unsubscribe_url = f"{FRONTEND_URL}/unsubscribe?token={unsubscribe_token}"
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 0; }}
+        .container {{ max-width: 600px; margin: 0 auto; }}
+        .header {{ background: #4F46E5; color: white; padding: 30px 20px; text-align: center; }}
+        .header h1 {{ margin: 0; font-size: 28px; }}
+        .content {{ padding: 30px 20px; background: #ffffff; }}
+        .content h2 {{ color: #1F2937; margin-top: 0; }}
+        .content img {{ max-width: 100%; height: auto; border-radius: 8px; margin: 20px 0; }}
+        .cta-button {{
+            display: inline-block;
+            background: #4F46E5;
+            color: white !important;
+            padding: 14px 28px;
+            text-decoration: none;
+            border-radius: 6px;
+            margin: 20px 0;
+            font-weight: bold;
+        }}
+        .footer {{ background: #F3F4F6; padding: 20px; text-align: center; font-size: 12px; color: #6B7280; }}
+        .footer a {{ color: #4F46E5; text-decoration: none; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📚 LearnHub Weekly</h1>
+            <p style="margin: 5px 0 0 0; opacity: 0.9;">Insights for Lifelong Learners</p>
+        </div>
+
+        <div class="content">
+            <h2>{blog_post['title']}</h2>
+
+            {f'<img src="{blog_post["cover_image"]}" alt="Course thumbnail">' if blog_post.get('cover_image') else ''}
+
+            <div style="color: #374151;">
+                {blog_post['content'].replace(chr(10), '<br>')}
+            </div>
+
+            <div style="text-align: center; margin-top: 30px;">
+                <a href="{course_url}" class="cta-button">Explore This Course →</a>
+            </div>
+        </div>
+
+        <div class="footer">
+            <p>You're receiving this because you subscribed to LearnHub newsletter.</p>
+            <p><a href="{unsubscribe_url}">Unsubscribe</a> | <a href="{FRONTEND_URL}">Visit LearnHub</a></p>
+            <p>© 2026 LearnHub. All rights reserved.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+
+def sample_post(paragraphs: int) -> dict:
+    body = []
+    for i in range(paragraphs):
+        body.append(f"## Section {i + 1}\n")
+        body.append("Online learning lets you **build real skills** at your own pace. "
+                    "This course walks through the fundamentals, then puts them to work "
+                    "in [hands-on projects](https://example.com/projects).\n")
+        body.append("- Practical exercises\n- Weekly live sessions\n- A certificate on completion\n")
+    return {
+        "id": str(uuid.uuid4()),
+        "title": "Master Python in 30 Days",
+        "content": "\n".join(body),
+        "course_id": str(uuid.uuid4()),
+        "cover_image": "https://cdn.example.com/thumb.png",
+    }
+
+
+REPEATS = 5
+
+
+def timed(fn) -> float:
+    """Best of REPEATS runs, to keep GC pauses and noise out of the comparison"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(recipients: int, paragraphs: int):
+    post = sample_post(paragraphs)
+    tokens = [str(uuid.uuid4()) for _ in range(recipients)]
+
+    legacy = timed(lambda: [legacy_render(post, t) for t in tokens])
+
+    compile_time = timed(lambda: post.update(newsletter_html=newsletter.compile_newsletter_html(post)))
+    personalize = newsletter.personalizer(post["newsletter_html"])
+    replaced = timed(lambda: [personalize(t) for t in tokens])
+    subscriptions = [{"email": f"s{i}@example.com", "unsubscribe_token": t} for i, t in enumerate(tokens)]
+    batched = timed(lambda: [
+        newsletter._batch_payload(subscriptions[i:i + newsletter.MAX_PERSONALIZATIONS], post["title"],
+                                  post["newsletter_html"], "newsletter@learnhub.com")
+        for i in range(0, recipients, newsletter.MAX_PERSONALIZATIONS)
+    ])
+
+    scale = 10000 / recipients
+    print("\n" + "=" * 62)
+    print(f"{recipients} recipients, {len(post['content'])} chars of markdown, "
+          f"{len(post['newsletter_html']) // 1024} KB email")
+    print("-" * 62)
+    print(f"{'':28} {'ms total':>10} {'ms per 10k':>12}")
+    print(f"{'per recipient (old)':28} {legacy * 1000:10.1f} {legacy * scale * 1000:12.1f}")
+    print(f"{'compile once':28} {compile_time * 1000:10.2f} {'':>12}")
+    print(f"{'compiled + link splice':28} {replaced * 1000:10.1f} {replaced * scale * 1000:12.1f}")
+    print(f"{'compiled + SendGrid subs':28} {batched * 1000:10.1f} {batched * scale * 1000:12.1f}")
+    print("=" * 62 + "\n")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sections = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    main(count, sections)
@@ -0,0 +1,121 @@
+"""
+Uploads Caching Benchmark for LearnHub Backend
+=============================================
+Replays a course page (20 thumbnails plus a lesson PDF read a few pages at a
+time) against the old plain StaticFiles mount and the new ImmutableStaticFiles
+mount, and reports requests and bytes on the wire for a first and a repeat
+visit.
+
+Usage:
+    python bench_uploads.py [num_thumbnails] [thumbnail_kb] [pdf_mb]
+
+The browser is modelled as a private cache that keeps fresh responses until
+their max-age expires and revalidates everything else with If-None-Match.
+Runs in-process against temporary files; no server or database needed.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import uuid
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+from static_uploads import ImmutableStaticFiles
+
+PDF_READ_RANGES = 4  # Pages a student flips through on the repeat visit
+RANGE_BYTES = 256 * 1024
+
+
+class BrowserCache:
+    """Just enough of a browser HTTP cache to count what reaches the server"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.entries = {}  # url -> (etag, fresh)
+        self.requests = 0
+        self.bytes = 0
+
+    async def get(self, url: str, byte_range=None):
+        etag, fresh = self.entries.get(url, (None, False))
+        if fresh and byte_range is None:
+            return  # Served from the browser cache, no request
+        headers = {}
+        if byte_range:
+            headers["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        elif etag:
+            headers["If-None-Match"] = etag
+        response = await self.client.get(url, headers=headers)
+        self.requests += 1
+        self.bytes += len(response.content)
+        cache_control = response.headers.get("cache-control", "")
+        max_age = re.search(r"max-age=(\d+)", cache_control)
+        if response.status_code == 200:
+            self.entries[url] = (response.headers.get("etag"), bool(max_age and int(max_age.group(1)) > 0))
+
+
+async def visit(cache: BrowserCache, thumbnails, pdf, pdf_size, supports_range: bool):
+    for name in thumbnails:
+        await cache.get(f"/uploads/thumbnails/{name}")
+    if supports_range:
+        for page in range(PDF_READ_RANGES):
+            start = (page * pdf_size) // PDF_READ_RANGES
+            await cache.get(f"/uploads/pdfs/{pdf}", (start, min(start + RANGE_BYTES, pdf_size) - 1))
+    else:
+        await cache.get(f"/uploads/pdfs/{pdf}")
+
+
+async def run(static_cls, root, thumbnails, pdf, pdf_size, supports_range):
+    app = Starlette(routes=[Mount("/uploads", static_cls(directory=root))])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cache = BrowserCache(client)
+        results = []
+        for _ in range(2):
+            cache.requests = cache.bytes = 0
+            await visit(cache, thumbnails, pdf, pdf_size, supports_range)
+            results.append((cache.requests, cache.bytes))
+        return results
+
+
+async def main(num_thumbnails: int, thumbnail_kb: int, pdf_mb: int):
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "thumbnails"))
+        os.makedirs(os.path.join(root, "pdfs"))
+        thumbnails = []
+        for _ in range(num_thumbnails):
+            name = f"{uuid.uuid4()}.png"
+            with open(os.path.join(root, "thumbnails", name), "wb") as f:
+                f.write(os.urandom(thumbnail_kb * 1024))
+            thumbnails.append(name)
+        pdf = f"{uuid.uuid4()}.pdf"
+        pdf_size = pdf_mb * 1024 * 1024
+        with open(os.path.join(root, "pdfs", pdf), "wb") as f:
+            f.write(os.urandom(pdf_size))
+
+        old = await run(StaticFiles, root, thumbnails, pdf, pdf_size, supports_range=False)
+        new = await run(ImmutableStaticFiles, root, thumbnails, pdf, pdf_size, supports_range=True)
+
+    print("\n" + "=" * 64)
+    print(f"{num_thumbnails} thumbnails x {thumbnail_kb} KB, {pdf_mb} MB lesson PDF")
+    print("-" * 64)
+    for label, (first, repeat) in (("StaticFiles (old)", old), ("Immutable (new)", new)):
+        print(f"{label:18} first: {first[0]:3} req {first[1] / 1024:9.1f} KB   "
+              f"repeat: {repeat[0]:3} req {repeat[1] / 1024:9.1f} KB")
+    saved_requests = (old[0][0] + old[1][0]) - (new[0][0] + new[1][0])
+    saved_bytes = (old[0][1] + old[1][1]) - (new[0][1] + new[1][1])
+    print("-" * 64)
+    print(f"Saved over both visits: {saved_requests} requests, {saved_bytes / 1024:.1f} KB")
+    print("=" * 64 + "\n")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    size_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    pdf_mb = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    asyncio.run(main(count, size_kb, pdf_mb))
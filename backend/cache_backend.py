@@ -0,0 +1,253 @@
+"""
+Pluggable cache backends for LearnHub
+`MemoryBackend` keeps entries in this process; `RedisBackend` shares them
+between uvicorn workers. Both support per-entry TTLs, tag invalidation and
+single-flight loading, so a cold key is computed once rather than once per
+concurrent request. Callers use a `CacheNamespace`, which prefixes keys and
+counts hits and misses for the admin cache stats.
+
+Select with CACHE_BACKEND=memory|redis (REDIS_URL for the latter).
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+import asyncio
+import json
+import logging
+import os
+import time
+
+from cachetools import TLRUCache
+
+import caches
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class CacheBackend:
+    """Async get/set/delete with tags; subclasses implement the storage"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        raise NotImplementedError
+
+    async def _load_exclusive(self, key: str, loader, ttl: float, tags) -> Any:
+        """Run loader and store its result; overridden to add cross-process locking"""
+        value = await loader()
+        if value is not None:
+            await self.set(key, value, ttl, tags)
+        return value
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: float, tags: Iterable[str] = ()) -> Any:
+        """Cached value for key, calling loader at most once per process on a miss.
+        None results are returned but not cached."""
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load_exclusive(key, loader, ttl, tags)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, maxsize: int = 10000):
+        super().__init__()
+        # Each entry is (value, expires_at, tags)
+        self._entries = TLRUCache(maxsize=maxsize, ttu=lambda _k, v, _now: v[1], timer=time.monotonic)
+        self._keys_by_tag: Dict[str, set] = {}
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        self._entries[key] = (value, time.monotonic() + ttl, tags)
+        for tag in tags:
+            keys = self._keys_by_tag.setdefault(tag, set())
+            keys.add(key)
+            if len(keys) > self._entries.maxsize:
+                keys.intersection_update([k for k in keys if k in self._entries])
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        removed = 0
+        for tag in tags:
+            for key in self._keys_by_tag.pop(tag, ()):
+                if self._entries.pop(key, _MISSING) is not _MISSING:
+                    removed += 1
+        return removed
+
+
+class RedisBackend(CacheBackend):
+    """Values are stored as JSON; tags are Redis sets of member keys.
+    Accepts any redis.asyncio-compatible client (e.g. fakeredis.aioredis.FakeRedis)."""
+
+    LOCK_TIMEOUT = 10.0
+    LOCK_POLL = 0.05
+
+    def __init__(self, client, prefix: str = "learnhub:"):
+        super().__init__()
+        self._redis = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBackend":
+        import redis.asyncio as redis  # Optional dependency; only needed for CACHE_BACKEND=redis
+        return cls(redis.from_url(url), **kwargs)
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self._prefix}tag:{tag}"
+
+    async def get(self, key: str) -> Any:
+        raw = await self._redis.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(key), json.dumps(value, default=str), px=int(ttl * 1000))
+            for tag in tags:
+                pipe.sadd(self._tag(tag), self._key(key))
+                # Tag sets outlive their members a little, then expire on their own
+                pipe.pexpire(self._tag(tag), int(ttl * 2000))
+            await pipe.execute()
+
+    async def delete(self, key: str):
+        await self._redis.delete(self._key(key))
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        removed = 0
+        for tag in tags:
+            members = await self._redis.smembers(self._tag(tag))
+            if members:
+                removed += await self._redis.delete(*members)
+            await self._redis.delete(self._tag(tag))
+        return removed
+
+    async def _load_exclusive(self, key: str, loader, ttl: float, tags) -> Any:
+        # One worker computes the value; the others wait for it to appear
+        lock = self._key(f"lock:{key}")
+        if await self._redis.set(lock, "1", nx=True, px=int(self.LOCK_TIMEOUT * 1000)):
+            try:
+                return await super()._load_exclusive(key, loader, ttl, tags)
+            finally:
+                await self._redis.delete(lock)
+
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.LOCK_POLL)
+            value = await self.get(key)
+            if value is not None:
+                return value
+            if not await self._redis.exists(lock):
+                break  # Holder finished without caching (None result or error)
+        return await super()._load_exclusive(key, loader, ttl, tags)
+
+
+class CacheNamespace:
+    """Keyed view of a backend with a default TTL and hit/miss counters"""
+
+    def __init__(self, backend: CacheBackend, name: str, ttl: float):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        caches.register(name, self)
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _tags(self, tags: Iterable[str]) -> list:
+        # Every entry also carries the namespace tag so clear() is a tag drop
+        return [f"{self.name}#{t}" for t in tags] + [f"{self.name}#*"]
+
+    async def get(self, key: str) -> Any:
+        value = await self.backend.get(self._key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: Optional[float] = None):
+        await self.backend.set(self._key(key), value, ttl or self.ttl, self._tags(tags))
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          tags: Iterable[str] = (), ttl: Optional[float] = None) -> Any:
+        loaded = False
+
+        async def counted_loader():
+            nonlocal loaded
+            loaded = True
+            return await loader()
+
+        value = await self.backend.get_or_load(self._key(key), counted_loader, ttl or self.ttl, self._tags(tags))
+        if loaded:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def delete(self, key: str):
+        await self.backend.delete(self._key(key))
+        self.invalidations += 1
+
+    async def invalidate(self, *tags: str):
+        self.invalidations += await self.backend.invalidate_tags(*(f"{self.name}#{t}" for t in tags))
+
+    async def clear(self):
+        self.invalidations += await self.backend.invalidate_tags(f"{self.name}#*")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def from_env() -> CacheBackend:
+    kind = os.environ.get('CACHE_BACKEND', 'memory').lower()
+    if kind == "redis":
+        url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+        logger.info(f"Using Redis cache backend at {url}")
+        return RedisBackend.from_url(url)
+    return MemoryBackend(maxsize=int(os.environ.get('CACHE_MAX_ENTRIES', 20000)))
@@ -0,0 +1,72 @@
+"""
+In-process caches with hit/miss accounting for LearnHub
+Each cache is an LRU with a TTL (cachetools.TTLCache) that registers itself
+by name so the admin perf endpoint can report its effectiveness.
+"""
+
+from typing import Any, Dict, Hashable, Optional
+from cachetools import TTLCache
+
+_registry: Dict[str, Any] = {}  # name -> object with .stats()
+
+_MISSING = object()
+
+
+class MeteredCache:
+    """A TTL-bounded LRU that counts hits, misses and invalidations"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        register(name, self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._cache
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def set(self, key: Hashable, value: Any):
+        self._cache[key] = value
+
+    def invalidate(self, key: Hashable):
+        if self._cache.pop(key, _MISSING) is not _MISSING:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._cache)
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def register(name: str, cache):
+    _registry[name] = cache
+
+
+def get_stats(name: Optional[str] = None) -> dict:
+    """Stats for every registered cache, or just the named one"""
+    if name:
+        return {name: _registry[name].stats()} if name in _registry else {}
+    return {cache_name: cache.stats() for cache_name, cache in _registry.items()}
@@ -0,0 +1,201 @@
+"""
+Background cascade deletes for LearnHub
+Deleting a course or user marks it deleted in the request and queues a job in
+`delete_jobs`; a background task then removes child documents in bounded
+batches and records per-collection progress on the job document.
+Jobs are leased (see leases.py) so only one worker runs each at a time.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+import asyncio
+import logging
+import uuid
+
+import course_stats
+import leases
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+DELETED = "deleted"
+ACTIVE = ["queued", "running"]
+
+COURSE = "course"
+USER = "user"
+ORPHANS = "orphans"
+
+# Entity kind -> (owning collection, [(child collection, foreign key)])
+CHILDREN = {
+    COURSE: ("courses", [
+        ("sections", "course_id"),
+        ("lessons", "course_id"),
+        ("quizzes", "course_id"),
+        ("quiz_results", "course_id"),
+        ("live_classes", "course_id"),
+        ("enrollments", "course_id"),
+        ("reviews", "course_id"),
+        ("certificates", "course_id"),
+        ("coupon_usage", "course_id"),
+        ("payments", "course_id"),
+        ("daily_rollups", "scope_id"),
+    ]),
+    USER: ("users", [
+        ("instructors", "user_id"),
+        ("enrollments", "user_id"),
+        ("reviews", "user_id"),
+        ("quiz_results", "user_id"),
+        ("certificates", "user_id"),
+        ("coupon_usage", "user_id"),
+        ("payments", "user_id"),
+    ]),
+}
+
+# Children whose removal changes materialized course_stats
+STATS_SOURCES = ("enrollments", "reviews")
+
+# Running job tasks, kept referenced so they aren't garbage collected
+_tasks = set()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def _delete_in_batches(collection, query: dict) -> int:
+    """delete_many in chunks of BATCH_SIZE so no single write holds the collection for long"""
+    deleted = 0
+    while True:
+        ids = [doc["_id"] async for doc in collection.find(query, {"_id": 1}).limit(BATCH_SIZE)]
+        if not ids:
+            return deleted
+        result = await collection.delete_many({"_id": {"$in": ids}})
+        deleted += result.deleted_count
+        await asyncio.sleep(0)  # Let request handlers run between batches
+
+
+async def _progress(db, job_id: str, collection: str, deleted: int):
+    await db.delete_jobs.update_one(
+        {"id": job_id},
+        {"$set": {f"progress.{collection}": deleted, "updated_at": _now()}}
+    )
+
+
+async def _cascade(db, job: dict):
+    kind, entity_id = job["kind"], job["entity_id"]
+    owner, children = CHILDREN[kind]
+    affected_courses = set()
+
+    for collection, field in children:
+        if kind == COURSE and collection == "daily_rollups":
+            query = {"scope": "course", field: entity_id}
+        else:
+            query = {field: entity_id}
+        if kind == USER and collection in STATS_SOURCES:
+            affected_courses.update(await db[collection].distinct("course_id", query))
+        deleted = await _delete_in_batches(db[collection], query)
+        await _progress(db, job["id"], collection, deleted)
+
+    await db[owner].delete_one({"id": entity_id, "deleted_at": {"$exists": True}})
+    for course_id in affected_courses:
+        await course_stats.recompute(db, course_id)
+
+
+async def _missing_parents(db, collection: str, field: str, parent: str) -> list:
+    """Values of collection.field that no longer exist in the parent collection"""
+    values = [row["_id"] async for row in db[collection].aggregate([
+        {"$match": {field: {"$type": "string"}}},
+        {"$group": {"_id": f"${field}"}},
+    ])]
+    missing = []
+    for i in range(0, len(values), BATCH_SIZE):
+        chunk = values[i:i + BATCH_SIZE]
+        existing = set(await db[parent].distinct("id", {"id": {"$in": chunk}}))
+        missing.extend(v for v in chunk if v not in existing)
+    return missing
+
+
+async def _sweep_orphans(db, job: dict):
+    affected_courses = set()
+    for kind in (COURSE, USER):
+        parent, children = CHILDREN[kind]
+        for collection, field in children:
+            if collection == "daily_rollups":
+                continue  # Rollups are repaired by rebuild_rollups
+            missing = await _missing_parents(db, collection, field, parent)
+            if kind == USER and collection in STATS_SOURCES and missing:
+                affected_courses.update(
+                    await db[collection].distinct("course_id", {field: {"$in": missing}})
+                )
+            deleted = 0
+            for i in range(0, len(missing), BATCH_SIZE):
+                deleted += await _delete_in_batches(
+                    db[collection], {field: {"$in": missing[i:i + BATCH_SIZE]}}
+                )
+            await _progress(db, job["id"], f"{kind}.{collection}", deleted)
+    for course_id in affected_courses:
+        await course_stats.recompute(db, course_id)
+
+
+async def _run(db, job: dict):
+    async with leases.held(db.delete_jobs, job["id"]):
+        await db.delete_jobs.update_one(
+            {"id": job["id"]}, {"$set": {"status": "running", "started_at": _now()}}
+        )
+        try:
+            if job["kind"] == ORPHANS:
+                await _sweep_orphans(db, job)
+            else:
+                await _cascade(db, job)
+        except Exception as e:
+            logger.error(f"Delete job {job['id']} ({job['kind']} {job.get('entity_id')}) failed: {e}")
+            await db.delete_jobs.update_one(
+                {"id": job["id"]},
+                {"$set": {"status": "failed", "error": str(e), "finished_at": _now()}}
+            )
+            return
+        await db.delete_jobs.update_one(
+            {"id": job["id"]}, {"$set": {"status": "completed", "finished_at": _now()}}
+        )
+    logger.info(f"Delete job {job['id']} ({job['kind']} {job.get('entity_id')}) completed")
+
+
+async def _claim_and_spawn(db, job_id: str) -> bool:
+    """Start a job unless another worker already holds it"""
+    job = await leases.claim(db.delete_jobs, job_id, ACTIVE)
+    if not job:
+        return False
+    task = asyncio.create_task(_run(db, job))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return True
+
+
+async def enqueue(db, kind: str, entity_id: Optional[str], requested_by: str) -> dict:
+    """Record a job and start it in the background; returns the job document"""
+    job = {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "entity_id": entity_id,
+        "requested_by": requested_by,
+        "status": "queued",
+        "progress": {},
+        "error": None,
+        "owner": None,
+        "created_at": _now(),
+    }
+    await db.delete_jobs.insert_one(dict(job))
+    await _claim_and_spawn(db, job["id"])
+    return job
+
+
+async def resume_pending(db) -> int:
+    """Restart jobs a previous process left queued or running; every step is idempotent.
+    Jobs still leased by another live worker are left to it."""
+    resumed = 0
+    async for job in db.delete_jobs.find({"status": {"$in": ACTIVE}}, {"_id": 0, "id": 1}):
+        if await _claim_and_spawn(db, job["id"]):
+            resumed += 1
+    if resumed:
+        logger.info(f"Resumed {resumed} delete job(s)")
+    return resumed
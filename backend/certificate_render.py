@@ -0,0 +1,181 @@
+"""
+Certificate PDF rendering for LearnHub
+reportlab drawing is pure CPU, so it runs in a process pool rather than on the
+event loop. Each worker is warmed once by `_warm_worker` (fonts, colours and
+a throwaway render) so the first real certificate doesn't pay for imports.
+This module is imported by the workers, so it must stay free of server
+dependencies.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+import asyncio
+import io
+import logging
+import multiprocessing
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the template changes so stored PDFs are re-rendered
+TEMPLATE_VERSION = "1"
+
+FONTS = ("Helvetica", "Helvetica-Bold")
+PALETTE = {
+    "brand": "#10b981",
+    "brand_dark": "#059669",
+    "divider": "#d1fae5",
+    "heading": "#374151",
+    "muted": "#6b7280",
+    "name": "#1a1a1a",
+    "faint": "#9ca3af",
+}
+_colors = {}
+
+
+def _color(name: str):
+    color = _colors.get(name)
+    if color is None:
+        color = _colors[name] = colors.HexColor(PALETTE[name])
+    return color
+
+
+def generate_certificate_pdf(user_name: str, course_title: str, completion_date: str, certificate_id: str) -> bytes:
+    """Generate a professional certificate PDF"""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    # Background border
+    c.setStrokeColor(_color("brand"))
+    c.setLineWidth(10)
+    c.rect(30, 30, width - 60, height - 60)
+
+    # Inner border
+    c.setStrokeColor(_color("brand_dark"))
+    c.setLineWidth(2)
+    c.rect(50, 50, width - 100, height - 100)
+
+    # Title
+    c.setFont("Helvetica-Bold", 48)
+    c.setFillColor(_color("brand"))
+    c.drawCentredString(width / 2, height - 120, "Certificate")
+
+    c.setFont("Helvetica", 28)
+    c.setFillColor(_color("heading"))
+    c.drawCentredString(width / 2, height - 160, "of Completion")
+
+    # Divider line
+    c.setStrokeColor(_color("divider"))
+    c.setLineWidth(2)
+    c.line(150, height - 190, width - 150, height - 190)
+
+    # Presented to text
+    c.setFont("Helvetica", 18)
+    c.setFillColor(_color("muted"))
+    c.drawCentredString(width / 2, height - 240, "This certificate is presented to")
+
+    # Student name
+    c.setFont("Helvetica-Bold", 36)
+    c.setFillColor(_color("name"))
+    c.drawCentredString(width / 2, height - 300, user_name)
+
+    # Achievement text
+    c.setFont("Helvetica", 16)
+    c.setFillColor(_color("muted"))
+    c.drawCentredString(width / 2, height - 350, "for successfully completing the course")
+
+    # Course title
+    c.setFont("Helvetica-Bold", 24)
+    c.setFillColor(_color("brand"))
+    c.drawCentredString(width / 2, height - 400, course_title)
+
+    # Completion date
+    c.setFont("Helvetica", 14)
+    c.setFillColor(_color("muted"))
+    c.drawCentredString(width / 2, height - 470, f"Completed on {completion_date}")
+
+    # Certificate ID
+    c.setFont("Helvetica", 10)
+    c.setFillColor(_color("faint"))
+    c.drawCentredString(width / 2, 100, f"Certificate ID: {certificate_id}")
+
+    # Platform name
+    c.setFont("Helvetica-Bold", 16)
+    c.setFillColor(_color("brand"))
+    c.drawCentredString(width / 2, 140, "LearnHub")
+
+    c.save()
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def _warm_worker():
+    for font in FONTS:
+        pdfmetrics.getFont(font)
+    for name in PALETTE:
+        _color(name)
+    generate_certificate_pdf("Warm Up", "Warm Up", "January 1, 2000", "warm-up")
+
+
+def _ping() -> bool:
+    return True
+
+
+def _render_kwargs(inputs: dict) -> bytes:
+    return generate_certificate_pdf(**inputs)
+
+
+class CertificateRenderer:
+    """Async front end to a pool of rendering processes.
+    With workers=0 rendering happens inline, which is handy for debugging."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        if self.workers <= 0 or self._executor is not None:
+            return
+        # spawn, not fork: the parent has Mongo and executor threads running
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker
+        )
+
+    async def warm(self):
+        """Start every worker now instead of on the first download"""
+        if self._executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+        logger.info(f"Certificate renderer warmed {self.workers} workers")
+
+    async def render(self, **inputs) -> bytes:
+        if self._executor is None:
+            return generate_certificate_pdf(**inputs)
+        executor = self._executor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, _render_kwargs, inputs)
+        except BrokenProcessPool:
+            # A worker died (OOM, crash) and took the pool with it; replace the pool
+            # once, however many renders were in flight, and retry on the new one
+            if self._executor is executor:
+                logger.error("Certificate render pool broke; restarting it")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.start()
+            if self._executor is None:
+                return generate_certificate_pdf(**inputs)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, _render_kwargs, inputs)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,127 @@
+"""
+Rendered certificate store for LearnHub
+PDFs are stored under a key derived from everything that goes into the
+rendering (certificate id, template version, name, course title, date), so a
+renamed student or course gets a fresh file instead of a stale one. The disk
+store is size-capped with least-recently-used eviction, and the hottest PDFs
+are also kept in memory. `put` does blocking file IO, so callers run it in a
+thread; a lock keeps the index consistent with the event loop's reads.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def certificate_key(template_version: str, **inputs) -> str:
+    payload = json.dumps({"v": template_version, **inputs}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CertificateStore:
+    def __init__(self, directory: Path, max_bytes: int, memory_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._memory = LRUCache(maxsize=memory_bytes, getsizeof=len)
+        # key -> [size, last_used]; rebuilt from the directory on startup
+        self._index: Dict[str, list] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        for path in self.directory.glob("*.pdf"):
+            stat = path.stat()
+            self._index[path.stem] = [stat.st_size, stat.st_mtime]
+            self._total += stat.st_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.pdf"
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """In-memory copy, if this PDF is hot"""
+        data = self._memory.get(key)
+        if data is not None:
+            self.hits += 1
+            self._touch(key)
+        return data
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """On-disk copy, if stored"""
+        if key not in self._index:
+            self.misses += 1
+            return None
+        path = self.path_for(key)
+        if not path.exists():
+            with self._lock:
+                self._forget(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(key)
+        return path
+
+    def put(self, key: str, data: bytes) -> Path:
+        path = self.path_for(key)
+        # Write then rename so a concurrent reader never sees a partial PDF
+        tmp = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if key in self._index:
+                self._total -= self._index[key][0]
+            self._index[key] = [len(data), time.time()]
+            self._total += len(data)
+            if len(data) <= self._memory.maxsize:
+                self._memory[key] = data
+            self._evict()
+        return path
+
+    def _touch(self, key: str):
+        entry = self._index.get(key)
+        if entry:
+            entry[1] = time.time()
+
+    def _forget(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total -= entry[0]
+        self._memory.pop(key, None)
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                self.path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+            self._forget(key)
+            self.evictions += 1
+        logger.info(f"Certificate store trimmed to {self._total} bytes")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "files": len(self._index),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "memory_bytes": self._memory.currsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,107 @@
+"""
+Course access resolution for LearnHub
+Answers "what is this user to this course?" as one of admin, owner, enrolled
+or anonymous. The lookups behind it (user -> instructor id, course -> owning
+instructor, user -> enrolled course ids) are held in short-TTL caches, so a
+warm check costs no queries.
+"""
+
+from typing import FrozenSet, Optional
+
+import cascade
+import caches
+
+ADMIN = "admin"
+OWNER = "owner"
+ENROLLED = "enrolled"
+ANONYMOUS = "anonymous"
+
+ENROLLED_STATUSES = ["active", "completed"]
+
+_NO_INSTRUCTOR = ""  # Cached marker for users without an instructor profile
+
+
+class CourseAccess:
+    """The caller's relationship to one course"""
+
+    def __init__(self, course_id: str, level: str, exists: bool = True):
+        self.course_id = course_id
+        self.level = level
+        self.exists = exists
+
+    @property
+    def can_manage(self) -> bool:
+        return self.level in (ADMIN, OWNER)
+
+    @property
+    def can_view_content(self) -> bool:
+        return self.level != ANONYMOUS
+
+
+class AccessResolver:
+    def __init__(self, db, maxsize: int = 10000, ttl: float = 30):
+        self._db = db
+        self.instructor_ids = caches.MeteredCache("access.instructor_ids", maxsize, ttl)
+        self.course_owners = caches.MeteredCache("access.course_owners", maxsize, ttl)
+        self.enrollments = caches.MeteredCache("access.enrollments", maxsize, ttl)
+
+    async def instructor_id(self, user_id: str) -> Optional[str]:
+        instructor_id = self.instructor_ids.get(user_id)
+        if instructor_id is None:
+            instructor = await self._db.instructors.find_one({"user_id": user_id}, {"_id": 0, "id": 1})
+            instructor_id = (instructor or {}).get("id") or _NO_INSTRUCTOR
+            self.instructor_ids.set(user_id, instructor_id)
+        return instructor_id or None
+
+    async def course_owner(self, course_id: str) -> Optional[str]:
+        """Owning instructor id, "" for an unowned course, None if the course doesn't exist
+        or has been deleted (its cascade job may still be running)"""
+        owner = self.course_owners.get(course_id)
+        if owner is None:
+            course = await self._db.courses.find_one(
+                {"id": course_id, "status": {"$ne": cascade.DELETED}}, {"_id": 0, "instructor_id": 1}
+            )
+            if not course:
+                return None
+            owner = course.get("instructor_id") or ""
+            self.course_owners.set(course_id, owner)
+        return owner
+
+    async def enrolled_course_ids(self, user_id: str, refresh: bool = False) -> FrozenSet[str]:
+        course_ids = None if refresh else self.enrollments.get(user_id)
+        if course_ids is None:
+            course_ids = frozenset(await self._db.enrollments.distinct(
+                "course_id", {"user_id": user_id, "status": {"$in": ENROLLED_STATUSES}}
+            ))
+            self.enrollments.set(user_id, course_ids)
+        return course_ids
+
+    async def is_enrolled(self, user_id: str, course_id: str) -> bool:
+        if course_id in await self.enrolled_course_ids(user_id):
+            return True
+        # Only positives are trusted from cache: an enrollment made through
+        # another worker must be visible immediately
+        return course_id in await self.enrolled_course_ids(user_id, refresh=True)
+
+    async def resolve(self, user, course_id: str) -> CourseAccess:
+        owner = await self.course_owner(course_id)
+        exists = owner is not None
+        if user is None:
+            return CourseAccess(course_id, ANONYMOUS, exists)
+        if user.role == "admin":
+            return CourseAccess(course_id, ADMIN, exists)
+        if owner and owner == await self.instructor_id(user.id):
+            return CourseAccess(course_id, OWNER, exists)
+        if exists and await self.is_enrolled(user.id, course_id):
+            return CourseAccess(course_id, ENROLLED, exists)
+        return CourseAccess(course_id, ANONYMOUS, exists)
+
+    def invalidate_user(self, user_id: str):
+        self.instructor_ids.invalidate(user_id)
+        self.enrollments.invalidate(user_id)
+
+    def invalidate_enrollments(self, user_id: str):
+        self.enrollments.invalidate(user_id)
+
+    def invalidate_course(self, course_id: str):
+        self.course_owners.invalidate(course_id)
@@ -0,0 +1,36 @@
+"""
+Title prefix search for LearnHub's course catalog
+$text only matches whole (stemmed) words, so a partial term like "pyth" finds
+nothing. Each course also stores `title_words`, its lowercased title words, and
+a multikey index on it turns each term into an anchored, index-backed prefix scan.
+"""
+
+from typing import List
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+def title_words(title: str) -> List[str]:
+    return sorted(set(_WORD.findall((title or "").lower())))
+
+
+def prefix_filter(search: str) -> dict:
+    """Courses with a title word starting with each search term"""
+    terms = _WORD.findall(search.lower())
+    return {"title_words": {"$all": [re.compile(f"^{re.escape(term)}") for term in terms]}}
+
+
+async def backfill(db, batch_size: int = 500) -> int:
+    """Set title_words on courses that predate it"""
+    updated = 0
+    cursor = db.courses.find({"title_words": {"$exists": False}}, {"_id": 0, "id": 1, "title": 1})
+    async for course in cursor.batch_size(batch_size):
+        await db.courses.update_one({"id": course["id"]}, {"$set": {"title_words": title_words(course.get("title"))}})
+        updated += 1
+    if updated:
+        logger.info(f"Backfilled title_words on {updated} course(s)")
+    return updated
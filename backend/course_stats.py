@@ -0,0 +1,143 @@
+"""
+Materialized per-course statistics for LearnHub
+Each course carries a `course_stats` subdocument that write paths keep current
+with atomic increments, so read paths never count or average on the fly.
+A repair job rebuilds it from the source collections with aggregations.
+
+Increments only apply to courses whose `course_stats` is complete; courses that
+predate it (or hold a partial one) are filled in by `backfill` at startup, and
+readers fall back to live counts for any field that is missing.
+"""
+
+from pymongo import UpdateOne
+import logging
+
+logger = logging.getLogger(__name__)
+
+RATINGS = ("1", "2", "3", "4", "5")
+
+
+def empty_stats() -> dict:
+    return {
+        "lessons_count": 0,
+        "total_duration": 0,
+        "enrollment_count": 0,
+        "completion_count": 0,
+        "review_count": 0,
+        "rating_sum": 0,
+        "rating_avg": None,
+        "rating_hist": {r: 0 for r in RATINGS},
+    }
+
+
+# Matches courses whose course_stats has every field, so an $inc never starts a partial one
+COMPLETE = {f"course_stats.{field}": {"$exists": True} for field in empty_stats()}
+
+
+async def increment(db, course_id: str, **deltas):
+    """Atomically $inc counters, e.g. increment(db, cid, lessons_count=1)"""
+    deltas = {f"course_stats.{k}": v for k, v in deltas.items() if v}
+    if deltas:
+        await db.courses.update_one({"id": course_id, **COMPLETE}, {"$inc": deltas})
+
+
+async def apply_review(db, course_id: str, rating: int, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) a review and refresh the average.
+    Uses a pipeline update so the counters and the average change in one write."""
+    rating = str(int(rating))
+    deltas = {
+        "course_stats.review_count": sign,
+        "course_stats.rating_sum": sign * int(rating),
+        f"course_stats.rating_hist.{rating}": sign,
+    }
+    await db.courses.update_one({"id": course_id, **COMPLETE}, [
+        {"$set": {
+            field: {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}
+            for field, delta in deltas.items()
+        }},
+        {"$set": {"course_stats.rating_avg": {"$cond": [
+            {"$gt": ["$course_stats.review_count", 0]},
+            {"$round": [{"$divide": ["$course_stats.rating_sum", "$course_stats.review_count"]}, 2]},
+            None,
+        ]}}},
+    ])
+
+
+async def track_completion(db, course_id: str, old_status: str, new_status: str):
+    """Keep completion_count in step with enrollment status transitions"""
+    if old_status != "completed" and new_status == "completed":
+        await increment(db, course_id, completion_count=1)
+    elif old_status == "completed" and new_status != "completed":
+        await increment(db, course_id, completion_count=-1)
+
+
+async def _group_by_course(collection, match: dict, group: dict) -> dict:
+    rows = {}
+    async for row in collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$course_id", **group}},
+    ]):
+        rows[row["_id"]] = row
+    return rows
+
+
+async def recompute(db, course_id: str = None) -> int:
+    """Rebuild course_stats from scratch for one course or every course"""
+    if course_id:
+        return await _rebuild(db, {"course_id": course_id}, {"id": course_id})
+    return await _rebuild(db, {}, {})
+
+
+async def backfill(db, batch_size: int = 500) -> int:
+    """Recompute course_stats for courses that are missing it or hold a partial one"""
+    incomplete = {"$or": [{field: {"$exists": False}} for field in COMPLETE]}
+    ids = [c["id"] async for c in db.courses.find(incomplete, {"_id": 0, "id": 1})]
+    updated = 0
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        updated += await _rebuild(db, {"course_id": {"$in": chunk}}, {"id": {"$in": chunk}})
+    return updated
+
+
+async def _rebuild(db, match: dict, course_query: dict) -> int:
+    lessons = await _group_by_course(db.lessons, match, {
+        "count": {"$sum": 1},
+        "duration": {"$sum": {"$ifNull": ["$duration", 0]}},
+    })
+    enrollments = await _group_by_course(db.enrollments, match, {
+        "count": {"$sum": 1},
+        "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}},
+    })
+    reviews = await _group_by_course(db.reviews, match, {
+        "count": {"$sum": 1},
+        "sum": {"$sum": "$rating"},
+        **{f"r{r}": {"$sum": {"$cond": [{"$eq": ["$rating", int(r)]}, 1, 0]}} for r in RATINGS},
+    })
+
+    operations = []
+    updated = 0
+    async for course in db.courses.find(course_query, {"_id": 0, "id": 1}):
+        cid = course["id"]
+        stats = empty_stats()
+        if cid in lessons:
+            stats["lessons_count"] = lessons[cid]["count"]
+            stats["total_duration"] = lessons[cid]["duration"]
+        if cid in enrollments:
+            stats["enrollment_count"] = enrollments[cid]["count"]
+            stats["completion_count"] = enrollments[cid]["completed"]
+        if cid in reviews:
+            stats["review_count"] = reviews[cid]["count"]
+            stats["rating_sum"] = reviews[cid]["sum"]
+            stats["rating_avg"] = round(reviews[cid]["sum"] / reviews[cid]["count"], 2)
+            stats["rating_hist"] = {r: reviews[cid][f"r{r}"] for r in RATINGS}
+        operations.append(UpdateOne({"id": cid}, {"$set": {"course_stats": stats}}))
+        updated += 1
+
+        if len(operations) >= 500:
+            await db.courses.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await db.courses.bulk_write(operations, ordered=False)
+
+    logger.info(f"Recomputed course_stats for {updated} course(s)")
+    return updated
@@ -0,0 +1,226 @@
+"""
+MongoDB index registry for LearnHub
+Declares the indexes every collection needs, creates them at startup,
+and audits the canonical route queries for collection scans.
+"""
+
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+# Collection -> list of indexes. Unique indexes on "id" are sparse because
+# older documents may predate the stable-ID repair logic in login/create_course.
+INDEXES = {
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("role", ASCENDING)]),
+        IndexModel([("token_version", ASCENDING)], sparse=True),  # Revoked-token refresh
+    ],
+    "instructors": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("verification_status", ASCENDING)]),
+    ],
+    "courses": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Keyset catalog sorts (see pagination.CATALOG_SORTS)
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("price", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("course_stats.rating_avg", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("course_stats.enrollment_count", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("instructor_id", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("category", ASCENDING), ("status", ASCENDING)]),
+        # Catalog search. Courses carry a free-form "language" field (e.g. "English"),
+        # which MongoDB would otherwise treat as the per-document stemming language.
+        IndexModel(
+            [("title", TEXT), ("meta_keywords", TEXT), ("description", TEXT)],
+            weights={"title": 10, "meta_keywords": 5, "description": 1},
+            default_language="english",
+            language_override="text_search_language",
+            name="course_text_search",
+        ),
+        # Title-word prefix fallback (see course_search); anchored regexes scan a key range
+        IndexModel([("title_words", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "sections": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("course_id", ASCENDING), ("order", ASCENDING)]),
+    ],
+    "lessons": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("course_id", ASCENDING), ("order", ASCENDING)]),
+        IndexModel([("section_id", ASCENDING), ("order", ASCENDING)]),
+    ],
+    "live_classes": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("course_id", ASCENDING), ("scheduled_at", ASCENDING)]),
+    ],
+    "enrollments": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("course_id", ASCENDING)], unique=True),
+        IndexModel([("course_id", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "quizzes": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("course_id", ASCENDING)]),
+    ],
+    "quiz_results": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("quiz_id", ASCENDING)]),
+        IndexModel([("course_id", ASCENDING)]),
+    ],
+    "payments": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("session_id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("payment_status", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("course_id", ASCENDING)]),
+        IndexModel([("course_id", ASCENDING)]),  # Course cascade deletes
+    ],
+    "coupons": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("code", ASCENDING)], unique=True),
+    ],
+    "coupon_usage": [
+        IndexModel([("coupon_id", ASCENDING), ("user_id", ASCENDING), ("course_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("course_id", ASCENDING)]),
+    ],
+    "certificates": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("course_id", ASCENDING)], unique=True),
+        IndexModel([("course_id", ASCENDING)]),
+    ],
+    "reviews": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("course_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("course_id", ASCENDING)], unique=True),
+    ],
+    "blog_posts": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("published_at", DESCENDING)]),
+        IndexModel([("sent_to_subscribers", ASCENDING), ("category", ASCENDING), ("published_at", DESCENDING)]),
+    ],
+    "daily_rollups": [
+        IndexModel([("scope", ASCENDING), ("scope_id", ASCENDING), ("date", ASCENDING)], unique=True),
+    ],
+    "delete_jobs": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING)]),
+    ],
+    "email_subscriptions": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("unsubscribe_token", ASCENDING)], unique=True),
+        IndexModel([("subscribed", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "newsletter_runs": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("blog_id", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+        # One queued/running run (active: true) per blog post, so concurrent sends can't both start
+        IndexModel([("blog_id", ASCENDING)], unique=True, name="blog_id_active_run",
+                   partialFilterExpression={"active": True}),
+    ],
+}
+
+
+# Canonical query of each hot route: (route, collection, filter, sort)
+CANONICAL_QUERIES = [
+    ("get_current_user", "users", {"id": ""}, None),
+    ("login", "users", {"email": ""}, None),
+    ("get_instructors", "instructors", {"verification_status": "approved"}, None),
+    ("course ownership check", "instructors", {"user_id": ""}, None),
+    ("get_courses", "courses", {"status": "published"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("get_courses (price)", "courses", {"status": "published"}, [("price", ASCENDING), ("id", ASCENDING)]),
+    ("get_courses (rating)", "courses", {"status": "published"}, [("course_stats.rating_avg", DESCENDING), ("id", DESCENDING)]),
+    ("get_courses (popularity)", "courses", {"status": "published"}, [("course_stats.enrollment_count", DESCENDING), ("id", DESCENDING)]),
+    ("get_courses (search)", "courses", {"status": "published", "$text": {"$search": "python"}}, None),
+    ("get_courses (prefix search)", "courses", {"status": "published", "title_words": {"$all": [re.compile("^pyth")]}}, None),
+    ("get_courses (instructor)", "courses", {"instructor_id": "", "status": "published"}, None),
+    ("get_course", "courses", {"id": ""}, None),
+    ("get_sections", "sections", {"course_id": ""}, [("order", ASCENDING)]),
+    ("get_lessons", "lessons", {"course_id": ""}, [("order", ASCENDING)]),
+    ("get_sections (lessons)", "lessons", {"section_id": ""}, [("order", ASCENDING)]),
+    ("get_live_classes", "live_classes", {"course_id": ""}, [("scheduled_at", ASCENDING)]),
+    ("check_enrollment_status", "enrollments", {"user_id": "", "course_id": ""}, None),
+    ("get_my_courses", "enrollments", {"user_id": ""}, None),
+    ("get_quizzes", "quizzes", {"course_id": ""}, None),
+    ("check_certificate_eligibility", "quiz_results", {"user_id": "", "quiz_id": ""}, None),
+    ("check_payment_status", "payments", {"session_id": ""}, None),
+    ("get_analytics", "payments", {"payment_status": "paid"}, None),
+    ("get_analytics_timeseries", "daily_rollups", {"scope": "platform", "scope_id": None, "date": {"$gte": "", "$lte": ""}}, None),
+    ("validate_coupon", "coupons", {"code": ""}, None),
+    ("validate_coupon (usage)", "coupon_usage", {"coupon_id": "", "user_id": "", "course_id": ""}, None),
+    ("get_my_certificates", "certificates", {"user_id": ""}, None),
+    ("get_reviews", "reviews", {"course_id": ""}, None),
+    ("get_blog_posts", "blog_posts", {"status": "published"}, [("published_at", DESCENDING)]),
+    ("send_weekly_newsletter", "blog_posts", {"sent_to_subscribers": False, "category": "Newsletter"}, [("published_at", DESCENDING)]),
+    ("unsubscribe_newsletter", "email_subscriptions", {"unsubscribe_token": ""}, None),
+    ("send_weekly_newsletter (subscribers)", "email_subscriptions", {"subscribed": True}, [("_id", ASCENDING)]),
+]
+
+
+async def ensure_indexes(db):
+    """Create every registered index; conflicts are logged, not fatal"""
+    created = 0
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+                created += 1
+            except OperationFailure as e:
+                # Usually duplicate data under a unique index or an existing
+                # index with the same keys but different options
+                logger.warning(f"Could not create index {model.document['key']} on {collection}: {e}")
+    logger.info(f"Ensured {created} indexes across {len(INDEXES)} collections")
+    return created
+
+
+def _plan_stages(plan) -> list:
+    """Collect every 'stage' name in an explain plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def audit_indexes(db):
+    """Explain the canonical query of each route and report collection scans"""
+    report = []
+    for route, collection, query, sort in CANONICAL_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            explain = await cursor.explain()
+        except OperationFailure as e:
+            report.append({"route": route, "collection": collection, "error": str(e)})
+            continue
+
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        report.append({
+            "route": route,
+            "collection": collection,
+            "filter": sorted(query.keys()),
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+
+    collscans = [r for r in report if r.get("collscan")]
+    return {
+        "checked": len(report),
+        "collscan_count": len(collscans),
+        "collscans": [r["route"] for r in collscans],
+        "queries": report,
+    }
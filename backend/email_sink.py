@@ -0,0 +1,58 @@
+"""
+Local stand-in for SendGrid's mail/send endpoint
+Accepts v3 mail/send bodies, counts messages and recipients, and can inject
+latency and throttling so retries and throughput can be exercised offline.
+
+Usage:
+    uvicorn email_sink:app --port 8025
+    SENDGRID_API_BASE=http://localhost:8025 SENDGRID_API_KEY=SG.fake uvicorn server:app
+
+Environment:
+    EMAIL_SINK_LATENCY_MS   delay per request (default 60)
+    EMAIL_SINK_FAIL_RATE    fraction of requests answered 429/503 (default 0)
+"""
+
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+LATENCY = float(os.environ.get('EMAIL_SINK_LATENCY_MS', 60)) / 1000
+FAIL_RATE = float(os.environ.get('EMAIL_SINK_FAIL_RATE', 0))
+
+app = FastAPI(title="Email sink")
+counters = {"requests": 0, "accepted": 0, "recipients": 0, "throttled": 0}
+last_message = {}
+
+
+@app.post("/v3/mail/send")
+async def mail_send(request: Request):
+    await asyncio.sleep(LATENCY)
+    counters["requests"] += 1
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        return JSONResponse({"errors": [{"message": "Missing API key"}]}, status_code=401)
+    if random.random() < FAIL_RATE:
+        counters["throttled"] += 1
+        return JSONResponse({"errors": [{"message": "Too many requests"}]}, status_code=random.choice([429, 503]))
+
+    body = await request.json()
+    personalizations = body.get("personalizations", [])
+    if not personalizations or not body.get("from") or not body.get("content"):
+        return JSONResponse({"errors": [{"message": "Invalid mail body"}]}, status_code=400)
+    counters["accepted"] += 1
+    counters["recipients"] += sum(len(p.get("to", [])) for p in personalizations)
+    last_message.clear()
+    last_message.update(body)
+    return Response(status_code=202)
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+@app.get("/last")
+async def last():
+    return last_message
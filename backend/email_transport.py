@@ -0,0 +1,108 @@
+"""
+Async email transport for LearnHub
+Sends through SendGrid's v3 mail/send endpoint over one pooled httpx client
+created at startup, so emails never block the event loop and reuse keep-alive
+connections. 429 and 5xx responses and connection errors are retried with
+full-jitter exponential backoff, honouring Retry-After when SendGrid sends it.
+
+SENDGRID_API_BASE can point at email_sink.py to run without SendGrid.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+import asyncio
+import logging
+import random
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+SENDGRID_API_BASE = "https://api.sendgrid.com"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class EmailSendError(Exception):
+    def __init__(self, status_code: Optional[int], message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class EmailTransport:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        api_base: str = SENDGRID_API_BASE,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_connections: int = 20,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._client = httpx.AsyncClient(
+            base_url=api_base.rstrip("/"),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else None,
+            transport=transport
+        )
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def post_mail(self, payload: Dict[str, Any]) -> int:
+        """POST a raw v3 mail/send body; returns the status code or raises EmailSendError"""
+        if not self.configured:
+            raise EmailSendError(None, "SENDGRID_API_KEY is not configured")
+
+        for attempt in range(self.max_retries + 1):
+            last_try = attempt == self.max_retries
+            retry_after = None
+            try:
+                response = await self._client.post("/v3/mail/send", json=payload)
+            except httpx.TransportError as e:
+                if last_try:
+                    self.failed += 1
+                    raise EmailSendError(None, f"Email transport error: {e}")
+            else:
+                if response.status_code < 300:
+                    self.sent += 1
+                    return response.status_code
+                if last_try or response.status_code not in RETRY_STATUSES:
+                    self.failed += 1
+                    raise EmailSendError(response.status_code, f"SendGrid returned {response.status_code}: {response.text[:200]}")
+                retry_after = response.headers.get("retry-after")
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+    async def send(self, to: str, subject: str, html_content: str, from_email: str) -> int:
+        return await self.post_mail(mail_payload(from_email, subject, html_content, [{"to": [{"email": to}]}]))
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed, "retries": self.retries}
+
+
+def mail_payload(from_email: str, subject: str, html_content: str, personalizations: Iterable[dict]) -> dict:
+    return {
+        "personalizations": list(personalizations),
+        "from": {"email": from_email},
+        "subject": subject,
+        "content": [{"type": "text/html", "value": html_content}],
+    }
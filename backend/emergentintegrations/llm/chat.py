@@ -1,12 +1,30 @@
 """
 LLM Chat implementation using both OpenAI and Google Gemini.
+
+Provider clients come from a process-wide `ClientRegistry`, created lazily
+once per (provider, api_key) so requests reuse pooled HTTP connections instead
+of opening a new TLS session per message. Timeouts are configurable through
+LLM_TIMEOUT_SECONDS, LLM_MAX_CONNECTIONS and LLM_MAX_RETRIES, and the registry
+records per-provider latency.
+
+`LlmChat.stream_message` yields text as the provider produces it; point
+GROQ_BASE_URL or OPENAI_BASE_URL at fake_llm.py to exercise it offline.
 """
 
+from collections import deque
 from dataclasses import dataclass
-from typing import Optional
-from dataclasses import dataclass
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional, Tuple
 import os
+import time
+
+import anyio
+from cachetools import LRUCache
+
+OPENAI_COMPATIBLE_BASE_URLS = {
+    "openai": None,  # The SDK falls back to OPENAI_BASE_URL, then api.openai.com
+    "groq": os.environ.get('GROQ_BASE_URL', "https://api.groq.com/openai/v1"),
+}
+LATENCY_SAMPLES = 500
 
 
 @dataclass
@@ -15,16 +33,126 @@ class UserMessage:
     text: str
 
 
+class ProviderMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self._total = 0.0
+        self._recent = deque(maxlen=LATENCY_SAMPLES)
+        self._first_token = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self._total += seconds
+        self._recent.append(seconds)
+
+    def record_first_token(self, seconds: float):
+        self._first_token.append(seconds)
+
+    def stats(self) -> dict:
+        def pct(samples, p):
+            ordered = sorted(samples)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 1) if ordered else None
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self._total / self.calls * 1000, 1) if self.calls else None,
+            "p50_ms": pct(self._recent, 0.50),
+            "p95_ms": pct(self._recent, 0.95),
+            "p99_ms": pct(self._recent, 0.99),
+            "stream_first_token_p50_ms": pct(self._first_token, 0.50),
+            "stream_first_token_p95_ms": pct(self._first_token, 0.95),
+        }
+
+
+class ClientRegistry:
+    """One SDK client per (provider, api_key), created on first use"""
+
+    def __init__(self, timeout: float, max_connections: int, max_retries: int):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self._openai: Dict[Tuple[str, str], object] = {}
+        self._gemini_models = LRUCache(maxsize=64)
+        self._gemini_key: Optional[str] = None
+        self._metrics: Dict[str, ProviderMetrics] = {}
+
+    def openai_client(self, provider: str, api_key: str):
+        """AsyncOpenAI client for an OpenAI-compatible provider"""
+        client = self._openai.get((provider, api_key))
+        if client is None:
+            import httpx
+            import openai
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=OPENAI_COMPATIBLE_BASE_URLS[provider],
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections)
+                )
+            )
+            self._openai[(provider, api_key)] = client
+        return client
+
+    def gemini_model(self, api_key: str, model: str, system_message: str):
+        import google.generativeai as genai
+        if api_key != self._gemini_key:
+            # genai keeps its API key and transport globally; reconfigure only on change
+            genai.configure(api_key=api_key)
+            self._gemini_key = api_key
+            self._gemini_models.clear()
+        key = (model, system_message)
+        generative_model = self._gemini_models.get(key)
+        if generative_model is None:
+            generative_model = genai.GenerativeModel(
+                model_name=model,
+                system_instruction=system_message if system_message else None
+            )
+            self._gemini_models[key] = generative_model
+        return generative_model
+
+    def metrics(self, provider: str) -> ProviderMetrics:
+        return self._metrics.setdefault(provider, ProviderMetrics())
+
+    def record(self, provider: str, seconds: float, ok: bool):
+        self.metrics(provider).record(seconds, ok)
+
+    def stats(self) -> dict:
+        return {
+            "timeout": self.timeout,
+            "clients": len(self._openai) + (1 if self._gemini_key else 0),
+            "providers": {name: metrics.stats() for name, metrics in self._metrics.items()},
+        }
+
+    async def aclose(self):
+        for client in self._openai.values():
+            await client.close()
+        self._openai.clear()
+
+
+registry = ClientRegistry(
+    timeout=float(os.environ.get('LLM_TIMEOUT_SECONDS', 30)),
+    max_connections=int(os.environ.get('LLM_MAX_CONNECTIONS', 20)),
+    max_retries=int(os.environ.get('LLM_MAX_RETRIES', 1))
+)
+
+
 class LlmChat:
     """LLM Chat implementation supporting OpenAI and Google Gemini"""
-    
-    def __init__(self, api_key: str, session_id: str, system_message: str = ""):
+
+    def __init__(self, api_key: str, session_id: str = "", system_message: str = ""):
         self.api_key = api_key
         self.session_id = session_id
         self.system_message = system_message
         self.model = "gemini-1.5-flash"  # Default model
         self.provider = "google"
-    
+
     def with_model(self, provider: str, model: str) -> "LlmChat":
         """Set the model to use"""
         self.provider = provider
@@ -39,59 +167,83 @@ class LlmChat:
         }
         self.model = model_mapping.get(model, model)
         return self
-    
+
+    def _messages(self, message: UserMessage) -> list:
+        messages = []
+        if self.system_message:
+            messages.append({"role": "system", "content": self.system_message})
+        messages.append({"role": "user", "content": message.text})
+        return messages
+
     async def send_message(self, message: UserMessage) -> str:
         """Send a message and get response"""
+        if self.provider not in OPENAI_COMPATIBLE_BASE_URLS and self.provider != "google":
+            return f"Unsupported provider: {self.provider}"
+
+        started = time.perf_counter()
+        ok = False
         try:
-            if self.provider == "openai":
-                import openai
-                client = openai.AsyncOpenAI(api_key=self.api_key)
-                
-                messages = []
-                if self.system_message:
-                    messages.append({"role": "system", "content": self.system_message})
-                messages.append({"role": "user", "content": message.text})
-                
-                response = await client.chat.completions.create(
-                    model=self.model,
-                    messages=messages
-                )
-                
-                return response.choices[0].message.content
-            
-            elif self.provider == "google":
-                import google.generativeai as genai
-                genai.configure(api_key=self.api_key)
-                # Note: For Gemini 2.5, using the generativeai SDK
-                model = genai.GenerativeModel(
-                    model_name=self.model,
-                    system_instruction=self.system_message if self.system_message else None
-                )
-                
-                response = await model.generate_content_async(message.text)
-                return response.text
-            
-            elif self.provider == "groq":
-                # Groq is OpenAI-compatible
-                client = openai.AsyncOpenAI(
-                    api_key=self.api_key,
-                    base_url="https://api.groq.com/openai/v1"
+            if self.provider == "google":
+                model = registry.gemini_model(self.api_key, self.model, self.system_message)
+                response = await model.generate_content_async(
+                    message.text, request_options={"timeout": registry.timeout}
                 )
-                
-                messages = []
-                if self.system_message:
-                    messages.append({"role": "system", "content": self.system_message})
-                messages.append({"role": "user", "content": message.text})
-                
+                text = response.text
+            else:
+                # OpenAI and Groq share the OpenAI-compatible client
+                client = registry.openai_client(self.provider, self.api_key)
                 response = await client.chat.completions.create(
                     model=self.model,
-                    messages=messages
+                    messages=self._messages(message)
                 )
-                
-                return response.choices[0].message.content
-                
-            else:
-                return f"Unsupported provider: {self.provider}"
-                
+                text = response.choices[0].message.content
+            ok = True
+            return text
+
         except Exception as e:
             return f"AI service temporarily unavailable: {str(e)}"
+        finally:
+            registry.record(self.provider, time.perf_counter() - started, ok)
+
+    async def stream_message(self, message: UserMessage) -> AsyncIterator[str]:
+        """Yield response text as it arrives. Errors are raised, not returned as text.
+        Closing the generator early (e.g. the client went away) closes the upstream stream."""
+        if self.provider not in OPENAI_COMPATIBLE_BASE_URLS and self.provider != "google":
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+        metrics = registry.metrics(self.provider)
+        started = time.perf_counter()
+        first = True
+        ok = False
+        stream = None
+        try:
+            if self.provider == "google":
+                model = registry.gemini_model(self.api_key, self.model, self.system_message)
+                stream = await model.generate_content_async(
+                    message.text, stream=True, request_options={"timeout": registry.timeout}
+                )
+                chunks = (chunk.text async for chunk in stream)
+            else:
+                client = registry.openai_client(self.provider, self.api_key)
+                stream = await client.chat.completions.create(
+                    model=self.model,
+                    messages=self._messages(message),
+                    stream=True
+                )
+                chunks = (chunk.choices[0].delta.content async for chunk in stream if chunk.choices)
+
+            async for text in chunks:
+                if not text:
+                    continue
+                if first:
+                    metrics.record_first_token(time.perf_counter() - started)
+                    first = False
+                yield text
+            ok = True
+        finally:
+            metrics.record(time.perf_counter() - started, ok)
+            close = getattr(stream, "close", None)
+            if close is not None:
+                # Runs during cancellation too, so shield it or the close never happens
+                with anyio.CancelScope(shield=True):
+                    await close()
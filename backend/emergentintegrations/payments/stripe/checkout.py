@@ -1,11 +1,113 @@
 """
-Stripe Checkout stub implementation using stripe directly.
+Stripe Checkout stub implementation using the Stripe REST API directly.
 This replaces the emergentintegrations Stripe checkout functionality.
+
+Requests go through a `StripeHTTPClient`, an httpx connection pool meant to be
+created once at startup and shared, so checkout calls never block the event
+loop and reuse keep-alive connections. Point `api_base` at fake_stripe.py to
+exercise checkout offline.
 """
 
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
-import stripe
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import urlencode
+import asyncio
+import random
+import uuid
+
+import httpx
+
+API_BASE = "https://api.stripe.com"
+
+
+class StripeAPIError(Exception):
+    """Non-2xx response from Stripe"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def encode_form(params: Dict[str, Any], prefix: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Flatten nested params into Stripe's bracketed form encoding"""
+    pairs = []
+    for key, value in params.items():
+        name = f"{prefix}[{key}]" if prefix else key
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            pairs.extend(encode_form(value, name))
+        elif isinstance(value, (list, tuple)):
+            for i, item in enumerate(value):
+                if isinstance(item, dict):
+                    pairs.extend(encode_form(item, f"{name}[{i}]"))
+                else:
+                    pairs.append((f"{name}[{i}]", str(item)))
+        elif isinstance(value, bool):
+            pairs.append((name, "true" if value else "false"))
+        else:
+            pairs.append((name, str(value)))
+    return pairs
+
+
+class StripeHTTPClient:
+    """Pooled async transport for the Stripe API.
+    Retries connection errors, 409, 429 and 5xx with jittered backoff; POSTs
+    carry an Idempotency-Key so a retry never creates a second session."""
+
+    RETRY_STATUSES = {409, 429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        api_base: str = API_BASE,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_connections: int = 50,
+        max_retries: int = 2,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.max_retries = max_retries
+        self._client = httpx.AsyncClient(
+            base_url=api_base.rstrip("/"),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+
+    async def request(self, method: str, path: str, api_key: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {api_key}"}
+        body = None
+        if method == "POST":
+            headers["Idempotency-Key"] = str(uuid.uuid4())
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            body = urlencode(encode_form(params or {}))
+
+        for attempt in range(self.max_retries + 1):
+            last_try = attempt == self.max_retries
+            try:
+                response = await self._client.request(
+                    method, path, headers=headers, content=body,
+                    params=encode_form(params) if params and method == "GET" else None
+                )
+            except httpx.TransportError:
+                if last_try:
+                    raise
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                if last_try or response.status_code not in self.RETRY_STATUSES:
+                    raise StripeAPIError(response.status_code, _error_message(response))
+            await asyncio.sleep(min(2.0, 0.25 * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        return response.json()["error"]["message"]
+    except Exception:
+        return f"Stripe returned HTTP {response.status_code}"
 
 
 @dataclass
@@ -35,14 +137,28 @@ class CheckoutStatusResponse:
 
 class StripeCheckout:
     """Stripe Checkout implementation"""
-    
-    def __init__(self, api_key: str, webhook_url: str = ""):
+
+    def __init__(self, api_key: str, webhook_url: str = "", client: Optional[StripeHTTPClient] = None):
         self.api_key = api_key
         self.webhook_url = webhook_url
-        stripe.api_key = api_key
-    
+        # Callers should pass the shared client. Without one, this instance opens
+        # a private pool and must be closed (aclose or `async with`) to release it.
+        self._owns_client = client is None
+        self.client = client or StripeHTTPClient()
+
+    async def aclose(self):
+        """Close the private client, if this instance created one"""
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def __aenter__(self) -> "StripeCheckout":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
     async def create_checkout_session(
-        self, 
+        self,
         request: CheckoutSessionRequest,
         instructor_stripe_account_id: Optional[str] = None
     ) -> CheckoutSessionResponse:
@@ -50,7 +166,7 @@ class StripeCheckout:
         try:
             # Convert amount to cents
             amount_cents = int(request.amount * 100)
-            
+
             # Prepare checkout session parameters
             session_params = {
                 "payment_method_types": ["card"],
@@ -69,12 +185,12 @@ class StripeCheckout:
                 "cancel_url": request.cancel_url,
                 "metadata": request.metadata,
             }
-            
+
             # Add payment splitting if instructor has Stripe account connected
             if instructor_stripe_account_id:
                 # Calculate platform fee (10%)
                 platform_fee_cents = int(amount_cents * 0.10)
-                
+
                 # Configure payment to split: 90% to instructor, 10% to platform
                 session_params["payment_intent_data"] = {
                     "application_fee_amount": platform_fee_cents,
@@ -82,30 +198,32 @@ class StripeCheckout:
                         "destination": instructor_stripe_account_id
                     }
                 }
-            
-            session = stripe.checkout.Session.create(**session_params)
-            
+
+            session = await self.client.request("POST", "/v1/checkout/sessions", self.api_key, session_params)
+
             return CheckoutSessionResponse(
-                session_id=session.id,
-                url=session.url
+                session_id=session["id"],
+                url=session["url"]
             )
         except Exception as e:
             raise Exception(f"Failed to create checkout session: {str(e)}")
-    
+
+    async def retrieve_session(self, session_id: str) -> Dict[str, Any]:
+        """Raw checkout session object"""
+        return await self.client.request("GET", f"/v1/checkout/sessions/{session_id}", self.api_key)
+
     async def get_checkout_status(self, session_id: str) -> CheckoutStatusResponse:
         """Get the status of a checkout session"""
         try:
-            session = stripe.checkout.Session.retrieve(session_id)
-            # Ensure metadata is a standard dict
-            metadata = dict(session.metadata) if session.metadata else {}
+            session = await self.retrieve_session(session_id)
             return CheckoutStatusResponse(
-                payment_status=session.payment_status,
+                payment_status=session["payment_status"],
                 session_id=session_id,
-                metadata=metadata
+                metadata=session.get("metadata") or {}
             )
         except Exception as e:
             raise Exception(f"Failed to get checkout status: {str(e)}")
-    
+
     async def handle_webhook(self, body: bytes, signature: str) -> Dict[str, Any]:
         """Handle Stripe webhook"""
         # For now, just return success
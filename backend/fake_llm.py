@@ -0,0 +1,86 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API
+Answers POST /v1/chat/completions with a canned reply, either in one JSON body
+or as a `stream=true` SSE stream with a configurable time to first token and
+per-token delay. Streams the client abandons are counted as cancelled.
+
+Usage:
+    uvicorn fake_llm:app --port 8040
+    GROQ_BASE_URL=http://localhost:8040/v1 GROQ_API_KEY=fake uvicorn server:app
+
+Environment:
+    FAKE_LLM_FIRST_TOKEN_MS   delay before the first token (default 400)
+    FAKE_LLM_TOKEN_MS         delay between tokens (default 20)
+    FAKE_LLM_TOKENS           tokens per reply (default 120)
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FIRST_TOKEN = float(os.environ.get('FAKE_LLM_FIRST_TOKEN_MS', 400)) / 1000
+TOKEN_DELAY = float(os.environ.get('FAKE_LLM_TOKEN_MS', 20)) / 1000
+TOKENS = int(os.environ.get('FAKE_LLM_TOKENS', 120))
+
+app = FastAPI(title="Fake LLM")
+counters = {"requests": 0, "streams": 0, "completed": 0, "cancelled": 0, "tokens_sent": 0}
+
+
+def reply_tokens() -> list:
+    return [f"word{i} " for i in range(TOKENS)]
+
+
+def completion(model: str, **fields) -> dict:
+    return {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": model, **fields}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    counters["requests"] += 1
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        return JSONResponse({"error": {"message": "Missing API key"}}, status_code=401)
+    body = await request.json()
+    model = body.get("model", "fake")
+
+    if not body.get("stream"):
+        # The whole reply is generated before anything is returned
+        await asyncio.sleep(FIRST_TOKEN + TOKEN_DELAY * (TOKENS - 1))
+        counters["completed"] += 1
+        counters["tokens_sent"] += TOKENS
+        return completion(model, object="chat.completion", choices=[{
+            "index": 0, "finish_reason": "stop",
+            "message": {"role": "assistant", "content": "".join(reply_tokens())},
+        }])
+
+    async def chunks():
+        counters["streams"] += 1
+        finished = False
+        try:
+            await asyncio.sleep(FIRST_TOKEN)
+            for i, token in enumerate(reply_tokens()):
+                if i:
+                    await asyncio.sleep(TOKEN_DELAY)
+                chunk = completion(model, object="chat.completion.chunk", choices=[{
+                    "index": 0, "finish_reason": None, "delta": {"content": token},
+                }])
+                yield f"data: {json.dumps(chunk)}\n\n"
+                counters["tokens_sent"] += 1
+            last = completion(model, object="chat.completion.chunk",
+                              choices=[{"index": 0, "finish_reason": "stop", "delta": {}}])
+            yield f"data: {json.dumps(last)}\n\n"
+            yield "data: [DONE]\n\n"
+            finished = True
+        finally:
+            counters["completed" if finished else "cancelled"] += 1
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def stats():
+    return counters
@@ -0,0 +1,83 @@
+"""
+Local stand-in for the Stripe Checkout API
+Implements just enough of /v1/checkout/sessions to drive LearnHub's checkout
+flow and load tests without network access or a Stripe account. Sessions live
+in memory; every request waits FAKE_STRIPE_LATENCY_MS to mimic the real round
+trip.
+
+Usage:
+    uvicorn fake_stripe:app --port 12111
+    STRIPE_API_BASE=http://localhost:12111 STRIPE_SECRET_KEY=sk_test_fake uvicorn server:app
+"""
+
+from typing import Any, Dict
+import asyncio
+import os
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.environ.get('FAKE_STRIPE_LATENCY_MS', 80)) / 1000
+
+app = FastAPI(title="Fake Stripe")
+sessions: Dict[str, dict] = {}
+
+
+def decode_form(pairs) -> Dict[str, Any]:
+    """Inverse of Stripe's bracketed form encoding; list indices become dict keys"""
+    result: Dict[str, Any] = {}
+    for name, value in pairs:
+        keys = re.findall(r"[^\[\]]+", name)
+        node = result
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = value
+    return result
+
+
+def _error(status_code: int, message: str) -> JSONResponse:
+    return JSONResponse({"error": {"type": "invalid_request_error", "message": message}}, status_code=status_code)
+
+
+@app.middleware("http")
+async def simulate_latency(request: Request, call_next):
+    await asyncio.sleep(LATENCY)
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        return _error(401, "You did not provide an API key.")
+    return await call_next(request)
+
+
+@app.post("/v1/checkout/sessions")
+async def create_session(request: Request):
+    params = decode_form((await request.form()).multi_items())
+    line_item = params.get("line_items", {}).get("0", {})
+    session_id = f"cs_test_{uuid.uuid4().hex}"
+    session = {
+        "id": session_id,
+        "object": "checkout.session",
+        "amount_total": int(line_item.get("price_data", {}).get("unit_amount", 0)) * int(line_item.get("quantity", 1)),
+        "currency": line_item.get("price_data", {}).get("currency", "usd"),
+        "created": int(time.time()),
+        "metadata": params.get("metadata", {}),
+        "mode": params.get("mode", "payment"),
+        "payment_intent": f"pi_test_{uuid.uuid4().hex[:24]}",
+        # Sessions are reported paid straight away so the status poll completes
+        "payment_status": "paid",
+        "status": "complete",
+        "success_url": params.get("success_url"),
+        "cancel_url": params.get("cancel_url"),
+        "url": f"https://checkout.stripe.com/c/pay/{session_id}",
+    }
+    sessions[session_id] = session
+    return session
+
+
+@app.get("/v1/checkout/sessions/{session_id}")
+async def retrieve_session(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        return _error(404, f"No such checkout.session: '{session_id}'")
+    return session
@@ -0,0 +1,76 @@
+"""
+Leases for LearnHub's background jobs
+Every uvicorn worker resumes unfinished jobs at startup, so a job document must
+be claimed before it runs. `claim` takes ownership atomically when the job is
+unowned or its lease has expired (the owner died); `held` renews the lease while
+the job runs and gives it up afterwards. A worker that loses its lease stops.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=LEASE_SECONDS)
+
+
+async def claim(collection, job_id: str, statuses: list) -> Optional[dict]:
+    """Take the job if it is in one of `statuses` and nobody holds a live lease.
+    Returns the job document, or None if another worker owns it."""
+    return await collection.find_one_and_update(
+        {
+            "id": job_id,
+            "status": {"$in": statuses},
+            "$or": [
+                {"owner": None},
+                {"owner": WORKER_ID},
+                {"lease_until": {"$lt": datetime.now(timezone.utc)}},
+            ],
+        },
+        {"$set": {"owner": WORKER_ID, "lease_until": _expiry()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+@asynccontextmanager
+async def held(collection, job_id: str):
+    """Keep renewing a claimed lease for the duration of the block"""
+    job_task = asyncio.current_task()
+
+    async def renew():
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                result = await collection.update_one(
+                    {"id": job_id, "owner": WORKER_ID}, {"$set": {"lease_until": _expiry()}}
+                )
+            except Exception as e:
+                logger.error(f"Could not renew lease on job {job_id}: {e}")
+                continue
+            if not result.matched_count:
+                logger.error(f"Lost lease on job {job_id}; stopping")
+                job_task.cancel()
+                return
+
+    renewer = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        renewer.cancel()
+        await collection.update_one(
+            {"id": job_id, "owner": WORKER_ID}, {"$set": {"owner": None, "lease_until": None}}
+        )
@@ -0,0 +1,92 @@
+"""
+Request-scoped batch loaders for LearnHub
+DataLoader-style lookups by id: every load() issued in the same event loop
+tick is collapsed into a single `$in` query, and results are memoized for
+the rest of the request.
+"""
+
+from typing import Dict, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """Batches and caches single-key lookups against one collection"""
+
+    def __init__(self, collection, projection: Optional[dict] = None, key: str = "id"):
+        self._collection = collection
+        self._projection = projection or {"_id": 0}
+        self._key = key
+        self._cache: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+
+    def load(self, key: str) -> "asyncio.Future":
+        """Return a future resolving to the document (or None) for key"""
+        if key in self._cache:
+            return self._cache[key]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+        self._queue.append(key)
+        if len(self._queue) == 1:
+            # First key this tick: dispatch once the caller has queued the rest
+            loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        return future
+
+    async def load_many(self, keys: List[str]) -> List[Optional[dict]]:
+        """Resolve several keys with a single round trip"""
+        return list(await asyncio.gather(*(self.load(k) for k in keys)))
+
+    def prime(self, doc: dict):
+        """Seed the cache with a document fetched elsewhere"""
+        key = doc.get(self._key)
+        if key is not None and key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(doc)
+            self._cache[key] = future
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        try:
+            docs = await self._collection.find(
+                {self._key: {"$in": keys}}, self._projection
+            ).to_list(len(keys))
+        except Exception as e:
+            logger.error(f"Batch load failed for {len(keys)} keys: {e}")
+            for key in keys:
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_key = {doc.get(self._key): doc for doc in docs}
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(by_key.get(key))
+
+
+class Loaders:
+    """The set of loaders shared by one request"""
+
+    def __init__(self, db, course_card_projection: Optional[dict] = None):
+        self.users = BatchLoader(db.users, {"_id": 0, "password": 0})
+        self.instructors = BatchLoader(db.instructors, {"_id": 0})
+        self.courses = BatchLoader(db.courses, {"_id": 0})
+        # Same collection, narrower projection; cached separately from full docs
+        self.course_cards = BatchLoader(db.courses, course_card_projection)
+
+    async def instructor_users(self, instructor_ids: List[str]) -> Dict[str, dict]:
+        """Map instructor id -> user document in two queries"""
+        instructors = await self.instructors.load_many(list(dict.fromkeys(instructor_ids)))
+        instructors = [i for i in instructors if i and i.get("user_id")]
+        users = await self.users.load_many(list(dict.fromkeys(i["user_id"] for i in instructors)))
+        users_by_id = {u["id"]: u for u in users if u}
+        return {
+            i["id"]: users_by_id[i["user_id"]]
+            for i in instructors
+            if i["user_id"] in users_by_id
+        }
@@ -1,16 +1,32 @@
 """
 Newsletter system for LearnHub
 Handles subscriptions, AI blog generation, and weekly email distribution
+
+Distribution runs as a background job recorded in `newsletter_runs`.
+Subscribers are streamed in _id order and sent in SendGrid batches of up to
+1000 personalizations, each carrying its own unsubscribe link. A bounded
+number of batches are in flight under a rate cap, and the run checkpoints
+the last _id below which every batch has finished, so a restarted process
+resumes from there. Anything past the checkpoint may be sent twice on resume:
+batches in flight at a crash, and when a batch fails, the up to CONCURRENCY-1
+later batches that had already gone out (up to 3000 recipients by default).
 """
 
 from pydantic import EmailStr
 from datetime import datetime, timezone
 from emergentintegrations.llm.chat import LlmChat, UserMessage
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from markdown_it import MarkdownIt
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import html
 import logging
 import re
 import os
+import time
+import uuid
+
+import email_transport
+import leases
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +40,9 @@ def slugify(text: str) -> str:
     return text
 
 
-async def generate_weekly_blog(db):
-    """Generate AI blog post about featured course"""
+async def generate_weekly_blog(db, responses=None):
+    """Generate AI blog post about featured course.
+    `responses` is the public ResponseCache; its "blog" entries are dropped once the post is saved."""
     try:
         # Get most popular/latest published course
         popular_course = await db.courses.find_one(
@@ -95,9 +112,13 @@ Length: 400-500 words
             "published_at": datetime.now(timezone.utc).isoformat(),
             "created_at": datetime.now(timezone.utc).isoformat()
         }
+        blog_doc["newsletter_html"] = compile_newsletter_html(blog_doc)
+        blog_doc["newsletter_template_version"] = TEMPLATE_VERSION
         
         # Save to database
         await db.blog_posts.insert_one(blog_doc)
+        if responses is not None:
+            await responses.invalidate("blog")
         
         logger.info(f"Generated blog post: {title}")
         return blog_doc
@@ -107,90 +128,285 @@ Length: 400-500 words
         return None
 
 
-async def send_newsletter_email(blog_post, subscriber_email, unsubscribe_token):
-    """Send newsletter email to a single subscriber"""
-    try:
-        frontend_url = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
-        course_url = f"{frontend_url}/courses/{blog_post['course_id']}" if blog_post.get('course_id') else frontend_url
-        unsubscribe_url = f"{frontend_url}/unsubscribe?token={unsubscribe_token}"
-        
-        # Create HTML email
-        html_content = f"""
-<!DOCTYPE html>
+# ==================== RENDERING ====================
+# The issue is compiled once per blog post and stored on it as newsletter_html;
+# the only per-recipient part is the unsubscribe link, left as UNSUBSCRIBE_TAG.
+UNSUBSCRIBE_TAG = "-unsubscribe_url-"  # Also used as the SendGrid substitution tag
+TEMPLATE_VERSION = 1  # Bump to recompile stored newsletter_html
+
+_markdown = MarkdownIt("commonmark", {"html": False})
+
+# Email clients drop <style> blocks unevenly, so every element carries its own
+INLINE_STYLES = {
+    "h1": "color: #1F2937; font-size: 24px; margin: 24px 0 12px;",
+    "h2": "color: #1F2937; font-size: 20px; margin: 24px 0 12px;",
+    "h3": "color: #1F2937; font-size: 17px; margin: 20px 0 8px;",
+    "p": "color: #374151; margin: 0 0 16px;",
+    "ul": "color: #374151; margin: 0 0 16px; padding-left: 24px;",
+    "ol": "color: #374151; margin: 0 0 16px; padding-left: 24px;",
+    "li": "margin: 0 0 6px;",
+    "a": "color: #4F46E5;",
+    "blockquote": "border-left: 4px solid #E5E7EB; margin: 0 0 16px; padding: 4px 16px; color: #6B7280;",
+    "code": "background: #F3F4F6; border-radius: 4px; padding: 2px 4px; font-size: 90%;",
+    "pre": "background: #F3F4F6; border-radius: 6px; padding: 12px; overflow-x: auto;",
+    "img": "max-width: 100%; height: auto; border-radius: 8px;",
+    "hr": "border: 0; border-top: 1px solid #E5E7EB; margin: 24px 0;",
+}
+
+
+def unsubscribe_url(unsubscribe_token: str) -> str:
+    frontend_url = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
+    return f"{frontend_url}/unsubscribe?token={unsubscribe_token}"
+
+
+def markdown_to_email_html(text: str) -> str:
+    """CommonMark to HTML with inline styles; raw HTML in the source is escaped"""
+    tokens = _markdown.parse(text)
+    
+    def add_styles(tokens):
+        for token in tokens:
+            if token.nesting != -1 and token.tag in INLINE_STYLES:
+                token.attrSet("style", INLINE_STYLES[token.tag])
+            if token.children:
+                add_styles(token.children)
+    
+    add_styles(tokens)
+    return _markdown.renderer.render(tokens, _markdown.options, {})
+
+
+def compile_newsletter_html(blog_post) -> str:
+    """Full newsletter for a blog post, with UNSUBSCRIBE_TAG where the recipient's link goes"""
+    frontend_url = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
+    course_url = f"{frontend_url}/courses/{blog_post['course_id']}" if blog_post.get('course_id') else frontend_url
+    cover = ""
+    if blog_post.get('cover_image'):
+        cover = (f'<img src="{html.escape(blog_post["cover_image"])}" alt="Course thumbnail" '
+                 f'style="max-width: 100%; height: auto; border-radius: 8px; margin: 20px 0;">')
+    
+    return f"""<!DOCTYPE html>
 <html>
-<head>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 0; }}
-        .container {{ max-width: 600px; margin: 0 auto; }}
-        .header {{ background: #4F46E5; color: white; padding: 30px 20px; text-align: center; }}
-        .header h1 {{ margin: 0; font-size: 28px; }}
-        .content {{ padding: 30px 20px; background: #ffffff; }}
-        .content h2 {{ color: #1F2937; margin-top: 0; }}
-        .content img {{ max-width: 100%; height: auto; border-radius: 8px; margin: 20px 0; }}
-        .cta-button {{ 
-            display: inline-block; 
-            background: #4F46E5; 
-            color: white !important; 
-            padding: 14px 28px; 
-            text-decoration: none; 
-            border-radius: 6px; 
-            margin: 20px 0;
-            font-weight: bold;
-        }}
-        .footer {{ background: #F3F4F6; padding: 20px; text-align: center; font-size: 12px; color: #6B7280; }}
-        .footer a {{ color: #4F46E5; text-decoration: none; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📚 LearnHub Weekly</h1>
+<head><meta charset="utf-8"></head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 0;">
+    <div style="max-width: 600px; margin: 0 auto;">
+        <div style="background: #4F46E5; color: white; padding: 30px 20px; text-align: center;">
+            <h1 style="margin: 0; font-size: 28px;">📚 LearnHub Weekly</h1>
             <p style="margin: 5px 0 0 0; opacity: 0.9;">Insights for Lifelong Learners</p>
         </div>
-        
-        <div class="content">
-            <h2>{blog_post['title']}</h2>
-            
-            {f'<img src="{blog_post["cover_image"]}" alt="Course thumbnail">' if blog_post.get('cover_image') else ''}
-            
+        <div style="padding: 30px 20px; background: #ffffff;">
+            <h2 style="color: #1F2937; margin-top: 0;">{html.escape(blog_post['title'])}</h2>
+            {cover}
             <div style="color: #374151;">
-                {blog_post['content'].replace(chr(10), '<br>')}
+                {markdown_to_email_html(blog_post['content'])}
             </div>
-            
             <div style="text-align: center; margin-top: 30px;">
-                <a href="{course_url}" class="cta-button">Explore This Course →</a>
+                <a href="{html.escape(course_url)}" style="display: inline-block; background: #4F46E5; color: white !important; padding: 14px 28px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold;">Explore This Course →</a>
             </div>
         </div>
-        
-        <div class="footer">
+        <div style="background: #F3F4F6; padding: 20px; text-align: center; font-size: 12px; color: #6B7280;">
             <p>You're receiving this because you subscribed to LearnHub newsletter.</p>
-            <p><a href="{unsubscribe_url}">Unsubscribe</a> | <a href="{frontend_url}">Visit LearnHub</a></p>
+            <p><a href="{UNSUBSCRIBE_TAG}" style="color: #4F46E5; text-decoration: none;">Unsubscribe</a> | <a href="{html.escape(frontend_url)}" style="color: #4F46E5; text-decoration: none;">Visit LearnHub</a></p>
             <p>© 2026 LearnHub. All rights reserved.</p>
         </div>
     </div>
 </body>
 </html>
 """
-        
-        # Send via SendGrid
-        sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-        message = Mail(
-            from_email=os.environ.get('SENDGRID_FROM_EMAIL', 'newsletter@learnhub.com'),
-            to_emails=subscriber_email,
-            subject=f"📚 {blog_post['title']}",
-            html_content=html_content
+
+
+def personalizer(newsletter_html: str):
+    """Function of an unsubscribe token returning that recipient's HTML.
+    The compiled body is split once, so each call is a single concatenation."""
+    head, _, tail = newsletter_html.partition(UNSUBSCRIBE_TAG)
+    link_prefix = unsubscribe_url("")
+    return lambda unsubscribe_token: f"{head}{link_prefix}{unsubscribe_token}{tail}"
+
+
+async def ensure_newsletter_html(db, blog_post) -> str:
+    """Stored newsletter_html for the post, compiling and saving it if missing or outdated"""
+    if blog_post.get('newsletter_html') and blog_post.get('newsletter_template_version') == TEMPLATE_VERSION:
+        return blog_post['newsletter_html']
+    newsletter_html = compile_newsletter_html(blog_post)
+    await db.blog_posts.update_one(
+        {"id": blog_post['id']},
+        {"$set": {"newsletter_html": newsletter_html, "newsletter_template_version": TEMPLATE_VERSION}}
+    )
+    blog_post['newsletter_html'] = newsletter_html
+    blog_post['newsletter_template_version'] = TEMPLATE_VERSION
+    return newsletter_html
+
+
+# ==================== DISTRIBUTION ====================
+MAX_PERSONALIZATIONS = 1000  # SendGrid's per-request limit
+BATCH_SIZE = min(int(os.environ.get('NEWSLETTER_BATCH_SIZE', MAX_PERSONALIZATIONS)), MAX_PERSONALIZATIONS)
+CONCURRENCY = int(os.environ.get('NEWSLETTER_CONCURRENCY', 4))
+BATCHES_PER_SECOND = float(os.environ.get('NEWSLETTER_BATCHES_PER_SECOND', 2))
+
+ACTIVE = ["queued", "running"]
+
+# Running dispatch tasks, kept referenced so they aren't garbage collected
+_tasks = set()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/per_second apart"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1 / per_second if per_second > 0 else 0
+        self._next = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        delay = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _subscriber_batches(db, after):
+    """Subscribed addresses in _id order, after the checkpoint, BATCH_SIZE at a time"""
+    query = {"subscribed": True}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    batch = []
+    cursor = db.email_subscriptions.find(query, {"email": 1, "unsubscribe_token": 1}).sort("_id", 1)
+    async for subscription in cursor.batch_size(BATCH_SIZE):
+        batch.append(subscription)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _batch_payload(batch, subject, html_content, from_email):
+    link_prefix = unsubscribe_url("")
+    personalizations = [
+        {
+            "to": [{"email": subscription['email']}],
+            "substitutions": {UNSUBSCRIBE_TAG: link_prefix + subscription['unsubscribe_token']}
+        }
+        for subscription in batch
+    ]
+    return email_transport.mail_payload(from_email, subject, html_content, personalizations)
+
+
+async def _dispatch(db, mailer, run):
+    blog = await db.blog_posts.find_one({"id": run['blog_id']}, {"_id": 0})
+    if not blog:
+        raise ValueError(f"Blog post {run['blog_id']} not found")
+    
+    # Identical for every recipient apart from the substituted unsubscribe link
+    html_content = await ensure_newsletter_html(db, blog)
+    subject = f"📚 {blog['title']}"
+    from_email = os.environ.get('SENDGRID_FROM_EMAIL', 'newsletter@learnhub.com')
+    
+    limiter = _RateLimiter(BATCHES_PER_SECOND)
+    slots = asyncio.Semaphore(CONCURRENCY)
+    totals = {"sent": run.get('sent', 0), "batches": run.get('batches', 0)}
+    last_ids = {}   # batch seq -> last subscriber _id in it
+    finished = {}   # batch seq -> recipients sent, until checkpointed
+    checkpoint = {"seq": 0, "cursor": run.get('cursor')}
+    in_flight = set()
+    errors = []
+    
+    async def send_batch(seq, batch):
+        try:
+            # A batch that still fails after the transport's retries fails the run below,
+            # so the checkpoint never moves past subscribers who weren't mailed
+            await mailer.post_mail(_batch_payload(batch, subject, html_content, from_email))
+            finished[seq] = len(batch)
+            
+            # The checkpoint only moves past a batch once every earlier batch is done
+            advanced = False
+            while checkpoint["seq"] in finished:
+                totals["sent"] += finished.pop(checkpoint["seq"])
+                totals["batches"] += 1
+                checkpoint["cursor"] = last_ids.pop(checkpoint["seq"])
+                checkpoint["seq"] += 1
+                advanced = True
+            if advanced:
+                await db.newsletter_runs.update_one(
+                    {"id": run['id']},
+                    {"$set": {**totals, "cursor": checkpoint["cursor"], "updated_at": _now()}}
+                )
+        except Exception as e:
+            if isinstance(e, email_transport.EmailSendError):
+                logger.error(f"Newsletter run {run['id']}: batch of {len(batch)} failed: {e}")
+            # Recorded before the slot is released so no further batches start
+            errors.append(e)
+        finally:
+            slots.release()
+    
+    seq = 0
+    async for batch in _subscriber_batches(db, run.get('cursor')):
+        await slots.acquire()
+        if errors:
+            slots.release()
+            break
+        await limiter.wait()
+        last_ids[seq] = batch[-1]['_id']
+        task = asyncio.create_task(send_batch(seq, batch))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        seq += 1
+    await asyncio.gather(*in_flight)
+    if errors:
+        # Leave the checkpoint where it is; the run fails and can be resumed
+        raise errors[0]
+    
+    await db.blog_posts.update_one(
+        {"id": blog['id']},
+        {"$set": {"sent_to_subscribers": True, "email_sent_count": totals["sent"]}}
+    )
+    return totals
+
+
+async def _run(db, mailer, run):
+    async with leases.held(db.newsletter_runs, run['id']):
+        await db.newsletter_runs.update_one(
+            {"id": run['id']}, {"$set": {"status": "running", "started_at": run.get('started_at') or _now()}}
         )
-        
-        sg.send(message)
-        return True
-        
-    except Exception as e:
-        logger.error(f"Failed to send email to {subscriber_email}: {e}")
+        try:
+            totals = await _dispatch(db, mailer, run)
+        except Exception as e:
+            logger.error(f"Newsletter run {run['id']} failed: {e}")
+            await db.newsletter_runs.update_one(
+                {"id": run['id']},
+                {"$set": {"status": "failed", "error": str(e), "finished_at": _now()}, "$unset": {"active": ""}}
+            )
+            return
+        await db.newsletter_runs.update_one(
+            {"id": run['id']},
+            {"$set": {"status": "completed", "finished_at": _now()}, "$unset": {"active": ""}}
+        )
+    logger.info(f"Newsletter run {run['id']} sent to {totals['sent']} subscribers")
+
+
+async def _claim_and_spawn(db, mailer, run_id) -> bool:
+    """Start a run unless another worker already holds it"""
+    run = await leases.claim(db.newsletter_runs, run_id, ACTIVE)
+    if not run:
         return False
+    task = asyncio.create_task(_run(db, mailer, run))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return True
+
+
+async def _active_run(db, blog_id):
+    return await db.newsletter_runs.find_one({"blog_id": blog_id, "status": {"$in": ACTIVE}}, {"_id": 0})
+
 
+def _already_sending(run):
+    return {"message": "Newsletter is already being sent", "run_id": run['id'], "sent": run.get('sent', 0)}
 
-async def send_weekly_newsletter(db):
-    """Send latest blog to all subscribers"""
+
+async def send_weekly_newsletter(db, mailer):
+    """Start sending the latest unsent blog to all subscribers in the background"""
     try:
         # Get latest unsent blog post
         blog = await db.blog_posts.find_one(
@@ -202,38 +418,66 @@ async def send_weekly_newsletter(db):
             logger.info("No new newsletter to send")
             return {"message": "No newsletter to send", "sent": 0}
         
-        # Get all subscribed emails
-        subscriptions = await db.email_subscriptions.find(
-            {"subscribed": True}
-        ).to_list(10000)
-        
-        if not subscriptions:
-            logger.info("No subscribers found")
-            return {"message": "No subscribers", "sent": 0}
+        existing = await _active_run(db, blog['id'])
+        if existing:
+            return _already_sending(existing)
         
-        # Send to all subscribers
-        sent_count = 0
-        for subscription in subscriptions:
-            success = await send_newsletter_email(
-                blog, 
-                subscription['email'], 
-                subscription['unsubscribe_token']
+        # Queued/running runs carry active: true, which is unique per blog (partial
+        # index), so concurrent requests can't both start one; the loser reports
+        # the winner's run
+        try:
+            failed = await db.newsletter_runs.find_one_and_update(
+                {"blog_id": blog['id'], "status": "failed"},
+                {"$set": {"status": "queued", "active": True, "error": None}},
+                projection={"_id": 0},
+                sort=[("created_at", -1)]
             )
-            if success:
-                sent_count += 1
-        
-        # Mark as sent
-        await db.blog_posts.update_one(
-            {"id": blog['id']},
-            {"$set": {
-                "sent_to_subscribers": True,
-                "email_sent_count": sent_count
-            }}
-        )
+            if failed:
+                # Retry a failed run from its checkpoint rather than mailing everyone again
+                if not await _claim_and_spawn(db, mailer, failed['id']):
+                    return _already_sending(failed)
+                logger.info(f"Newsletter run {failed['id']} retrying from checkpoint")
+                return {"message": "Newsletter sending resumed", "run_id": failed['id'], "sent": failed.get('sent', 0)}
+            
+            run = {
+                "id": str(uuid.uuid4()),
+                "blog_id": blog['id'],
+                "status": "queued",
+                "active": True,
+                "cursor": None,
+                "sent": 0,
+                "batches": 0,
+                "error": None,
+                "owner": None,
+                "created_at": _now(),
+            }
+            await db.newsletter_runs.insert_one(dict(run))
+        except DuplicateKeyError:
+            existing = await _active_run(db, blog['id'])
+            return _already_sending(existing) if existing else {"message": "Newsletter is already being sent", "sent": 0}
+        if not await _claim_and_spawn(db, mailer, run['id']):
+            # Another worker's startup resume picked it up first
+            return _already_sending(run)
         
-        logger.info(f"Newsletter sent to {sent_count}/{len(subscriptions)} subscribers")
-        return {"message": f"Sent to {sent_count} subscribers", "sent": sent_count}
+        logger.info(f"Newsletter run {run['id']} started for blog {blog['id']}")
+        return {"message": "Newsletter sending started", "run_id": run['id'], "sent": 0}
         
     except Exception as e:
         logger.error(f"Failed to send newsletter: {e}")
         return {"error": str(e)}
+
+
+async def resume_newsletter_runs(db, mailer) -> int:
+    """Continue runs a previous process left queued or running from their checkpoint.
+    Runs still leased by another live worker are left to it."""
+    # Runs queued before the active flag existed aren't covered by its unique index
+    await db.newsletter_runs.update_many(
+        {"status": {"$in": ACTIVE}, "active": {"$exists": False}}, {"$set": {"active": True}}
+    )
+    resumed = 0
+    async for run in db.newsletter_runs.find({"status": {"$in": ACTIVE}}, {"_id": 0, "id": 1}):
+        if await _claim_and_spawn(db, mailer, run['id']):
+            resumed += 1
+    if resumed:
+        logger.info(f"Resumed {resumed} newsletter run(s)")
+    return resumed
@@ -0,0 +1,108 @@
+"""
+Keyset (cursor) pagination helpers for LearnHub list endpoints
+A cursor encodes the sort key values of the last row served, so the next
+page is an index range scan instead of an ever-growing skip.
+"""
+
+from typing import Any, Optional, Tuple
+import base64
+import json
+
+# Sort name -> (field, direction). Every sort is tie-broken on the unique "id"
+# in the same direction, which keeps page boundaries stable.
+CATALOG_SORTS = {
+    "newest": ("created_at", -1),
+    "price": ("price", 1),
+    "rating": ("course_stats.rating_avg", -1),
+    "popularity": ("course_stats.enrollment_count", -1),
+}
+
+# Text-search relevance can't be expressed as a range filter ($meta is sort-only),
+# so relevance pages use an offset cursor instead of a keyset cursor.
+RELEVANCE_SORT = "relevance"
+RELEVANCE_SORT_SPEC = [("score", {"$meta": "textScore"}), ("id", 1)]
+# Relevance order for title-prefix search results, which have no text score
+PREFIX_SORT_SPEC = [("title", 1), ("id", 1)]
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when an `after` cursor cannot be decoded"""
+
+
+def sort_spec(sort: str) -> list:
+    if sort == RELEVANCE_SORT:
+        return RELEVANCE_SORT_SPEC
+    field, direction = CATALOG_SORTS[sort]
+    return [(field, direction), ("id", direction)]
+
+
+def get_path(doc: dict, path: str) -> Any:
+    """Read a dotted field path from a document"""
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def encode_cursor(doc: dict, sort: str) -> str:
+    field, _ = CATALOG_SORTS[sort]
+    payload = json.dumps([sort, get_path(doc, field), doc["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if cursor_sort != sort:
+        raise InvalidCursor("Cursor was issued for a different sort")
+    return value, last_id
+
+
+def encode_offset_cursor(offset: int) -> str:
+    payload = json.dumps([RELEVANCE_SORT, offset], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_offset_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, offset = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if cursor_sort != RELEVANCE_SORT or not isinstance(offset, int) or offset < 0:
+        raise InvalidCursor("Cursor was issued for a different sort")
+    return offset
+
+
+def keyset_filter(sort: str, value: Any, last_id: str) -> dict:
+    """Rows strictly after (value, last_id) in the given sort order"""
+    field, direction = CATALOG_SORTS[sort]
+    op = "$gt" if direction == 1 else "$lt"
+    if value is None:
+        # Null/missing sorts lowest: first in ascending order, last in descending
+        after_nulls = [{field: {"$ne": None}}] if direction == 1 else []
+        return {"$or": after_nulls + [{field: None, "id": {op: last_id}}]}
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "id": {op: last_id}},
+    ]}
+
+
+def paginate_query(query: dict, sort: str, after: Optional[str]) -> dict:
+    """Return a copy of query restricted to rows after the cursor"""
+    if not after:
+        return query
+    value, last_id = decode_cursor(after, sort)
+    paged = dict(query)
+    paged["$and"] = list(query.get("$and", [])) + [keyset_filter(sort, value, last_id)]
+    return paged
@@ -0,0 +1,81 @@
+"""
+Password hashing off the event loop for LearnHub
+bcrypt is deliberately slow (~200 ms per call at the default cost), so hashing
+and verification run on a small dedicated thread pool; bcrypt releases the GIL
+while it works. Admission is bounded: once every worker is busy and the wait
+queue is full, new calls fail fast with `HasherSaturated` instead of piling
+up, and the route turns that into a 429.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+from passlib.context import CryptContext
+
+
+class HasherSaturated(Exception):
+    """Every worker is busy and the queue is full"""
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext, workers: int, max_queue: int):
+        self._context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0  # Running plus queued
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def _submit(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HasherSaturated()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        submitted = time.perf_counter()
+        started = None
+
+        def timed():
+            nonlocal started
+            started = time.perf_counter()
+            return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self.in_flight -= 1
+            if started is not None:
+                self.completed += 1
+                self._wait_total += started - submitted
+                self._run_total += time.perf_counter() - started
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self._context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self._context.verify, password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._wait_total / self.completed * 1000, 2) if self.completed else None,
+            "avg_hash_ms": round(self._run_total / self.completed * 1000, 2) if self.completed else None,
+        }
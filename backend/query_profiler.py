@@ -0,0 +1,244 @@
+"""
+Per-request database query profiler for LearnHub
+Wraps the Motor database handle, records every operation issued while a
+request is being served, and flags repeated filter shapes as N+1 patterns.
+"""
+
+from collections import deque, Counter
+from contextvars import ContextVar
+from typing import Optional
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Same (operation, collection, filter shape) this many times in one request = N+1
+N_PLUS_ONE_THRESHOLD = 3
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("query_profile", default=None)
+
+# Most recent profiled requests, newest last
+recent_requests: deque = deque(maxlen=200)
+
+
+def filter_shape(value):
+    """Replace literal values with type names so filters can be grouped"""
+    if isinstance(value, dict):
+        return {k: filter_shape(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [filter_shape(v) for v in value[:1]] if value else []
+    return type(value).__name__
+
+
+class RequestProfile:
+    """Operations recorded while serving a single request"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.queries = []
+
+    def record(self, op: str, collection: str, query, duration: float, docs: Optional[int]):
+        self.queries.append({
+            "op": op,
+            "collection": collection,
+            "shape": repr(filter_shape(query or {})),
+            "duration_ms": round(duration * 1000, 2),
+            "docs": docs,
+        })
+
+    def n_plus_one(self) -> list:
+        counts = Counter((q["op"], q["collection"], q["shape"]) for q in self.queries)
+        return [
+            {"op": op, "collection": collection, "shape": shape, "count": count}
+            for (op, collection, shape), count in counts.items()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def summary(self, status_code: int) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": status_code,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "query_count": len(self.queries),
+            "db_time_ms": round(sum(q["duration_ms"] for q in self.queries), 2),
+            "n_plus_one": self.n_plus_one(),
+            "queries": self.queries,
+        }
+
+
+def _record(op, collection, query, started, docs):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(op, collection, query, time.perf_counter() - started, docs)
+
+
+def _doc_count(op: str, result) -> Optional[int]:
+    if op == "find_one" or op.startswith("find_one_and"):
+        return 1 if result else 0
+    if op in ("count_documents", "estimated_document_count"):
+        return result
+    if op == "distinct":
+        return len(result)
+    return None
+
+
+class ProfiledCursor:
+    """Cursor proxy that records the query when results are materialized"""
+
+    def __init__(self, cursor, op: str, collection: str, query):
+        self._cursor = cursor
+        self._op = op
+        self._collection = collection
+        self._query = query
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name in ("sort", "limit", "skip", "batch_size", "hint", "max_time_ms"):
+            def chain(*args, **kwargs):
+                attr(*args, **kwargs)
+                return self
+            return chain
+        return attr
+
+    async def to_list(self, length=None):
+        started = time.perf_counter()
+        docs = await self._cursor.to_list(length)
+        _record(self._op, self._collection, self._query, started, len(docs))
+        return docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        started = time.perf_counter()
+        count = 0
+        try:
+            async for doc in self._cursor:
+                count += 1
+                yield doc
+        finally:
+            _record(self._op, self._collection, self._query, started, count)
+
+
+class ProfiledCollection:
+    """Collection proxy that times every awaited operation"""
+
+    _AWAITABLE_OPS = {
+        "find_one", "count_documents", "estimated_document_count", "distinct",
+        "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+        "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete",
+        "find_one_and_replace", "bulk_write",
+    }
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in self._AWAITABLE_OPS:
+            async def timed(*args, **kwargs):
+                query = args[0] if args and isinstance(args[0], dict) else kwargs.get("filter")
+                started = time.perf_counter()
+                result = await attr(*args, **kwargs)
+                _record(name, self._collection.name, query, started, _doc_count(name, result))
+                return result
+            return timed
+        if name in ("find", "aggregate"):
+            def cursor(*args, **kwargs):
+                query = args[0] if args else kwargs.get("filter", kwargs.get("pipeline"))
+                if name == "aggregate":
+                    query = {"pipeline": [list(stage.keys())[0] for stage in query or []]}
+                return ProfiledCursor(attr(*args, **kwargs), name, self._collection.name, query)
+            return cursor
+        return attr
+
+
+class ProfiledDatabase:
+    """Database proxy returning profiled collections"""
+
+    def __init__(self, database):
+        self._database = database
+        self._collections = {}
+
+    def _wrap(self, name: str) -> ProfiledCollection:
+        if name not in self._collections:
+            self._collections[name] = ProfiledCollection(self._database[name])
+        return self._collections[name]
+
+    def __getitem__(self, name: str):
+        return self._wrap(name)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attr = getattr(self._database, name)
+        # Motor returns collections for unknown attributes; methods pass through
+        if callable(attr) and not hasattr(attr, "find_one"):
+            return attr
+        return self._wrap(name)
+
+
+class QueryProfilerMiddleware:
+    """ASGI middleware that profiles DB usage per request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+        status_code = 500
+
+        async def send_with_header(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.lower().encode(), str(len(profile.queries)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _current_profile.reset(token)
+            if profile.queries:
+                summary = profile.summary(status_code)
+                recent_requests.append(summary)
+                if summary["n_plus_one"]:
+                    logger.warning(
+                        f"N+1 detected on {profile.method} {profile.path}: "
+                        f"{[(p['collection'], p['count']) for p in summary['n_plus_one']]}"
+                    )
+
+
+def get_report(path: Optional[str] = None, n_plus_one_only: bool = False, limit: int = 50) -> dict:
+    """Recent request profiles plus per-route aggregates"""
+    requests = [r for r in recent_requests if not path or r["path"].startswith(path)]
+    if n_plus_one_only:
+        requests = [r for r in requests if r["n_plus_one"]]
+
+    routes = {}
+    for r in requests:
+        key = f"{r['method']} {r['path']}"
+        route = routes.setdefault(key, {"requests": 0, "queries": 0, "db_time_ms": 0.0, "n_plus_one": 0})
+        route["requests"] += 1
+        route["queries"] += r["query_count"]
+        route["db_time_ms"] = round(route["db_time_ms"] + r["db_time_ms"], 2)
+        route["n_plus_one"] += 1 if r["n_plus_one"] else 0
+    for route in routes.values():
+        route["avg_queries"] = round(route["queries"] / route["requests"], 2)
+
+    return {
+        "threshold": N_PLUS_ONE_THRESHOLD,
+        "routes": routes,
+        "requests": list(reversed(requests))[:limit],
+    }
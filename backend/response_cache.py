@@ -0,0 +1,130 @@
+"""
+HTTP response cache for LearnHub's public read endpoints
+Anonymous GETs to the routes in CACHED_ROUTES are served from stored,
+already-serialized bodies with a strong ETag; `If-None-Match` is answered with
+304. Entries are tagged (e.g. "courses", "course:<id>") and write routes drop
+exactly the tags they affect.
+"""
+
+from typing import Iterable, Optional
+import hashlib
+import re
+
+# (path regex, tag templates); named groups fill the templates
+CACHED_ROUTES = [
+    (re.compile(r"^/api/courses$"), ["courses"]),
+    (re.compile(r"^/api/courses/(?P<id>[^/]+)$"), ["course:{id}"]),
+    (re.compile(r"^/api/reviews/(?P<id>[^/]+)$"), ["reviews:{id}"]),
+    (re.compile(r"^/api/reviews/(?P<id>[^/]+)/average$"), ["reviews:{id}"]),
+    (re.compile(r"^/api/blog/posts$"), ["blog"]),
+    (re.compile(r"^/api/instructors$"), ["instructors"]),
+]
+
+CACHE_HEADER = "X-Cache"
+
+
+def route_tags(path: str) -> Optional[list]:
+    for pattern, templates in CACHED_ROUTES:
+        match = pattern.match(path)
+        if match:
+            return [t.format(**match.groupdict()) for t in templates]
+    return None
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """Stored responses on a cache_backend namespace, so workers can share them"""
+
+    def __init__(self, namespace):
+        self._entries = namespace
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await self._entries.get(key)
+
+    async def set(self, key: str, entry: dict, tags: Iterable[str]):
+        await self._entries.set(key, entry, tags)
+
+    async def invalidate(self, *tags: str):
+        await self._entries.invalidate(*tags)
+
+    async def clear(self):
+        await self._entries.clear()
+
+
+class ResponseCacheMiddleware:
+    """Pure ASGI middleware so cache hits never reach routing or the database"""
+
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        tags = route_tags(scope["path"])
+        headers = dict((k.decode().lower(), v.decode()) for k, v in scope.get("headers", []))
+        query = scope.get("query_string", b"").decode()
+        # Responses can differ per user, so only anonymous requests are shared
+        if tags is None or "authorization" in headers or "token=" in query:
+            await self.app(scope, receive, send)
+            return
+
+        key = scope["path"] + "?" + "&".join(sorted(query.split("&")))
+        entry = await self.cache.get(key)
+        if entry is not None:
+            await self._send_cached(send, entry, headers.get("if-none-match"), "HIT")
+            return
+
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._finish(send, key, tags, start, b"".join(chunks), headers.get("if-none-match"))
+
+        await self.app(scope, receive, capture)
+
+    async def _finish(self, send, key, tags, start, body, if_none_match):
+        if start.get("status") != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+        content_type = dict(start.get("headers", [])).get(b"content-type", b"application/json")
+        # Kept as text so any backend can serialize the entry
+        entry = {"body": body.decode(), "etag": make_etag(body), "content_type": content_type.decode()}
+        await self.cache.set(key, entry, tags)
+        await self._send_cached(send, entry, if_none_match, "MISS")
+
+    async def _send_cached(self, send, entry, if_none_match, outcome):
+        headers = [
+            (b"etag", entry["etag"].encode()),
+            (b"cache-control", b"public, no-cache"),
+            (CACHE_HEADER.lower().encode(), outcome.encode()),
+        ]
+        if etag_matches(if_none_match, entry["etag"]):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        body = entry["body"].encode()
+        headers += [
+            (b"content-type", entry["content_type"].encode()),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,16 +1,16 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, BackgroundTasks, File, UploadFile
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, BackgroundTasks, File, UploadFile, Query
 print("Starting LearnHub Backend...")
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import FileResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, RedirectResponse, Response
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 import os
 import json
-import tempfile
 
 import logging
 from pathlib import Path
+from urllib.parse import quote
 from dotenv import load_dotenv
 import bcrypt
 import dns.resolver
@@ -31,28 +31,56 @@ import uuid
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
 from jose import jwt, JWTError
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail  
+from emergentintegrations.llm.chat import LlmChat, UserMessage, registry as llm_clients
+from emergentintegrations.payments.stripe.checkout import StripeCheckout, StripeHTTPClient, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
 import base64
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph
-import io
+import asyncio
 import stripe
 import newsletter  # Newsletter module for weekly emails
+import db_indexes  # Index registry and COLLSCAN audit
+import query_profiler  # Per-request DB profiling and N+1 detection
+from loaders import Loaders  # Request-scoped batched lookups by id
+import pagination  # Keyset cursors for list endpoints
+import course_stats  # Materialized per-course counters
+import course_search  # Indexed title-prefix fallback for catalog search
+import analytics  # $group totals and daily rollups
+import cascade  # Background cascade deletes
+import caches  # Metered in-process TTL caches
+import cache_backend  # Memory or Redis, selected by CACHE_BACKEND
+import auth_tokens  # Versioned identity claims
+import course_access  # Cached admin/owner/enrolled resolution
+from course_access import CourseAccess
+import response_cache  # ETag'd cache for anonymous public GETs
+from static_uploads import ImmutableStaticFiles  # Immutable, range-capable /uploads
+import certificate_store  # Size-capped store of rendered certificate PDFs
+import certificate_render  # reportlab template and rendering process pool
+import password_hashing  # Bounded bcrypt thread pool
+import email_transport  # Pooled async SendGrid client
+import ai_streaming  # text/event-stream AI responses
 # Bcrypt compatibility patch for passlib
 import bcrypt
 if not hasattr(bcrypt, "__about__"):
     bcrypt.__about__ = type('About', (object,), {'__version__': bcrypt.__version__})
 
-# Set Stripe key
+# Set Stripe key (used by the SDK for Connect OAuth)
 stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 
+# One keep-alive pool for all checkout traffic; STRIPE_API_BASE can point at fake_stripe.py
+stripe_client = StripeHTTPClient(
+    api_base=os.environ.get('STRIPE_API_BASE', 'https://api.stripe.com'),
+    timeout=float(os.environ.get('STRIPE_TIMEOUT_SECONDS', 10)),
+    max_connections=int(os.environ.get('STRIPE_MAX_CONNECTIONS', 50))
+)
+
+# Shared by reset emails, notifications and the newsletter; SENDGRID_API_BASE can point at email_sink.py
+mailer = email_transport.EmailTransport(
+    api_key=os.environ.get('SENDGRID_API_KEY'),
+    api_base=os.environ.get('SENDGRID_API_BASE', email_transport.SENDGRID_API_BASE),
+    timeout=float(os.environ.get('EMAIL_TIMEOUT_SECONDS', 10)),
+    max_connections=int(os.environ.get('EMAIL_MAX_CONNECTIONS', 20)),
+    max_retries=int(os.environ.get('EMAIL_MAX_RETRIES', 3))
+)
+
 ROOT_DIR = Path(__file__).parent
 
 # MongoDB connection
@@ -61,8 +89,19 @@ db_name = os.environ.get('DB_NAME', 'learnhub')
 client = AsyncIOMotorClient(mongo_url)
 db = client[db_name]
 
+# Wrap the handle so every query is attributed to the request that issued it.
+# Off by default: it adds per-query overhead; set QUERY_PROFILER_ENABLED=true to diagnose
+QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'false').lower() == 'true'
+if QUERY_PROFILER_ENABLED:
+    db = query_profiler.ProfiledDatabase(db)
+
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = password_hashing.PasswordHasher(
+    pwd_context,
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 4)),
+    max_queue=int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+)
 security = HTTPBearer()
 
 # JWT Settings
@@ -70,14 +109,39 @@ JWT_SECRET = os.environ.get('JWT_SECRET')
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Shared by the response, outline and identity caches; CACHE_BACKEND=redis
+# lets every worker see the same entries
+shared_cache = cache_backend.from_env()
+
+# Serialized public GET responses, dropped by tag from the write routes
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+public_responses = response_cache.ResponseCache(
+    cache_backend.CacheNamespace(shared_cache, "responses", ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 60)))
+)
+
+
+async def invalidate_course_responses(course_id: str):
+    """Drop cached catalog pages and the course's own detail response"""
+    await public_responses.invalidate("courses", f"course:{course_id}")
+
+# Current token_version per user, refreshed from Mongo in the background
+token_versions = auth_tokens.TokenVersions(
+    refresh_interval=float(os.environ.get('TOKEN_VERSION_REFRESH_SECONDS', 30))
+)
+
+# Authenticated user lookups; entries are dropped by the routes that change a user
+identity_cache = cache_backend.CacheNamespace(
+    shared_cache, "identity", ttl=float(os.environ.get('IDENTITY_CACHE_TTL', 60))
+)
+
 # Commission
 ADMIN_COMMISSION = float(os.environ.get('ADMIN_COMMISSION', 0.15))
 
 # Create the main app
 app = FastAPI(title="LearnHub API")
 
-# Mount Uploads directory for static access
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Mount Uploads directory for static access (immutable uuid filenames, Range support)
+app.mount("/uploads", ImmutableStaticFiles(directory="uploads"), name="uploads")
 
 api_router = APIRouter(prefix="/api")
 
@@ -142,6 +206,30 @@ class Course(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class CourseCard(BaseModel):
+    """The subset of Course a catalog card renders (list endpoints with ?view=card)"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    instructor_id: str
+    title: str
+    description: str
+    category: str
+    price: float
+    discount_price: Optional[float] = None
+    thumbnail: Optional[str] = None
+    status: str = "draft"
+    difficulty_level: str = "Beginner"
+    language: str = "English"
+    is_featured: bool = False
+    course_stats: Optional[Dict[str, Any]] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+# Enforced at the query level so faqs/requirements/outcomes/meta never leave Mongo
+COURSE_CARD_PROJECTION = {"_id": 0, **{field: 1 for field in CourseCard.model_fields}}
+COURSE_VIEWS = {"card": COURSE_CARD_PROJECTION, "full": {"_id": 0, "title_words": 0}}
+
+
 class Section(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -319,12 +407,26 @@ class ResetPasswordRequest(BaseModel):
 
 
 # ==================== UTILITIES ====================
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def _password_backpressure() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many sign-in requests, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except password_hashing.HasherSaturated:
+        raise _password_backpressure()
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except password_hashing.HasherSaturated:
+        raise _password_backpressure()
 
 
 def create_access_token(data: dict):
@@ -334,25 +436,21 @@ def create_access_token(data: dict):
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
+def issue_token(user_doc: dict) -> str:
+    """Access token carrying the identity claims get_current_user authorizes on"""
+    return create_access_token(auth_tokens.identity_claims(user_doc))
+
+
 async def send_reset_email(email: str, token: str):
-    print(f"DEBUG: Entering send_reset_email for {email}")
+    logger.debug(f"Sending password reset email to {email}")
     try:
         frontend_url = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
         reset_link = f"{frontend_url}/reset-password?token={token}"
-        
-        # CLEARLY PRINT THE LINK TO THE CONSOLE FOR THE USER
-        print("\n" + "="*50)
-        print(f"PASSWORD RESET LINK FOR: {email}")
-        print(reset_link)
-        print("="*50 + "\n")
-        
-        logger.info(f"Password Reset Link generated: {reset_link}")
+        # The link carries a live reset token, so only log it at debug level
+        logger.debug(f"Password reset link for {email}: {reset_link}")
 
         api_key = os.environ.get('SENDGRID_API_KEY')
         sender = os.environ.get('SENDER_EMAIL')
-        
-        print(f"DEBUG: SendGrid API Key exists: {bool(api_key)}")
-        print(f"DEBUG: Sender Email: {sender}")
 
         if not api_key:
             logger.warning("SendGrid API Key (SENDGRID_API_KEY) is missing from environment variables. Skipping email send.")
@@ -362,10 +460,10 @@ async def send_reset_email(email: str, token: str):
             logger.warning("Sender Email (SENDER_EMAIL) is missing from environment variables. Skipping email send.")
             return
 
-        message = Mail(
-            from_email=sender,
-            to_emails=email,
+        status_code = await mailer.send(
+            to=email,
             subject='Reset Your LearnHub Password',
+            from_email=sender,
             html_content=f"""
                 <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #e5e7eb; border-radius: 8px;">
                     <h1 style="color: #1e40af; font-size: 24px;">Reset Your Password</h1>
@@ -378,29 +476,73 @@ async def send_reset_email(email: str, token: str):
             """
         )
         
-        sg = SendGridAPIClient(api_key)
-        response = sg.send(message)
-        
-        print(f"DEBUG: SendGrid Response Status Code: {response.status_code}")
-        print(f"DEBUG: SendGrid Response Body: {response.body}")
-        logger.info(f"Password reset email sent to {email}. Status: {response.status_code}")
+        logger.info(f"Password reset email sent to {email}. Status: {status_code}")
     except Exception as e:
         logger.error(f"Failed to send reset email: {str(e)}")
-        print(f"DEBUG: SendGrid ERROR: {str(e)}")
+
+
+async def load_identity_doc(user_id: str) -> Optional[dict]:
+    """Active user document, served from identity_cache when possible"""
+    async def load_user_doc():
+        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+        if not user_doc or user_doc.get('deleted_at') or not user_doc.get('is_active', True):
+            return None
+        return user_doc
+    
+    return await identity_cache.get_or_load(user_id, load_user_doc)
+
+
+async def load_identity(user_id: str) -> Optional[User]:
+    """User for an authenticated request, or None if deleted or deactivated"""
+    user_doc = await load_identity_doc(user_id)
+    return User(**user_doc) if user_doc else None
+
+
+async def user_from_token(payload: dict) -> Optional[User]:
+    """Resolve the caller from access-token claims, or None if the token is revoked"""
+    user_id = payload.get("sub")
+    if not user_id or payload.get("type") == "reset":
+        return None
+    
+    version = payload.get(auth_tokens.VERSION_CLAIM)
+    if version is None:
+        # Issued before tokens carried claims: valid only until the user's first revocation
+        user_doc = await load_identity_doc(user_id)
+        if not user_doc or max(user_doc.get('token_version', 0), token_versions.current(user_id)) > 0:
+            return None
+        return User(**user_doc)
+    
+    current = token_versions.current(user_id)
+    if version < current:
+        return None
+    if version > current:
+        # Bumped through another worker since our last refresh
+        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "token_version": 1, "deleted_at": 1})
+        if not user_doc or user_doc.get('deleted_at') or user_doc.get('token_version', 0) != version:
+            return None
+        token_versions.observe(user_id, version)
+    
+    if not payload.get(auth_tokens.ACTIVE_CLAIM, True):
+        return None
+    return User.model_construct(**auth_tokens.user_fields(payload))
+
+
+async def revoke_tokens(user_id: str):
+    await token_versions.bump(db, user_id)
+    await identity_cache.delete(user_id)
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
+        if not payload.get("sub"):
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-        if not user_doc:
+        user = await user_from_token(payload)
+        if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        return User(**user_doc)
+        return user
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -419,36 +561,42 @@ async def get_optional_user(request: Request):
             return None
             
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
-            return None
-        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-        if not user_doc:
-            return None
-        return User(**user_doc)
+        return await user_from_token(payload)
     except Exception:
         return None
 
 
+access_resolver = course_access.AccessResolver(
+    db,
+    maxsize=int(os.environ.get('ACCESS_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('ACCESS_CACHE_TTL', 30))
+)
+
+
+async def get_course_access(course_id: str, current_user: Optional[User] = Depends(get_optional_user)) -> CourseAccess:
+    """Caller's access to the course in the path; memoized per request by FastAPI"""
+    return await access_resolver.resolve(current_user, course_id)
+
+
+async def get_loaders() -> Loaders:
+    """Fresh batch loaders per request (FastAPI caches dependencies per request)"""
+    return Loaders(db, course_card_projection=COURSE_CARD_PROJECTION)
+
+
+def course_projection(view: str) -> dict:
+    """Motor projection for a ?view=card|full list parameter"""
+    if view not in COURSE_VIEWS:
+        raise HTTPException(status_code=400, detail=f"view must be one of: {', '.join(COURSE_VIEWS)}")
+    return dict(COURSE_VIEWS[view])
+
+
 async def check_enrollment_status(user_id: str, course_id: str) -> bool:
-    enrollment = await db.enrollments.find_one({
-        "user_id": user_id, 
-        "course_id": course_id,
-        "status": {"$in": ["active", "completed"]}
-    })
-    return enrollment is not None
+    return await access_resolver.is_enrolled(user_id, course_id)
 
 
 async def send_email(to: str, subject: str, content: str):
     try:
-        message = Mail(
-            from_email=os.getenv('SENDER_EMAIL'),
-            to_emails=to,
-            subject=subject,
-            html_content=content
-        )
-        sg = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        sg.send(message)
+        await mailer.send(to=to, subject=subject, html_content=content, from_email=os.getenv('SENDER_EMAIL'))
     except Exception as e:
         logging.error(f"Email sending failed: {str(e)}")
 
@@ -462,7 +610,7 @@ async def register(user_data: UserCreate):
     
     user_dict = user_data.model_dump()
     password = user_dict.pop("password")
-    hashed_pw = hash_password(password)
+    hashed_pw = await hash_password(password)
     
     user = User(**user_dict)
     
@@ -477,6 +625,7 @@ async def register(user_data: UserCreate):
     user_doc['created_at'] = user_doc['created_at'].isoformat()
     
     await db.users.insert_one(user_doc)
+    await analytics.record_signup(db)
     
     # AUTO-CREATE INSTRUCTOR DOCUMENT if user registers as instructor
     if requested_role == "instructor":
@@ -490,15 +639,17 @@ async def register(user_data: UserCreate):
         await db.instructors.insert_one(instructor_doc)
         logger.info(f"Created pending instructor profile for user {user.id}")
     
-    token = create_access_token({"sub": user.id, "role": user.role})
+    token = issue_token(user.model_dump())
     return {"token": token, "user": user}
 
 
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     user_doc = await db.users.find_one({"email": credentials.email})
-    if not user_doc or not verify_password(credentials.password, user_doc.get('password', '')):
+    if not user_doc or user_doc.get('deleted_at') or not await verify_password(credentials.password, user_doc.get('password', '')):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not user_doc.get('is_active', True):
+        raise HTTPException(status_code=403, detail="Account deactivated")
     
     user = User(**{k: v for k, v in user_doc.items() if k != 'password'})
     
@@ -511,21 +662,18 @@ async def login(credentials: UserLogin):
     else:
         user.id = user_doc['id']
         
-    token = create_access_token({"sub": user.id, "role": user.role})
+    token = issue_token({**user_doc, "id": user.id})
     return {"token": token, "user": user}
 
 
 @api_router.post("/auth/forgot-password")
 async def forgot_password(data: ForgotPasswordRequest, background_tasks: BackgroundTasks):
-    print(f"DEBUG: Forgot Password requested for: {data.email}")
     user_doc = await db.users.find_one({"email": data.email})
     
     if not user_doc:
-        print(f"DEBUG: User NOT found in database: {data.email}")
+        logger.debug(f"Password reset requested for unknown email {data.email}")
         return {"message": "If an account exists with this email, a reset link has been sent."}
     
-    print(f"DEBUG: User found: {user_doc.get('id')} - {user_doc.get('email')}")
-    
     # Create a short-lived reset token (1 hour)
     reset_data = {"sub": user_doc["id"], "type": "reset"}
     expire = datetime.now(timezone.utc) + timedelta(hours=1)
@@ -533,13 +681,11 @@ async def forgot_password(data: ForgotPasswordRequest, background_tasks: Backgro
     
     try:
         reset_token = jwt.encode(reset_data, JWT_SECRET, algorithm=JWT_ALGORITHM)
-        print("DEBUG: Reset token generated successfully")
     except Exception as e:
-        print(f"DEBUG: TOKEN GENERATION FAILED: {str(e)}")
+        logger.error(f"Reset token generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Token generation failed")
     
     background_tasks.add_task(send_reset_email, data.email, reset_token)
-    print("DEBUG: Background task 'send_reset_email' scheduled")
     
     return {"message": "If an account exists with this email, a reset link has been sent."}
 
@@ -555,8 +701,9 @@ async def reset_password(data: ResetPasswordRequest):
         if not user_id:
             raise HTTPException(status_code=400, detail="Invalid token")
             
-        hashed_pw = hash_password(data.new_password)
+        hashed_pw = await hash_password(data.new_password)
         await db.users.update_one({"id": user_id}, {"$set": {"password": hashed_pw}})
+        await revoke_tokens(user_id)
         
         return {"message": "Password reset successfully. You can now log in."}
     except JWTError:
@@ -565,7 +712,11 @@ async def reset_password(data: ResetPasswordRequest):
 
 @api_router.get("/auth/me")
 async def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+    # Token claims don't include bio/profile_image, so return the full profile
+    user = await load_identity(current_user.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
 
 
 @api_router.patch("/users/profile")
@@ -577,28 +728,39 @@ async def update_profile(updates: dict, current_user: User = Depends(get_current
         raise HTTPException(status_code=400, detail="No valid fields to update")
     
     await db.users.update_one({"id": current_user.id}, {"$set": update_data})
+    await identity_cache.delete(current_user.id)
     
     # Sync bio with instructor profile if it exists
     if "bio" in update_data:
         await db.instructors.update_one({"user_id": current_user.id}, {"$set": {"bio": update_data["bio"]}})
+    await public_responses.clear()  # Names and bios are embedded in course, review and instructor responses
     
-    return {"message": "Profile updated successfully"}
+    # Re-issue so the name claim matches; older tokens stay valid
+    token = issue_token({
+        **current_user.model_dump(), **update_data,
+        "token_version": token_versions.current(current_user.id)
+    })
+    return {"message": "Profile updated successfully", "token": token}
 
 
 @api_router.patch("/users/profile/password")
 async def update_password(data: PasswordUpdate, current_user: User = Depends(get_current_user)):
     user_doc = await db.users.find_one({"id": current_user.id})
-    if not user_doc or not verify_password(data.old_password, user_doc.get('password', '')):
+    if not user_doc or not await verify_password(data.old_password, user_doc.get('password', '')):
         raise HTTPException(status_code=400, detail="Incorrect old password")
     
-    hashed_pw = hash_password(data.new_password)
+    hashed_pw = await hash_password(data.new_password)
     await db.users.update_one({"id": current_user.id}, {"$set": {"password": hashed_pw}})
     
-    return {"message": "Password updated successfully"}
+    # Sign out every other session; this one continues with a fresh token
+    version = await token_versions.bump(db, current_user.id)
+    token = issue_token({**current_user.model_dump(), "token_version": version})
+    return {"message": "Password updated successfully", "token": token}
 
 
 @api_router.get("/users/profile/{user_id}")
-async def get_public_profile(user_id: str):
+async def get_public_profile(user_id: str, view: str = "full"):
+    projection = course_projection(view)
     user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
     if not user_doc:
         logger.error(f"Public Profile lookup failed: User {user_id} not found")
@@ -609,10 +771,10 @@ async def get_public_profile(user_id: str):
     if user_doc.get('role') in ['instructor', 'admin']:
         instructor = await db.instructors.find_one({"user_id": user_id})
         if instructor:
-            courses = await db.courses.find({"instructor_id": instructor['id'], "status": "published"}, {"_id": 0}).to_list(100)
+            courses = await db.courses.find({"instructor_id": instructor['id'], "status": "published"}, projection).to_list(100)
         elif user_doc.get('role') == 'admin':
             # Handle admin as instructor case if needed
-            courses = await db.courses.find({"status": "published"}, {"_id": 0}).to_list(10) # Just some courses for admin
+            courses = await db.courses.find({"status": "published"}, projection).to_list(10) # Just some courses for admin
 
     return {**user_doc, "courses": courses}
 
@@ -628,6 +790,8 @@ async def apply_instructor(bio: str, current_user: User = Depends(get_current_us
     doc = instructor.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.instructors.insert_one(doc)
+    access_resolver.invalidate_user(current_user.id)
+    await public_responses.invalidate("instructors")
     
     # role remains student until admin approves
     
@@ -658,12 +822,15 @@ async def approve_instructor(instructor_id: str, approved: bool, current_user: U
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Instructor not found")
+    await public_responses.invalidate("instructors")
         
     # Promote user to instructor role if approved
     if approved:
         instructor = await db.instructors.find_one({"id": instructor_id})
         if instructor:
             await db.users.update_one({"id": instructor['user_id']}, {"$set": {"role": "instructor"}})
+            await revoke_tokens(instructor['user_id'])  # Role claim is stale; sign in again
+            access_resolver.invalidate_user(instructor['user_id'])
             logger.info(f"Promoted user {instructor['user_id']} to instructor")
     
     return {"message": f"Instructor {new_status}"}
@@ -694,6 +861,8 @@ async def create_course(course_data: dict, current_user: User = Depends(get_curr
             instructor_id = str(uuid.uuid4())
             await db.instructors.update_one({"user_id": current_user.id}, {"$set": {"id": instructor_id}})
             logger.info(f"Repaired missing instructor ID for {current_user.email}")
+    access_resolver.invalidate_user(current_user.id)
+    await public_responses.invalidate("instructors")
     
     try:
         course = Course(instructor_id=instructor_id, **course_data)
@@ -702,6 +871,8 @@ async def create_course(course_data: dict, current_user: User = Depends(get_curr
         
         doc = course.model_dump()
         doc['created_at'] = doc['created_at'].isoformat()
+        doc['course_stats'] = course_stats.empty_stats()
+        doc['title_words'] = course_search.title_words(doc['title'])
         await db.courses.insert_one(doc)
         return course
     except Exception as e:
@@ -711,18 +882,17 @@ async def create_course(course_data: dict, current_user: User = Depends(get_curr
 
 # ==================== ADMIN COURSE ROUTES ====================
 @api_router.get("/admin/courses/pending")
-async def get_pending_courses(current_user: User = Depends(get_current_user)):
+async def get_pending_courses(current_user: User = Depends(get_current_user), loaders: Loaders = Depends(get_loaders)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
     courses = await db.courses.find({"status": "pending"}, {"_id": 0}).to_list(100)
     
     # Enrich with instructor name
+    instructor_users = await loaders.instructor_users([c['instructor_id'] for c in courses])
     for course in courses:
-        instructor = await db.instructors.find_one({"id": course['instructor_id']})
-        if instructor:
-            user = await db.users.find_one({"id": instructor['user_id']})
-            course['instructor_name'] = user['name'] if user else "Unknown"
+        user = instructor_users.get(course['instructor_id'])
+        course['instructor_name'] = user['name'] if user else "Unknown"
             
     return courses
 
@@ -740,6 +910,7 @@ async def moderate_course(course_id: str, approved: bool, current_user: User = D
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
         
+    await invalidate_course_responses(course_id)
     return {"message": f"Course {new_status}"}
 
 @api_router.patch("/admin/courses/{course_id}/feature")
@@ -754,6 +925,7 @@ async def feature_course(course_id: str, featured: bool, current_user: User = De
      if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
         
+     await invalidate_course_responses(course_id)
      return {"message": f"Course featured status updated"}
 
 
@@ -764,17 +936,32 @@ async def get_courses(
     status: Optional[str] = "published",
     search: Optional[str] = None,
     instructor_id: Optional[str] = None,
-    token: Optional[str] = None
+    token: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    view: str = "full"
 ):
+    """List courses. Passing `limit` switches to paginated {items, next_cursor} responses.
+    `search` uses the weighted course text index and defaults to relevance order;
+    if no whole word matches, it falls back to title word prefixes ("pyth" -> Python).
+    `view=card` returns only the fields a catalog card renders."""
+    projection = course_projection(view)
+    search = (search or "").strip() or None
+    if sort is None:
+        sort = pagination.RELEVANCE_SORT if search else "newest"
+    if sort == pagination.RELEVANCE_SORT and not search:
+        raise HTTPException(status_code=400, detail="sort=relevance requires a search term")
+    if sort != pagination.RELEVANCE_SORT and sort not in pagination.CATALOG_SORTS:
+        valid = [pagination.RELEVANCE_SORT, *pagination.CATALOG_SORTS]
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(valid)}")
+    
     current_user = await get_optional_user(request)
     if not current_user and token:
         # Fallback for explicit token param if get_optional_user missed it
         try:
             payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            user_id = payload.get("sub")
-            user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-            if user_doc:
-                current_user = User(**user_doc)
+            current_user = await user_from_token(payload)
         except:
             pass
 
@@ -803,106 +990,129 @@ async def get_courses(
                 query['status'] = "published"
     else:
         query['status'] = status or "published"
+    query.setdefault('status', {"$ne": cascade.DELETED})
 
     if instructor_id:
         query['instructor_id'] = instructor_id
+    
+    paginated = limit is not None or bool(after)
+    page_size = min(max(limit or pagination.DEFAULT_PAGE_SIZE, 1), pagination.MAX_PAGE_SIZE)
+    try:
+        offset = pagination.decode_offset_cursor(after) if sort == pagination.RELEVANCE_SORT else 0
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def fetch(query: dict, projection: dict, order: list):
+        if not paginated:
+            # Legacy unpaginated response for existing clients
+            return await db.courses.find(query, projection).sort(order).to_list(1000), None
+        try:
+            paged_query = query if sort == pagination.RELEVANCE_SORT else pagination.paginate_query(query, sort, after)
+        except pagination.InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Fetch one extra row to know whether another page exists
+        cursor = db.courses.find(paged_query, projection).sort(order)
+        if offset:
+            cursor = cursor.skip(offset)
+        courses = await cursor.limit(page_size + 1).to_list(page_size + 1)
+        next_cursor = None
+        if len(courses) > page_size:
+            courses = courses[:page_size]
+            if sort == pagination.RELEVANCE_SORT:
+                next_cursor = pagination.encode_offset_cursor(offset + page_size)
+            else:
+                next_cursor = pagination.encode_cursor(courses[-1], sort)
+        return courses, next_cursor
+    
     if search:
-        query['$or'] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
+        # Weighted text index: title > meta_keywords > description
+        courses, next_cursor = await fetch(
+            {**query, '$text': {"$search": search}},
+            {**projection, 'score': {"$meta": "textScore"}},
+            pagination.sort_spec(sort)
+        )
+        if not courses:
+            # $text only matches whole words, so a partial term like "pyth" finds
+            # nothing; fall back to indexed title-word prefixes. A later page is only
+            # requested when this mode had more rows, so each page picks the same mode.
+            order = pagination.PREFIX_SORT_SPEC if sort == pagination.RELEVANCE_SORT else pagination.sort_spec(sort)
+            courses, next_cursor = await fetch({**query, **course_search.prefix_filter(search)}, projection, order)
+    else:
+        courses, next_cursor = await fetch(query, projection, pagination.sort_spec(sort))
     
-    courses = await db.courses.find(query, {"_id": 0}).to_list(1000)
-    return courses
+    if not paginated:
+        return courses
+    return {"items": courses, "next_cursor": next_cursor}
 
 
 @api_router.get("/courses/{course_id}")
-async def get_course(course_id: str):
-    course = await db.courses.find_one({"id": course_id}, {"_id": 0})
-    if not course:
+async def get_course(course_id: str, loaders: Loaders = Depends(get_loaders)):
+    course = await loaders.courses.load(course_id)
+    if not course or course.get('status') == cascade.DELETED:
         raise HTTPException(status_code=404, detail="Course not found")
+    course = dict(course)  # Loader results are shared; don't mutate them
     
     # Get instructor info
-    instructor = await db.instructors.find_one({"id": course['instructor_id']}, {"_id": 0})
-    if instructor:
-        user = await db.users.find_one({"id": instructor['user_id']}, {"_id": 0, "password": 0})
-        course['instructor'] = user
-    
-    # Get lessons count
-    lessons_count = await db.lessons.count_documents({"course_id": course_id})
-    course['lessons_count'] = lessons_count
+    instructor_users = await loaders.instructor_users([course['instructor_id']])
+    if course['instructor_id'] in instructor_users:
+        course['instructor'] = instructor_users[course['instructor_id']]
+    
+    # Get lessons count (materialized; count only for courses that predate course_stats)
+    stats = course.get('course_stats') or {}
+    if 'lessons_count' in stats:
+        course['lessons_count'] = stats['lessons_count']
+    else:
+        course['lessons_count'] = await db.lessons.count_documents({"course_id": course_id})
     
     return course
 
 
 @api_router.patch("/courses/{course_id}")
-async def update_course(course_id: str, updates: dict, current_user: User = Depends(get_current_user)):
-    course = await db.courses.find_one({"id": course_id})
-    if not course:
+async def update_course(course_id: str, updates: dict, current_user: User = Depends(get_current_user), access: CourseAccess = Depends(get_course_access)):
+    if not access.exists:
         raise HTTPException(status_code=404, detail="Course not found")
     
     # Allow Admin or Course Owner
-    is_owner = False
-    if current_user.role != "admin":
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_owner = True
-        
-        if not is_owner:
-            raise HTTPException(status_code=403, detail="Not authorized to update this course")
+    if not access.can_manage:
+        raise HTTPException(status_code=403, detail="Not authorized to update this course")
     
     # Remove immutable fields from updates
     updates.pop('id', None)
     updates.pop('instructor_id', None)
+    updates.pop('course_stats', None)  # Maintained by write paths only
+    updates.pop('content_version', None)
+    updates.pop('title_words', None)
+    if 'title' in updates:
+        updates['title_words'] = course_search.title_words(updates['title'])
     
     await db.courses.update_one({"id": course_id}, {"$set": updates})
+    await bump_content_version(course_id)
     return {"message": "Course updated", "status": "published"}
 
 @api_router.delete("/courses/{course_id}")
-async def delete_course(course_id: str, current_user: User = Depends(get_current_user)):
-    course = await db.courses.find_one({"id": course_id})
-    if not course:
+async def delete_course(course_id: str, current_user: User = Depends(get_current_user), access: CourseAccess = Depends(get_course_access)):
+    if not access.exists:
         raise HTTPException(status_code=404, detail="Course not found")
-    
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized to delete this course")
         
-    # Delete course and related data
-    await db.courses.delete_one({"id": course_id})
-    await db.sections.delete_many({"course_id": course_id})
-    await db.lessons.delete_many({"course_id": course_id})
-    await db.quizzes.delete_many({"course_id": course_id})
-    await db.live_classes.delete_many({"course_id": course_id})
-    # Note: Enrollments are usually kept for audit but could be archived
+    # Hide the course now; related data is removed by a background job
+    await db.courses.update_one(
+        {"id": course_id},
+        {"$set": {"status": cascade.DELETED, "deleted_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    await bump_content_version(course_id)
+    access_resolver.invalidate_course(course_id)
+    job = await cascade.enqueue(db, cascade.COURSE, course_id, current_user.id)
     
-    return {"message": "Course and all related content deleted successfully"}
+    return {"message": "Course deleted; related content is being removed", "job_id": job['id']}
 
 
 @api_router.post("/courses/{course_id}/lessons")
-async def add_lesson(course_id: str, lesson_data: dict, current_user: User = Depends(get_current_user)):
-    course = await db.courses.find_one({"id": course_id})
-    if not course:
+async def add_lesson(course_id: str, lesson_data: dict, current_user: User = Depends(get_current_user), access: CourseAccess = Depends(get_course_access)):
+    if not access.exists:
         raise HTTPException(status_code=404, detail="Course not found")
-    
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     lesson = Lesson(course_id=course_id, **lesson_data)
@@ -912,37 +1122,29 @@ async def add_lesson(course_id: str, lesson_data: dict, current_user: User = Dep
     
     # NEW: Reset completion status for all enrolled students
     # When a new lesson is added, completed courses should become "active" again
-    await db.enrollments.update_many(
+    reset = await db.enrollments.update_many(
         {"course_id": course_id, "status": "completed"},
         {"$set": {"status": "active"}}
     )
     
+    await course_stats.increment(
+        db, course_id,
+        lessons_count=1,
+        total_duration=lesson.duration or 0,
+        completion_count=-reset.modified_count
+    )
+    await bump_content_version(course_id)
+    
     return lesson
 
 
 @api_router.get("/courses/{course_id}/lessons")
-async def get_lessons(course_id: str, request: Request):
+async def get_lessons(course_id: str, access: CourseAccess = Depends(get_course_access)):
     lessons = await db.lessons.find({"course_id": course_id}, {"_id": 0}).sort("order", 1).to_list(1000)
     
-    current_user = await get_optional_user(request)
-    is_authorized = False
-    
-    if current_user:
-        if current_user.role == "admin":
-            is_authorized = True
-        else:
-            course = await db.courses.find_one({"id": course_id})
-            if course:
-                instructor = await db.instructors.find_one({"user_id": current_user.id})
-                if instructor and instructor['id'] == course.get('instructor_id'):
-                    is_authorized = True
-            
-            if not is_authorized:
-                is_authorized = await check_enrollment_status(current_user.id, course_id)
-                
     # Filter content for non-enrolled users
     for lesson in lessons:
-        if not is_authorized and not lesson.get('is_preview', False):
+        if not access.can_view_content and not lesson.get('is_preview', False):
             lesson['content_url'] = None
             lesson['content_text'] = "Private content. Enroll to view."
             
@@ -955,18 +1157,8 @@ async def update_lesson(lesson_id: str, updates: dict, current_user: User = Depe
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
         
-    course = await db.courses.find_one({"id": lesson['course_id']})
-    
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    access = await access_resolver.resolve(current_user, lesson['course_id'])
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
         
     # Remove immutable fields
@@ -979,6 +1171,13 @@ async def update_lesson(lesson_id: str, updates: dict, current_user: User = Depe
         
     await db.lessons.update_one({"id": lesson_id}, {"$set": updates})
     
+    if 'duration' in updates:
+        await course_stats.increment(
+            db, lesson['course_id'],
+            total_duration=int(updates['duration'] or 0) - (lesson.get('duration') or 0)
+        )
+    await bump_content_version(lesson['course_id'])
+    
     updated_lesson = await db.lessons.find_one({"id": lesson_id}, {"_id": 0})
     return updated_lesson
 
@@ -989,46 +1188,33 @@ async def delete_lesson(lesson_id: str, current_user: User = Depends(get_current
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    course = await db.courses.find_one({"id": lesson['course_id']})
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    access = await access_resolver.resolve(current_user, lesson['course_id'])
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.lessons.delete_one({"id": lesson_id})
+    await course_stats.increment(
+        db, lesson['course_id'],
+        lessons_count=-1,
+        total_duration=-(lesson.get('duration') or 0)
+    )
+    await bump_content_version(lesson['course_id'])
     return {"message": "Lesson deleted"}
 
 
 # ==================== SECTION ROUTES ====================
 @api_router.post("/courses/{course_id}/sections")
-async def create_section(course_id: str, section_data: dict, current_user: User = Depends(get_current_user)):
-    course = await db.courses.find_one({"id": course_id})
-    if not course:
+async def create_section(course_id: str, section_data: dict, current_user: User = Depends(get_current_user), access: CourseAccess = Depends(get_course_access)):
+    if not access.exists:
         raise HTTPException(status_code=404, detail="Course not found")
-    
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     section = Section(course_id=course_id, **section_data)
     doc = section.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.sections.insert_one(doc)
+    await bump_content_version(course_id)
     return section
 
 
@@ -1038,20 +1224,10 @@ async def update_section(section_id: str, updates: dict, current_user: User = De
     if not section:
         raise HTTPException(status_code=404, detail="Section not found")
         
-    course = await db.courses.find_one({"id": section['course_id']})
-    if not course:
+    access = await access_resolver.resolve(current_user, section['course_id'])
+    if not access.exists:
         raise HTTPException(status_code=404, detail="Course associated with section not found")
-        
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Remove immutable fields if present
@@ -1060,41 +1236,27 @@ async def update_section(section_id: str, updates: dict, current_user: User = De
     updates.pop('created_at', None)
     
     await db.sections.update_one({"id": section_id}, {"$set": updates})
+    await bump_content_version(section['course_id'])
     return {"message": "Section updated successfully"}
 
 
 
 @api_router.get("/courses/{course_id}/sections")
-async def get_sections(course_id: str, request: Request):
+async def get_sections(course_id: str, access: CourseAccess = Depends(get_course_access)):
     sections = await db.sections.find({"course_id": course_id}, {"_id": 0}).sort("order", 1).to_list(1000)
     
-    current_user = await get_optional_user(request)
-    is_authorized = False
-    
-    if current_user:
-        if current_user.role == "admin":
-            is_authorized = True
-        else:
-            course = await db.courses.find_one({"id": course_id})
-            if course:
-                instructor = await db.instructors.find_one({"user_id": current_user.id})
-                if instructor and instructor['id'] == course.get('instructor_id'):
-                    is_authorized = True
-            
-            if not is_authorized:
-                is_authorized = await check_enrollment_status(current_user.id, course_id)
-    
-    # Get lessons for each section
-    for section in sections:
-        lessons = await db.lessons.find({"section_id": section['id']}, {"_id": 0}).sort("order", 1).to_list(1000)
+    # One lessons query for every section, grouped in memory
+    by_section = {section['id']: [] for section in sections}
+    lessons = await db.lessons.find(
+        {"section_id": {"$in": list(by_section)}}, {"_id": 0}
+    ).sort("order", 1).to_list(None)
+    for lesson in lessons:
         # Filter content for non-enrolled users
-        for lesson in lessons:
-            if not is_authorized and not lesson.get('is_preview', False):
-                lesson['content_url'] = None
-                lesson['content_text'] = "Private content. Enroll to view."
-                if lesson.get('type') == 'video':
-                    lesson['duration'] = 0 # Hide duration if preferred
-        section['lessons'] = lessons
+        if not access.can_view_content:
+            lesson = redact_lesson(lesson)
+        by_section[lesson['section_id']].append(lesson)
+    for section in sections:
+        section['lessons'] = by_section[section['id']]
     
     return sections
 
@@ -1105,43 +1267,118 @@ async def delete_section(section_id: str, current_user: User = Depends(get_curre
     if not section:
         raise HTTPException(status_code=404, detail="Section not found")
     
-    course = await db.courses.find_one({"id": section['course_id']})
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    access = await access_resolver.resolve(current_user, section['course_id'])
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Delete section and its lessons
+    section_lessons = await db.lessons.find({"section_id": section_id}, {"_id": 0, "duration": 1}).to_list(1000)
     await db.sections.delete_one({"id": section_id})
-    await db.lessons.delete_many({"section_id": section_id})
+    deleted = await db.lessons.delete_many({"section_id": section_id})
+    await course_stats.increment(
+        db, section['course_id'],
+        lessons_count=-deleted.deleted_count,
+        total_duration=-sum(l.get('duration') or 0 for l in section_lessons)
+    )
+    await bump_content_version(section['course_id'])
     
     return {"message": "Section deleted"}
 
 
+# ==================== COURSE OUTLINE ====================
+# Outlines are cached per (course_id, content_version, view). Every content
+# mutation bumps courses.content_version, so workers that missed the local
+# purge still stop serving the old version on their next read.
+outline_cache = cache_backend.CacheNamespace(
+    shared_cache, "outline", ttl=float(os.environ.get('OUTLINE_CACHE_TTL', 600))
+)
+
+
+async def bump_content_version(course_id: str):
+    await db.courses.update_one({"id": course_id}, {"$inc": {"content_version": 1}})
+    await invalidate_course_responses(course_id)
+    await outline_cache.invalidate(f"course:{course_id}")
+
+
+def redact_lesson(lesson: dict) -> dict:
+    if lesson.get('is_preview', False):
+        return lesson
+    lesson = {**lesson, 'content_url': None, 'content_text': "Private content. Enroll to view."}
+    if lesson.get('type') == 'video':
+        lesson['duration'] = 0
+    return lesson
+
+
+async def build_course_outline(course: dict, authorized: bool) -> dict:
+    """Sections, lessons, quizzes and live classes in one query per collection"""
+    course_id = course['id']
+    sections, lessons, quizzes, live_classes = await asyncio.gather(
+        db.sections.find({"course_id": course_id}, {"_id": 0}).sort("order", 1).to_list(1000),
+        db.lessons.find({"course_id": course_id}, {"_id": 0}).sort("order", 1).to_list(1000),
+        db.quizzes.find({"course_id": course_id}, {"_id": 0}).to_list(1000),
+        db.live_classes.find({"course_id": course_id}, {"_id": 0}).sort("scheduled_at", 1).to_list(1000)
+    )
+    
+    if not authorized:
+        lessons = [redact_lesson(l) for l in lessons]
+        quizzes = [{"id": q['id'], "title": q['title'], "question_count": len(q.get('questions', []))} for q in quizzes]
+        live_classes = [
+            {**lc, 'meeting_url': None, 'description': "Enroll to access the meeting link and details."}
+            for lc in live_classes
+        ]
+    
+    # Group lessons under their sections; anything without a known section is standalone
+    by_section = {section['id']: [] for section in sections}
+    standalone = []
+    for lesson in lessons:
+        by_section.get(lesson.get('section_id'), standalone).append(lesson)
+    
+    return {
+        "course_id": course_id,
+        "title": course.get('title'),
+        "content_version": course.get('content_version', 0),
+        "sections": [{**section, "lessons": by_section[section['id']]} for section in sections],
+        "lessons": standalone,
+        "quizzes": quizzes,
+        "live_classes": live_classes
+    }
+
+
+@api_router.get("/courses/{course_id}/outline")
+async def get_course_outline(course_id: str, request: Request):
+    """Everything the course player needs in one round trip; the public view is redacted"""
+    course = await db.courses.find_one(
+        {"id": course_id},
+        {"_id": 0, "id": 1, "title": 1, "instructor_id": 1, "content_version": 1, "status": 1}
+    )
+    if not course or course.get('status') == cascade.DELETED:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    current_user = await get_optional_user(request)
+    access = await access_resolver.resolve(current_user, course_id)
+    is_authorized = access.can_view_content
+    enrollment = None
+    if access.level == course_access.ENROLLED:
+        enrollment = await db.enrollments.find_one(
+            {"user_id": current_user.id, "course_id": course_id}, {"_id": 0}
+        )
+    
+    view = "full" if is_authorized else "public"
+    outline = await outline_cache.get_or_load(
+        f"{course_id}:{course.get('content_version', 0)}:{view}",
+        lambda: build_course_outline(course, is_authorized),
+        tags=[f"course:{course_id}"]
+    )
+    
+    return {**outline, "view": view, "enrollment": enrollment}
+
+
 # ==================== LIVE CLASS ROUTES ====================
 @api_router.post("/courses/{course_id}/live-classes")
-async def create_live_class(course_id: str, live_class_data: dict, current_user: User = Depends(get_current_user)):
-    course = await db.courses.find_one({"id": course_id})
-    if not course:
+async def create_live_class(course_id: str, live_class_data: dict, current_user: User = Depends(get_current_user), access: CourseAccess = Depends(get_course_access)):
+    if not access.exists:
         raise HTTPException(status_code=404, detail="Course not found")
-    
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Parse datetime
@@ -1162,32 +1399,17 @@ async def create_live_class(course_id: str, live_class_data: dict, current_user:
     doc['scheduled_at'] = doc['scheduled_at'].isoformat()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.live_classes.insert_one(doc)
+    await bump_content_version(course_id)
     
     return live_class
 
 
 @api_router.get("/courses/{course_id}/live-classes")
-async def get_live_classes(course_id: str, request: Request):
-    current_user = await get_optional_user(request)
-    is_authorized = False
-    
-    if current_user:
-        if current_user.role == "admin":
-            is_authorized = True
-        else:
-            course = await db.courses.find_one({"id": course_id})
-            if course:
-                instructor = await db.instructors.find_one({"user_id": current_user.id})
-                if instructor and instructor['id'] == course.get('instructor_id'):
-                    is_authorized = True
-            
-            if not is_authorized:
-                is_authorized = await check_enrollment_status(current_user.id, course_id)
-                
+async def get_live_classes(course_id: str, access: CourseAccess = Depends(get_course_access)):
     live_classes = await db.live_classes.find({"course_id": course_id}, {"_id": 0}).sort("scheduled_at", 1).to_list(1000)
     
     # Hide meeting URLs for non-enrolled users
-    if not is_authorized:
+    if not access.can_view_content:
         for lc in live_classes:
             lc['meeting_url'] = None
             lc['description'] = "Enroll to access the meeting link and details."
@@ -1201,20 +1423,12 @@ async def update_live_class(live_class_id: str, updates: dict, current_user: Use
     if not live_class:
         raise HTTPException(status_code=404, detail="Live class not found")
     
-    course = await db.courses.find_one({"id": live_class['course_id']})
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    access = await access_resolver.resolve(current_user, live_class['course_id'])
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.live_classes.update_one({"id": live_class_id}, {"$set": updates})
+    await bump_content_version(live_class['course_id'])
     return {"message": "Live class updated"}
 
 
@@ -1224,20 +1438,12 @@ async def delete_live_class(live_class_id: str, current_user: User = Depends(get
     if not live_class:
         raise HTTPException(status_code=404, detail="Live class not found")
     
-    course = await db.courses.find_one({"id": live_class['course_id']})
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    access = await access_resolver.resolve(current_user, live_class['course_id'])
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.live_classes.delete_one({"id": live_class_id})
+    await bump_content_version(live_class['course_id'])
     return {"message": "Live class deleted"}
 
 
@@ -1245,7 +1451,7 @@ async def delete_live_class(live_class_id: str, current_user: User = Depends(get
 @api_router.post("/enrollments")
 async def create_enrollment(course_id: str, current_user: User = Depends(get_current_user)):
     course = await db.courses.find_one({"id": course_id})
-    if not course:
+    if not course or course.get('status') == cascade.DELETED:
         raise HTTPException(status_code=404, detail="Course not found")
         
     existing = await db.enrollments.find_one({"user_id": current_user.id, "course_id": course_id})
@@ -1260,20 +1466,39 @@ async def create_enrollment(course_id: str, current_user: User = Depends(get_cur
     doc = enrollment.model_dump()
     doc['enrolled_at'] = doc['enrolled_at'].isoformat()
     await db.enrollments.insert_one(doc)
+    access_resolver.invalidate_enrollments(current_user.id)
+    await course_stats.increment(db, course_id, enrollment_count=1)
+    await invalidate_course_responses(course_id)
+    await analytics.record_enrollment(db, course)
     return enrollment
 
 
 @api_router.get("/enrollments/my-courses")
-async def get_my_courses(current_user: User = Depends(get_current_user)):
+async def get_my_courses(view: str = "full", current_user: User = Depends(get_current_user), loaders: Loaders = Depends(get_loaders)):
+    course_projection(view)  # Validate early
     enrollments = await db.enrollments.find({"user_id": current_user.id}, {"_id": 0}).to_list(1000)
     
+    course_ids = [e['course_id'] for e in enrollments]
+    course_loader = loaders.course_cards if view == "card" else loaders.courses
+    courses = await course_loader.load_many(course_ids)
+    
+    # Lesson totals come from course_stats; aggregate only for courses without them
+    lesson_counts = {c['id']: c['course_stats']['lessons_count'] for c in courses
+                     if c and 'lessons_count' in (c.get('course_stats') or {})}
+    missing_ids = [cid for cid in course_ids if cid not in lesson_counts]
+    if missing_ids:
+        async for row in db.lessons.aggregate([
+            {"$match": {"course_id": {"$in": missing_ids}}},
+            {"$group": {"_id": "$course_id", "count": {"$sum": 1}}}
+        ]):
+            lesson_counts[row['_id']] = row['count']
+    
     result = []
-    for enrollment in enrollments:
-        course = await db.courses.find_one({"id": enrollment['course_id']}, {"_id": 0})
+    for enrollment, course in zip(enrollments, courses):
         if course:
             # Recalculate progress based on actual completed lessons
             completed_lessons = enrollment.get('completed_lessons', [])
-            total_lessons = await db.lessons.count_documents({"course_id": enrollment['course_id']})
+            total_lessons = lesson_counts.get(enrollment['course_id'], 0)
             
             if total_lessons > 0:
                 actual_progress = (len(completed_lessons) / total_lessons) * 100
@@ -1288,6 +1513,7 @@ async def get_my_courses(current_user: User = Depends(get_current_user)):
                     {"id": enrollment['id']},
                     {"$set": {"progress": actual_progress, "status": new_status}}
                 )
+                await course_stats.track_completion(db, enrollment['course_id'], enrollment.get('status'), new_status)
                 enrollment['progress'] = actual_progress
                 enrollment['status'] = new_status
             
@@ -1324,6 +1550,7 @@ async def update_progress(enrollment_id: str, progress: float, completed_lessons
         updates['status'] = 'active'
     
     await db.enrollments.update_one({"id": enrollment_id}, {"$set": updates})
+    await course_stats.track_completion(db, enrollment['course_id'], enrollment.get('status'), updates['status'])
     
     return {
         "message": "Progress updated",
@@ -1372,6 +1599,8 @@ async def complete_lesson(enrollment_id: str, lesson_id: str, current_user: User
         cert_id = await generate_certificate_if_eligible(current_user.id, enrollment['course_id'])
     
     await db.enrollments.update_one({"id": enrollment_id}, {"$set": updates})
+    if 'status' in updates:
+        await course_stats.track_completion(db, enrollment['course_id'], enrollment.get('status'), updates['status'])
     
     return {
         "message": "Lesson completed",
@@ -1545,7 +1774,7 @@ async def create_checkout(
     current_user: User = Depends(get_current_user)
 ):
     course = await db.courses.find_one({"id": course_id}, {"_id": 0})
-    if not course:
+    if not course or course.get('status') == cascade.DELETED:
         raise HTTPException(status_code=404, detail="Course not found")
     
     # Check if already enrolled
@@ -1634,6 +1863,10 @@ async def create_checkout(
         enroll_doc = enrollment.model_dump()
         enroll_doc['enrolled_at'] = enroll_doc['enrolled_at'].isoformat()
         await db.enrollments.insert_one(enroll_doc)
+        access_resolver.invalidate_enrollments(current_user.id)
+        await course_stats.increment(db, course_id, enrollment_count=1)
+        await invalidate_course_responses(course_id)
+        await analytics.record_enrollment(db, course)
         
         # Track coupon usage
         if coupon_id:
@@ -1670,7 +1903,8 @@ async def create_checkout(
 
     stripe_checkout = StripeCheckout(
         api_key=stripe_key,
-        webhook_url=webhook_url
+        webhook_url=webhook_url,
+        client=stripe_client
     )
     
     success_url = f"{frontend_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
@@ -1756,7 +1990,8 @@ async def check_payment_status(session_id: str, current_user: User = Depends(get
 
     stripe_checkout = StripeCheckout(
         api_key=os.environ.get('STRIPE_SECRET_KEY'),
-        webhook_url=""
+        webhook_url="",
+        client=stripe_client
     )
     
     status = await stripe_checkout.get_checkout_status(session_id)
@@ -1768,17 +2003,25 @@ async def check_payment_status(session_id: str, current_user: User = Depends(get
     # Support both "paid" and "no_payment_required" (for 100% coupons)
     valid_statuses = ["paid", "no_payment_required"]
     if status.payment_status in valid_statuses:
-        if payment['payment_status'] != 'paid':
-            await db.payments.update_one(
-                {"session_id": session_id},
-                {"$set": {"payment_status": "paid"}}
-            )
-            
+        # Concurrent polls race here; only the one that flips the payment to paid fulfils it
+        fulfilled = await db.payments.find_one_and_update(
+            {"session_id": session_id, "payment_status": {"$ne": "paid"}},
+            {"$set": {"payment_status": "paid", "paid_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        if fulfilled:
             # Create enrollment
             enrollment = Enrollment(user_id=payment['user_id'], course_id=payment['course_id'])
             enroll_doc = enrollment.model_dump()
             enroll_doc['enrolled_at'] = enroll_doc['enrolled_at'].isoformat()
-            await db.enrollments.insert_one(enroll_doc)
+            try:
+                await db.enrollments.insert_one(enroll_doc)
+                newly_enrolled = True
+            except DuplicateKeyError:
+                newly_enrolled = False  # Already enrolled; still credit the payment below
+            if newly_enrolled:
+                access_resolver.invalidate_enrollments(payment['user_id'])
+                await course_stats.increment(db, payment['course_id'], enrollment_count=1)
+                await invalidate_course_responses(payment['course_id'])
             
             # Update instructor earnings
             course = await db.courses.find_one({"id": payment['course_id']})
@@ -1788,6 +2031,10 @@ async def check_payment_status(session_id: str, current_user: User = Depends(get
                     {"id": course['instructor_id']},
                     {"$inc": {"earnings": instructor_share}}
                 )
+                if newly_enrolled:
+                    await analytics.record_enrollment(db, course, payment['amount'])
+                else:
+                    await analytics.record_revenue(db, course, payment['amount'])
         
         # Normalize status for frontend
         status.payment_status = "paid"
@@ -1806,7 +2053,8 @@ async def stripe_webhook(request: Request):
     
     stripe_checkout = StripeCheckout(
         api_key=os.environ.get('STRIPE_SECRET_KEY'),
-        webhook_url=""
+        webhook_url="",
+        client=stripe_client
     )
     
     try:
@@ -1925,7 +2173,8 @@ async def test_payment_split():
         # Create Stripe checkout instance
         stripe_checkout = StripeCheckout(
             api_key=stripe_key,
-            webhook_url=""
+            webhook_url="",
+            client=stripe_client
         )
         
         # Prepare test checkout request
@@ -1947,7 +2196,7 @@ async def test_payment_split():
         )
         
         # Retrieve full session from Stripe to inspect payment_intent_data
-        full_session = stripe.checkout.Session.retrieve(session.session_id)
+        full_session = await stripe_checkout.retrieve_session(session.session_id)
         
         # Return relevant data for verification
         return {
@@ -1959,15 +2208,15 @@ async def test_payment_split():
                 "expected_instructor_amount": int(test_price * 100 * 0.90)
             },
             "session_data": {
-                "session_id": full_session.id,
-                "amount_total": full_session.amount_total,
-                "payment_intent": full_session.payment_intent,
-                "mode": full_session.mode,
-                "status": full_session.status
+                "session_id": full_session.get('id'),
+                "amount_total": full_session.get('amount_total'),
+                "payment_intent": full_session.get('payment_intent'),
+                "mode": full_session.get('mode'),
+                "status": full_session.get('status')
             },
             "payment_intent_details": {
                 "note": "Check Stripe Dashboard for payment_intent details",
-                "payment_intent_id": full_session.payment_intent,
+                "payment_intent_id": full_session.get('payment_intent'),
                 "expected_application_fee_amount": 1000,  # 10% of $100 = $10 = 1000 cents
                 "expected_transfer_destination": test_instructor_stripe_id
             },
@@ -1991,22 +2240,33 @@ async def test_payment_split():
 
 
 # ==================== AI ROUTES ====================
-@api_router.post("/ai/course-assistant")
-async def ai_course_assistant(prompt: str, current_user: User = Depends(get_current_user)):
+def course_assistant_chat(current_user: User) -> LlmChat:
     if current_user.role not in ["instructor", "admin"]:
         raise HTTPException(status_code=403, detail="Instructor only")
     
-    chat = LlmChat(
+    return LlmChat(
         api_key=os.environ.get('GROQ_API_KEY'),
         session_id=f"assistant-{current_user.id}",
         system_message="You are an AI assistant helping instructors create course content. Provide helpful suggestions for course descriptions, lesson titles, and quiz questions."
     ).with_model("groq", "llama-70b")
+
+
+@api_router.post("/ai/course-assistant")
+async def ai_course_assistant(prompt: str, current_user: User = Depends(get_current_user)):
+    chat = course_assistant_chat(current_user)
     
     message = UserMessage(text=prompt)
     response = await chat.send_message(message)
     return {"response": response}
 
 
+@api_router.post("/ai/course-assistant/stream")
+async def ai_course_assistant_stream(prompt: str, request: Request, current_user: User = Depends(get_current_user)):
+    """Same as /ai/course-assistant, streamed as server-sent events"""
+    chat = course_assistant_chat(current_user)
+    return ai_streaming.stream_chat(request, chat, UserMessage(text=prompt))
+
+
 @api_router.post("/upload/thumbnail")
 async def upload_thumbnail(file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
     if current_user.role not in ["instructor", "admin"]:
@@ -2055,8 +2315,7 @@ async def upload_lesson_pdf(file: UploadFile = File(...), current_user: User = D
         raise HTTPException(status_code=500, detail="Failed to upload PDF")
 
 
-@api_router.post("/ai/tutor")
-async def ai_tutor(course_id: str, question: str, current_user: User = Depends(get_current_user)):
+async def tutor_chat(course_id: str, current_user: User) -> LlmChat:
     # Check enrollment
     enrollment = await db.enrollments.find_one({"user_id": current_user.id, "course_id": course_id})
     if not enrollment:
@@ -2069,29 +2328,42 @@ async def ai_tutor(course_id: str, question: str, current_user: User = Depends(g
     context = f"Course: {course['title']}\nDescription: {course['description']}\n\n"
     context += "Lessons:\n" + "\n".join([f"- {l['title']}" for l in lessons])
     
-    chat = LlmChat(
+    return LlmChat(
         api_key=os.environ.get('GROQ_API_KEY'),
         session_id=f"tutor-{current_user.id}-{course_id}",
         system_message=f"You are an AI tutor for this course. Help students understand the material.\n\n{context}"
     ).with_model("groq", "llama-70b")
+
+
+@api_router.post("/ai/tutor")
+async def ai_tutor(course_id: str, question: str, current_user: User = Depends(get_current_user)):
+    chat = await tutor_chat(course_id, current_user)
     
     message = UserMessage(text=question)
     response = await chat.send_message(message)
     return {"response": response}
 
 
+@api_router.post("/ai/tutor/stream")
+async def ai_tutor_stream(course_id: str, question: str, request: Request, current_user: User = Depends(get_current_user)):
+    """Same as /ai/tutor, streamed as server-sent events"""
+    chat = await tutor_chat(course_id, current_user)
+    return ai_streaming.stream_chat(request, chat, UserMessage(text=question))
+
+
 @api_router.get("/ai/recommendations")
-async def get_recommendations(current_user: User = Depends(get_current_user)):
-    enrollments = await db.enrollments.find({"user_id": current_user.id}, {"_id": 0}).to_list(100)
+async def get_recommendations(view: str = "full", current_user: User = Depends(get_current_user)):
+    projection = course_projection(view)
+    enrollments = await db.enrollments.find({"user_id": current_user.id}, {"_id": 0, "course_id": 1}).to_list(100)
     enrolled_ids = [e['course_id'] for e in enrollments]
     
     if not enrolled_ids:
         # Return popular courses
-        courses = await db.courses.find({"status": "published"}, {"_id": 0}).limit(5).to_list(5)
+        courses = await db.courses.find({"status": "published"}, projection).limit(5).to_list(5)
         return courses
     
     # Get enrolled course categories
-    enrolled_courses = await db.courses.find({"id": {"$in": enrolled_ids}}, {"_id": 0}).to_list(100)
+    enrolled_courses = await db.courses.find({"id": {"$in": enrolled_ids}}, {"_id": 0, "category": 1}).to_list(100)
     categories = list(set([c['category'] for c in enrolled_courses]))
     
     # Find similar courses
@@ -2099,7 +2371,7 @@ async def get_recommendations(current_user: User = Depends(get_current_user)):
         "status": "published",
         "category": {"$in": categories},
         "id": {"$nin": enrolled_ids}
-    }, {"_id": 0}).limit(5).to_list(5)
+    }, projection).limit(5).to_list(5)
     
     return recommended
 
@@ -2110,29 +2382,151 @@ async def get_analytics(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    total_users = await db.users.count_documents({})
-    total_courses = await db.courses.count_documents({"status": "published"})
-    total_enrollments = await db.enrollments.count_documents({})
+    # Revenue is summed by a $group pipeline, so it stays correct past any row limit
+    totals = await analytics.totals(db)
+    
+    return {
+        "total_users": totals['total_users'],
+        "total_courses": totals['total_courses'],
+        "total_enrollments": totals['total_enrollments'],
+        "total_revenue": totals['total_revenue'],
+        "admin_earnings": totals['total_revenue'] * ADMIN_COMMISSION
+    }
+
+
+@api_router.get("/admin/analytics/timeseries")
+async def get_analytics_timeseries(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    granularity: str = "day",
+    scope: str = analytics.PLATFORM,
+    scope_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Revenue, enrollments and signups per period, read only from daily_rollups (Admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
     
-    # Calculate total revenue
-    payments = await db.payments.find({"payment_status": "paid"}, {"_id": 0}).to_list(10000)
-    total_revenue = sum([p['amount'] for p in payments])
+    if granularity not in analytics.GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(analytics.GRANULARITIES)}")
+    if scope not in (analytics.PLATFORM, analytics.COURSE, analytics.INSTRUCTOR):
+        raise HTTPException(status_code=400, detail="scope must be platform, course or instructor")
+    if scope != analytics.PLATFORM and not scope_id:
+        raise HTTPException(status_code=400, detail="scope_id is required for course and instructor scopes")
     
+    try:
+        end = datetime.fromisoformat(to_date).date() if to_date else datetime.now(timezone.utc).date()
+        start = datetime.fromisoformat(from_date).date() if from_date else end - timedelta(days=29)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to must be ISO dates (YYYY-MM-DD)")
+    
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    if (end - start).days > analytics.MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {analytics.MAX_RANGE_DAYS} days")
+    
+    points = await analytics.timeseries(
+        db, start, end, granularity,
+        scope=scope, scope_id=scope_id if scope != analytics.PLATFORM else None
+    )
     return {
-        "total_users": total_users,
-        "total_courses": total_courses,
-        "total_enrollments": total_enrollments,
-        "total_revenue": total_revenue,
-        "admin_earnings": total_revenue * ADMIN_COMMISSION
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "granularity": granularity,
+        "scope": scope,
+        "scope_id": scope_id,
+        "points": points
     }
 
 
+@api_router.post("/admin/analytics/rollups/rebuild")
+async def rebuild_analytics_rollups(background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
+    """Backfill daily_rollups for past days from payments, enrollments and users (Admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    background_tasks.add_task(analytics.rebuild_rollups, db)
+    return {"message": "Rollup rebuild started"}
+
+
+@api_router.get("/admin/indexes/audit")
+async def audit_indexes(current_user: User = Depends(get_current_user)):
+    """Explain each route's canonical query and report collection scans (Admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return await db_indexes.audit_indexes(db)
+
+
+@api_router.get("/admin/perf/queries")
+async def get_query_profile(
+    path: Optional[str] = None,
+    n_plus_one_only: bool = False,
+    limit: int = 50,
+    current_user: User = Depends(get_current_user)
+):
+    """Recent per-request query profiles with N+1 flags (Admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    if not QUERY_PROFILER_ENABLED:
+        return {"enabled": False, "routes": {}, "requests": []}
+    
+    return {"enabled": True, **query_profiler.get_report(path, n_plus_one_only, limit)}
+
+
+@api_router.get("/admin/perf/caches")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters for the in-process caches (Admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return caches.get_stats()
+
+
+@api_router.get("/admin/perf/password-hashing")
+async def get_password_hashing_stats(current_user: User = Depends(get_current_user)):
+    """bcrypt pool utilisation, queue depth and 429 rejections (Admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return password_hasher.stats()
+
+
+@api_router.get("/admin/perf/llm")
+async def get_llm_stats(current_user: User = Depends(get_current_user)):
+    """Per-provider LLM call counts, errors and latency percentiles (Admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return llm_clients.stats()
+
+
+@api_router.post("/admin/course-stats/repair")
+async def repair_course_stats(background_tasks: BackgroundTasks, course_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Recompute course_stats from source collections (Admin only).
+    A single course is repaired inline; a full rebuild runs in the background."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    if course_id:
+        repaired = await course_stats.recompute(db, course_id)
+        if not repaired:
+            raise HTTPException(status_code=404, detail="Course not found")
+        await invalidate_course_responses(course_id)
+        return {"message": "Course stats recomputed", "course_id": course_id}
+    
+    background_tasks.add_task(course_stats.recompute, db)
+    background_tasks.add_task(public_responses.clear)
+    return {"message": "Full course stats rebuild started"}
+
+
 @api_router.get("/admin/users")
 async def get_all_users(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(10000)
+    users = await db.users.find({"deleted_at": {"$exists": False}}, {"_id": 0, "password": 0}).to_list(10000)
     return users
 
 
@@ -2148,6 +2542,7 @@ async def update_user_role(user_id: str, new_role: str, current_user: User = Dep
         {"id": user_id},
         {"$set": {"role": new_role}}
     )
+    await revoke_tokens(user_id)
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -2165,6 +2560,7 @@ async def toggle_user_status(user_id: str, active: bool, current_user: User = De
         {"id": user_id},
         {"$set": {"is_active": active}}
     )
+    await revoke_tokens(user_id)
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -2174,7 +2570,7 @@ async def toggle_user_status(user_id: str, active: bool, current_user: User = De
 
 
 @api_router.get("/admin/courses/pending")
-async def get_pending_courses(current_user: User = Depends(get_current_user)):
+async def get_pending_courses(current_user: User = Depends(get_current_user), loaders: Loaders = Depends(get_loaders)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
@@ -2182,13 +2578,12 @@ async def get_pending_courses(current_user: User = Depends(get_current_user)):
     courses = await db.courses.find({"status": "draft"}, {"_id": 0}).to_list(1000)
     
     # Enrich with instructor information
+    instructor_users = await loaders.instructor_users([c['instructor_id'] for c in courses])
     enriched_courses = []
     for course in courses:
-        instructor = await db.instructors.find_one({"id": course['instructor_id']}, {"_id": 0})
-        if instructor:
-            user = await db.users.find_one({"id": instructor['user_id']}, {"_id": 0, "password": 0})
-            course['instructor_name'] = user.get('name', 'Unknown') if user else 'Unknown'
-            course['instructor_email'] = user.get('email', 'Unknown') if user else 'Unknown'
+        user = instructor_users.get(course['instructor_id'])
+        course['instructor_name'] = user.get('name', 'Unknown') if user else 'Unknown'
+        course['instructor_email'] = user.get('email', 'Unknown') if user else 'Unknown'
         enriched_courses.append(course)
     
     return enriched_courses
@@ -2208,6 +2603,7 @@ async def moderate_course(course_id: str, approved: bool, current_user: User = D
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
     
+    await invalidate_course_responses(course_id)
     return {"message": f"Course status updated to {new_status}"}
 
 
@@ -2225,6 +2621,7 @@ async def toggle_featured_course(course_id: str, featured: bool, current_user: U
         raise HTTPException(status_code=404, detail="Course not found")
     
     status = "featured" if featured else "unfeatured"
+    await invalidate_course_responses(course_id)
     return {"message": f"Course {status}"}
 
 
@@ -2237,16 +2634,39 @@ async def delete_user(user_id: str, current_user: User = Depends(get_current_use
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
-    result = await db.users.delete_one({"id": user_id})
+    result = await db.users.update_one(
+        {"id": user_id, "deleted_at": {"$exists": False}},
+        {"$set": {"is_active": False, "deleted_at": datetime.now(timezone.utc).isoformat()}}
+    )
     
-    if result.deleted_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    await revoke_tokens(user_id)
+    access_resolver.invalidate_user(user_id)
+    await public_responses.clear()
+    
+    # Related data is removed by a background job
+    job = await cascade.enqueue(db, cascade.USER, user_id, current_user.id)
     
-    # Clean up related data
-    await db.instructors.delete_many({"user_id": user_id})
-    await db.enrollments.delete_many({"user_id": user_id})
+    return {"message": "User deleted successfully", "job_id": job['id']}
+
+
+@api_router.post("/admin/cleanup/orphans")
+async def sweep_orphans(current_user: User = Depends(get_current_user)):
+    """Queue a job removing child documents whose course or user no longer exists"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
     
-    return {"message": "User deleted successfully"}
+    job = await cascade.enqueue(db, cascade.ORPHANS, None, current_user.id)
+    return {"message": "Orphan sweep started", "job_id": job['id']}
+
+
+@api_router.get("/jobs/{job_id}")
+async def get_delete_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await db.delete_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job or (current_user.role != "admin" and job['requested_by'] != current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 
@@ -2256,48 +2676,23 @@ async def create_quiz(quiz_data: dict, current_user: User = Depends(get_current_
     if current_user.role not in ["instructor", "admin"]:
         raise HTTPException(status_code=403, detail="Instructor only")
     
-    course = await db.courses.find_one({"id": quiz_data['course_id']})
-    if not course:
+    access = await access_resolver.resolve(current_user, quiz_data['course_id'])
+    if not access.exists:
         raise HTTPException(status_code=404, detail="Course not found")
-    
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     quiz = Quiz(**quiz_data)
     doc = quiz.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.quizzes.insert_one(doc)
+    await bump_content_version(quiz.course_id)
     return quiz
 
 
 @api_router.get("/quizzes/{course_id}")
-async def get_quizzes(course_id: str, request: Request):
-    current_user = await get_optional_user(request)
-    is_authorized = False
-    
-    if current_user:
-        if current_user.role == "admin":
-            is_authorized = True
-        else:
-            course = await db.courses.find_one({"id": course_id})
-            if course:
-                instructor = await db.instructors.find_one({"user_id": current_user.id})
-                if instructor and instructor['id'] == course.get('instructor_id'):
-                    is_authorized = True
-            
-            if not is_authorized:
-                is_authorized = await check_enrollment_status(current_user.id, course_id)
-                
-    if not is_authorized:
+async def get_quizzes(course_id: str, access: CourseAccess = Depends(get_course_access)):
+    if not access.can_view_content:
         raise HTTPException(status_code=403, detail="Enrollment required to access quizzes")
 
     quizzes = await db.quizzes.find({"course_id": course_id}, {"_id": 0}).to_list(1000)
@@ -2310,20 +2705,12 @@ async def delete_quiz(quiz_id: str, current_user: User = Depends(get_current_use
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    course = await db.courses.find_one({"id": quiz['course_id']})
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    access = await access_resolver.resolve(current_user, quiz['course_id'])
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.quizzes.delete_one({"id": quiz_id})
+    await bump_content_version(quiz['course_id'])
     return {"message": "Quiz deleted"}
 
 
@@ -2333,17 +2720,8 @@ async def update_quiz(quiz_id: str, quiz_data: dict, current_user: User = Depend
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    course = await db.courses.find_one({"id": quiz['course_id']})
-    # Allow Admin or Owner
-    is_authorized = False
-    if current_user.role == "admin":
-        is_authorized = True
-    else:
-        instructor = await db.instructors.find_one({"user_id": current_user.id})
-        if instructor and instructor['id'] == course['instructor_id']:
-            is_authorized = True
-            
-    if not is_authorized:
+    access = await access_resolver.resolve(current_user, quiz['course_id'])
+    if not access.can_manage:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Update quiz fields
@@ -2357,6 +2735,7 @@ async def update_quiz(quiz_id: str, quiz_data: dict, current_user: User = Depend
         return quiz
 
     await db.quizzes.update_one({"id": quiz_id}, {"$set": update_data})
+    await bump_content_version(quiz['course_id'])
     
     updated_quiz = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0})
     return updated_quiz
@@ -2403,74 +2782,53 @@ async def submit_quiz(quiz_id: str, answers: List[int], current_user: User = Dep
 
 
 # ==================== HELPER FUNCTIONS ====================
-def generate_certificate_pdf(user_name: str, course_title: str, completion_date: str, certificate_id: str) -> bytes:
-    """Generate a professional certificate PDF"""
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    # Background border
-    c.setStrokeColor(colors.HexColor('#10b981'))
-    c.setLineWidth(10)
-    c.rect(30, 30, width - 60, height - 60)
-    
-    # Inner border
-    c.setStrokeColor(colors.HexColor('#059669'))
-    c.setLineWidth(2)
-    c.rect(50, 50, width - 100, height - 100)
-    
-    # Title
-    c.setFont("Helvetica-Bold", 48)
-    c.setFillColor(colors.HexColor('#10b981'))
-    c.drawCentredString(width / 2, height - 120, "Certificate")
-    
-    c.setFont("Helvetica", 28)
-    c.setFillColor(colors.HexColor('#374151'))
-    c.drawCentredString(width / 2, height - 160, "of Completion")
-    
-    # Divider line
-    c.setStrokeColor(colors.HexColor('#d1fae5'))
-    c.setLineWidth(2)
-    c.line(150, height - 190, width - 150, height - 190)
-    
-    # Presented to text
-    c.setFont("Helvetica", 18)
-    c.setFillColor(colors.HexColor('#6b7280'))
-    c.drawCentredString(width / 2, height - 240, "This certificate is presented to")
-    
-    # Student name
-    c.setFont("Helvetica-Bold", 36)
-    c.setFillColor(colors.HexColor('#1a1a1a'))
-    c.drawCentredString(width / 2, height - 300, user_name)
-    
-    # Achievement text
-    c.setFont("Helvetica", 16)
-    c.setFillColor(colors.HexColor('#6b7280'))
-    c.drawCentredString(width / 2, height - 350, "for successfully completing the course")
-    
-    # Course title
-    c.setFont("Helvetica-Bold", 24)
-    c.setFillColor(colors.HexColor('#10b981'))
-    c.drawCentredString(width / 2, height - 400, course_title)
-    
-    # Completion date
-    c.setFont("Helvetica", 14)
-    c.setFillColor(colors.HexColor('#6b7280'))
-    c.drawCentredString(width / 2, height - 470, f"Completed on {completion_date}")
-    
-    # Certificate ID
-    c.setFont("Helvetica", 10)
-    c.setFillColor(colors.HexColor('#9ca3af'))
-    c.drawCentredString(width / 2, 100, f"Certificate ID: {certificate_id}")
-    
-    # Platform name
-    c.setFont("Helvetica-Bold", 16)
-    c.setFillColor(colors.HexColor('#10b981'))
-    c.drawCentredString(width / 2, 140, "LearnHub")
-    
-    c.save()
-    buffer.seek(0)
-    return buffer.getvalue()
+certificate_renderer = certificate_render.CertificateRenderer(
+    workers=int(os.environ.get('CERTIFICATE_RENDER_WORKERS', 2))
+)
+
+certificate_files = certificate_store.CertificateStore(
+    Path(os.environ.get('CERTIFICATE_STORE_DIR', ROOT_DIR / "certificate_store")),
+    max_bytes=int(os.environ.get('CERTIFICATE_STORE_MAX_MB', 512)) * 1024 * 1024,
+    memory_bytes=int(os.environ.get('CERTIFICATE_MEMORY_MB', 16)) * 1024 * 1024
+)
+caches.register("certificates", certificate_files)
+
+# Render at issue time so the first download is already a store hit
+CERTIFICATE_PRERENDER = os.environ.get('CERTIFICATE_PRERENDER', 'true').lower() == 'true'
+_prerender_tasks = set()
+
+
+def certificate_pdf_inputs(cert: dict, user: dict, course: dict) -> dict:
+    return {
+        "user_name": user['name'],
+        "course_title": course['title'],
+        "completion_date": datetime.fromisoformat(cert['issued_date']).strftime("%B %d, %Y"),
+        "certificate_id": cert['id']
+    }
+
+
+async def render_certificate(inputs: dict) -> tuple[str, bytes]:
+    """Render and store a certificate; returns (store key, PDF bytes)"""
+    key = certificate_store.certificate_key(certificate_render.TEMPLATE_VERSION, **inputs)
+    pdf_bytes = await certificate_renderer.render(**inputs)
+    await asyncio.to_thread(certificate_files.put, key, pdf_bytes)
+    return key, pdf_bytes
+
+
+async def prerender_certificate(certificate_id: str):
+    cert = await db.certificates.find_one({"id": certificate_id}, {"_id": 0})
+    if not cert:
+        return
+    user, course = await asyncio.gather(
+        db.users.find_one({"id": cert['user_id']}, {"_id": 0, "name": 1}),
+        db.courses.find_one({"id": cert['course_id']}, {"_id": 0, "title": 1})
+    )
+    if not user or not course:
+        return
+    try:
+        await render_certificate(certificate_pdf_inputs(cert, user, course))
+    except Exception as e:
+        logger.error(f"Pre-rendering certificate {certificate_id} failed: {e}")
 
 
 async def check_certificate_eligibility(user_id: str, course_id: str) -> tuple[bool, str]:
@@ -2514,17 +2872,22 @@ async def generate_certificate_if_eligible(user_id: str, course_id: str):
     doc['issued_date'] = doc['issued_date'].isoformat()
     await db.certificates.insert_one(doc)
     
+    if CERTIFICATE_PRERENDER:
+        task = asyncio.create_task(prerender_certificate(certificate.id))
+        _prerender_tasks.add(task)
+        task.add_done_callback(_prerender_tasks.discard)
+    
     return certificate.id
 
 
 # ==================== CERTIFICATE ROUTES ====================
 @api_router.get("/certificates/my-certificates")
-async def get_my_certificates(current_user: User = Depends(get_current_user)):
+async def get_my_certificates(current_user: User = Depends(get_current_user), loaders: Loaders = Depends(get_loaders)):
     certificates = await db.certificates.find({"user_id": current_user.id}, {"_id": 0}).to_list(1000)
     
+    courses = await loaders.courses.load_many([c['course_id'] for c in certificates])
     result = []
-    for cert in certificates:
-        course = await db.courses.find_one({"id": cert['course_id']}, {"_id": 0})
+    for cert, course in zip(certificates, courses):
         if course:
             result.append({**cert, "course": course})
     
@@ -2532,17 +2895,29 @@ async def get_my_certificates(current_user: User = Depends(get_current_user)):
 
 
 @api_router.get("/certificates/{certificate_id}")
-async def get_certificate(certificate_id: str):
+async def get_certificate(certificate_id: str, loaders: Loaders = Depends(get_loaders)):
     cert = await db.certificates.find_one({"id": certificate_id}, {"_id": 0})
     if not cert:
         raise HTTPException(status_code=404, detail="Certificate not found")
     
-    user = await db.users.find_one({"id": cert['user_id']}, {"_id": 0, "password": 0})
-    course = await db.courses.find_one({"id": cert['course_id']}, {"_id": 0})
+    # User and course are independent, so fetch them concurrently
+    user, course = await asyncio.gather(
+        loaders.users.load(cert['user_id']),
+        loaders.courses.load(cert['course_id'])
+    )
     
     return {**cert, "user": user, "course": course}
 
 
+def attachment_disposition(filename: str) -> str:
+    """Content-Disposition the way FileResponse builds it: RFC 5987 encoding for
+    non-ASCII or quote characters, which a plain filename="..." can't carry"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
 @api_router.get("/certificates/{certificate_id}/download")
 async def download_certificate(certificate_id: str):
     cert = await db.certificates.find_one({"id": certificate_id}, {"_id": 0})
@@ -2555,25 +2930,21 @@ async def download_certificate(certificate_id: str):
     if not user or not course:
         raise HTTPException(status_code=404, detail="User or course not found")
     
-    # Generate PDF
-    completion_date = datetime.fromisoformat(cert['issued_date']).strftime("%B %d, %Y")
-    pdf_bytes = generate_certificate_pdf(
-        user_name=user['name'],
-        course_title=course['title'],
-        completion_date=completion_date,
-        certificate_id=certificate_id
-    )
+    filename = f"Certificate_{course['title'].replace(' ', '_')}.pdf"
+    inputs = certificate_pdf_inputs(cert, user, course)
+    key = certificate_store.certificate_key(certificate_render.TEMPLATE_VERSION, **inputs)
     
-    # Save to temp file and return (cross-platform)
-    temp_dir = tempfile.gettempdir()
-    temp_path = os.path.join(temp_dir, f"certificate_{certificate_id}.pdf")
-    with open(temp_path, "wb") as f:
-        f.write(pdf_bytes)
+    pdf_bytes = certificate_files.get_bytes(key)
+    if pdf_bytes is None:
+        stored_path = certificate_files.get_path(key)
+        if stored_path is not None:
+            return FileResponse(stored_path, media_type="application/pdf", filename=filename)
+        _, pdf_bytes = await render_certificate(inputs)
     
-    return FileResponse(
-        temp_path,
+    return Response(
+        pdf_bytes,
         media_type="application/pdf",
-        filename=f"Certificate_{course['title'].replace(' ', '_')}.pdf"
+        headers={"Content-Disposition": attachment_disposition(filename)}
     )
 
 
@@ -2622,18 +2993,21 @@ async def create_review(review_data: dict, current_user: User = Depends(get_curr
     doc = review.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.reviews.insert_one(doc)
+    await course_stats.apply_review(db, review.course_id, review.rating)
+    await invalidate_course_responses(review.course_id)
+    await public_responses.invalidate(f"reviews:{review.course_id}")
     
     return review
 
 
 @api_router.get("/reviews/{course_id}")
-async def get_reviews(course_id: str):
+async def get_reviews(course_id: str, loaders: Loaders = Depends(get_loaders)):
     reviews = await db.reviews.find({"course_id": course_id}, {"_id": 0}).to_list(1000)
     
     # Enrich with user info
+    users = await loaders.users.load_many([r['user_id'] for r in reviews])
     enriched = []
-    for review in reviews:
-        user = await db.users.find_one({"id": review['user_id']}, {"_id": 0, "password": 0})
+    for review, user in zip(reviews, users):
         if user:
             enriched.append({
                 **review,
@@ -2646,15 +3020,22 @@ async def get_reviews(course_id: str):
 
 @api_router.get("/reviews/{course_id}/average")
 async def get_average_rating(course_id: str):
-    reviews = await db.reviews.find({"course_id": course_id}, {"_id": 0}).to_list(1000)
-    
-    if not reviews:
+    course = await db.courses.find_one({"id": course_id}, {"_id": 0, "course_stats": 1})
+    stats = (course or {}).get('course_stats') or {}
+    if 'review_count' not in stats or 'rating_sum' not in stats:
+        # Course predates course_stats: average in the database, not in Python
+        rows = await db.reviews.aggregate([
+            {"$match": {"course_id": course_id}},
+            {"$group": {"_id": None, "sum": {"$sum": "$rating"}, "count": {"$sum": 1}}}
+        ]).to_list(1)
+        stats = {"rating_sum": rows[0]['sum'], "review_count": rows[0]['count']} if rows else {}
+    
+    total_reviews = stats.get('review_count', 0)
+    if not total_reviews:
         return {"average_rating": 0, "total_reviews": 0}
     
-    total_rating = sum(r['rating'] for r in reviews)
-    average = total_rating / len(reviews)
-    
-    return {"average_rating": round(average, 1), "total_reviews": len(reviews)}
+    average = stats['rating_sum'] / total_reviews
+    return {"average_rating": round(average, 1), "total_reviews": total_reviews}
 
 
 @api_router.delete("/reviews/{review_id}")
@@ -2668,6 +3049,9 @@ async def delete_review(review_id: str, current_user: User = Depends(get_current
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.reviews.delete_one({"id": review_id})
+    await course_stats.apply_review(db, review['course_id'], review['rating'], sign=-1)
+    await invalidate_course_responses(review['course_id'])
+    await public_responses.invalidate(f"reviews:{review['course_id']}")
     return {"message": "Review deleted"}
 
 
@@ -2694,12 +3078,18 @@ origins = [
     "*"  # Optional: Allows everyone (good for debugging, remove later for security)
 ]
 
+if QUERY_PROFILER_ENABLED:
+    app.add_middleware(query_profiler.QueryProfilerMiddleware)
+if RESPONSE_CACHE_ENABLED:
+    app.add_middleware(response_cache.ResponseCacheMiddleware, cache=public_responses)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[query_profiler.QUERY_COUNT_HEADER, "ETag", response_cache.CACHE_HEADER],
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -2732,6 +3122,9 @@ async def fix_my_account(email: str):
         
         # Force Admin
         await db.users.update_one({"id": uid}, {"$set": {"role": "admin"}})
+        await revoke_tokens(uid)
+        access_resolver.invalidate_user(uid)
+        await public_responses.invalidate("instructors")
         results.append("Role -> ADMIN")
         
         # Check/Fix instructor
@@ -2889,6 +3282,7 @@ async def get_blog_posts(limit: int = 3):
     try:
         posts = await db.blog_posts.find(
             {"status": "published"},
+            {"_id": 0, "newsletter_html": 0},
             sort=[("published_at", -1)]
         ).limit(limit).to_list(limit)
         return posts
@@ -2903,7 +3297,7 @@ async def generate_newsletter(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    blog = await newsletter.generate_weekly_blog(db)
+    blog = await newsletter.generate_weekly_blog(db, public_responses)
     if blog:
         return {"message": "Blog generated", "title": blog.get("title")}
     return {"message": "Failed to generate blog"}
@@ -2915,15 +3309,74 @@ async def send_newsletter_now(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    result = await newsletter.send_weekly_newsletter(db)
+    result = await newsletter.send_weekly_newsletter(db, mailer)
     return result
 
 
+@api_router.get("/admin/newsletter/runs/{run_id}")
+async def get_newsletter_run(run_id: str, current_user: User = Depends(get_current_user)):
+    """Progress of a newsletter send: status, checkpoint and sent/failed counts (Admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    run = await db.newsletter_runs.find_one({"id": run_id}, {"_id": 0, "cursor": 0})
+    if not run:
+        raise HTTPException(status_code=404, detail="Newsletter run not found")
+    return run
+
+
 # Include router AFTER all routes are defined
 app.include_router(api_router)
 
 
+@app.on_event("startup")
+async def startup_ensure_indexes():
+    try:
+        await db_indexes.ensure_indexes(db)
+    except Exception as e:
+        # Don't block startup if MongoDB is unreachable; queries will still work unindexed
+        logger.error(f"Index bootstrap failed: {e}")
+    
+    try:
+        await course_stats.backfill(db)
+    except Exception as e:
+        logger.error(f"Could not backfill course stats: {e}")
+    
+    try:
+        await course_search.backfill(db)
+    except Exception as e:
+        logger.error(f"Could not backfill course title words: {e}")
+    
+    try:
+        await token_versions.start(db)
+    except Exception as e:
+        logger.error(f"Could not load token versions: {e}")
+    
+    try:
+        await cascade.resume_pending(db)
+    except Exception as e:
+        logger.error(f"Could not resume delete jobs: {e}")
+    
+    try:
+        await newsletter.resume_newsletter_runs(db, mailer)
+    except Exception as e:
+        logger.error(f"Could not resume newsletter runs: {e}")
+    
+    try:
+        certificate_renderer.start()
+        await certificate_renderer.warm()
+    except Exception as e:
+        # Downloads still work; they'll start workers on demand
+        logger.error(f"Could not warm certificate renderer: {e}")
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    token_versions.stop()
+    password_hasher.shutdown()
+    certificate_renderer.shutdown()
+    await stripe_client.aclose()
+    await mailer.aclose()
+    await llm_clients.aclose()
     client.close()
 
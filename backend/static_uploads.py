@@ -0,0 +1,113 @@
+"""
+Static serving for LearnHub uploads
+Upload filenames are fresh uuid4s and files are never rewritten in place, so
+responses are marked immutable for a year and carry a strong ETag. Single
+byte ranges are answered with 206 so PDF viewers can fetch pages on demand.
+"""
+
+from typing import Optional, Tuple
+import hashlib
+import mimetypes
+import os
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 64 * 1024
+
+
+def strong_etag(stat_result: os.stat_result) -> str:
+    """Same value on every worker that sees the same file"""
+    digest = hashlib.md5(f"{stat_result.st_ino}-{stat_result.st_mtime_ns}-{stat_result.st_size}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single `bytes=` range; None if unsatisfiable.
+    Raises ValueError for anything we don't serve partially (multiple ranges, other units)."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError("Unsupported range")
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length <= 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class PartialFileResponse(Response):
+    """206 response streaming bytes [start, end] of a file"""
+
+    def __init__(self, path: str, start: int, end: int, size: int, headers: dict, media_type: str):
+        self.path = path
+        self.start = start
+        self.end = end
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.headers["content-length"] = str(end - start + 1)
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining > 0:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b""})
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles with immutable caching, strong ETags and Range support"""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        etag = strong_etag(stat_result)
+        headers = {"cache-control": IMMUTABLE, "etag": etag, "accept-ranges": "bytes"}
+
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+        size = stat_result.st_size
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        # If-Range with a different validator means the client's copy is stale: send it all
+        if range_header and (not if_range or if_range.strip() == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                byte_range = (0, size - 1) if size else None
+            if byte_range is None:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+            if byte_range != (0, size - 1):
+                return PartialFileResponse(str(full_path), *byte_range, size, headers, media_type)
+
+        return FileResponse(full_path, stat_result=stat_result, headers=headers, media_type=media_type)
@@ -209,12 +209,34 @@ export default function CoursePlayer({ user, logout }) {
 
     const token = localStorage.getItem('token');
     try {
-      const response = await axios.post(`${API}/ai/tutor?course_id=${id}&question=${encodeURIComponent(tutorInput)}`, null, {
-        headers: { Authorization: `Bearer ${token}` }
+      // Server-sent events: render the answer as it is generated
+      const response = await fetch(`${API}/ai/tutor/stream?course_id=${id}&question=${encodeURIComponent(tutorInput)}`, {
+        method: 'POST',
+        headers: { Authorization: `Bearer ${token}`, Accept: 'text/event-stream' }
       });
-
-      const aiMessage = { role: 'assistant', content: response.data.response };
-      setTutorMessages([...tutorMessages, userMessage, aiMessage]);
+      if (!response.ok) throw new Error(`AI tutor returned ${response.status}`);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let answer = '';
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const event of events) {
+          const lines = event.split('\n');
+          const type = lines.find((line) => line.startsWith('event: '))?.slice(7);
+          const data = JSON.parse(lines.find((line) => line.startsWith('data: '))?.slice(6) || '{}');
+          if (type === 'error') throw new Error(data.detail);
+          if (data.delta) {
+            answer += data.delta;
+            setTutorMessages([...tutorMessages, userMessage, { role: 'assistant', content: answer }]);
+          }
+        }
+      }
     } catch (error) {
       toast.error('Failed to get AI response');
       console.error(error);
@@ -561,7 +583,7 @@ export default function CoursePlayer({ user, logout }) {
                       {msg.content}
                     </div>
                   ))}
-                  {tutorLoading && (
+                  {tutorLoading && tutorMessages[tutorMessages.length - 1]?.role !== 'assistant' && (
                     <div className="message assistant loading">
                       Thinking...
                     </div>
@@ -42,9 +42,12 @@ export default function ProfilePage({ user, logout }) {
     setLoading(true);
     const token = localStorage.getItem('token');
     try {
-      await axios.patch(`${API}/users/profile`, profileData, {
+      const response = await axios.patch(`${API}/users/profile`, profileData, {
         headers: { Authorization: `Bearer ${token}` }
       });
+      if (response.data.token) {
+        localStorage.setItem('token', response.data.token);
+      }
 
       // Update local storage user data
       const updatedUser = { ...user, ...profileData };
@@ -68,12 +71,16 @@ export default function ProfilePage({ user, logout }) {
     setLoading(true);
     const token = localStorage.getItem('token');
     try {
-      await axios.patch(`${API}/users/profile/password`, {
+      const response = await axios.patch(`${API}/users/profile/password`, {
         old_password: passwordData.old_password,
         new_password: passwordData.new_password
       }, {
         headers: { Authorization: `Bearer ${token}` }
       });
+      // Other sessions are signed out; keep this one on the re-issued token
+      if (response.data.token) {
+        localStorage.setItem('token', response.data.token);
+      }
       toast.success('Password updated successfully!');
       setPasswordData({ old_password: '', new_password: '', confirm_password: '' });
     } catch (error) {
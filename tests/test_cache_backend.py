@@ -0,0 +1,129 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from cache_backend import CacheNamespace, MemoryBackend, RedisBackend
+
+
+def redis_backend(server=None) -> RedisBackend:
+    return RedisBackend(fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer()))
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    return MemoryBackend() if request.param == "memory" else redis_backend()
+
+
+def test_set_get_delete(backend):
+    async def scenario():
+        await backend.set("course:1", {"title": "Python"}, ttl=60)
+        assert await backend.get("course:1") == {"title": "Python"}
+        await backend.delete("course:1")
+        assert await backend.get("course:1") is None
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_after_ttl(backend):
+    async def scenario():
+        await backend.set("short", 1, ttl=0.05)
+        await backend.set("long", 2, ttl=60)
+        await asyncio.sleep(0.15)
+        assert await backend.get("short") is None
+        assert await backend.get("long") == 2
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_tags_drops_only_tagged_entries(backend):
+    async def scenario():
+        await backend.set("a", 1, ttl=60, tags=["courses"])
+        await backend.set("b", 2, ttl=60, tags=["courses", "blog"])
+        await backend.set("c", 3, ttl=60, tags=["blog"])
+
+        assert await backend.invalidate_tags("courses") == 2
+        assert await backend.get("a") is None
+        assert await backend.get("b") is None
+        assert await backend.get("c") == 3
+        assert await backend.invalidate_tags("courses") == 0
+
+    asyncio.run(scenario())
+
+
+def test_get_or_load_runs_loader_once_for_concurrent_misses(backend):
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"total": 42}
+
+    async def scenario():
+        results = await asyncio.gather(*(backend.get_or_load("stats", loader, ttl=60) for _ in range(10)))
+        assert results == [{"total": 42}] * 10
+        assert await backend.get_or_load("stats", loader, ttl=60) == {"total": 42}
+
+    asyncio.run(scenario())
+    assert calls == 1
+
+
+def test_get_or_load_does_not_cache_none(backend):
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return None
+
+    async def scenario():
+        assert await backend.get_or_load("missing", loader, ttl=60) is None
+        assert await backend.get_or_load("missing", loader, ttl=60) is None
+
+    asyncio.run(scenario())
+    assert calls == 2
+
+
+def test_redis_single_flight_across_workers():
+    # Two backends on one server stand in for two uvicorn workers
+    server = fakeredis.FakeServer()
+    workers = [redis_backend(server), redis_backend(server)]
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return ["course-1", "course-2"]
+
+    async def scenario():
+        return await asyncio.gather(*(w.get_or_load("popular", loader, ttl=60) for w in workers))
+
+    assert asyncio.run(scenario()) == [["course-1", "course-2"]] * 2
+    assert calls == 1
+
+
+def test_namespace_invalidate_and_clear(backend):
+    responses = CacheNamespace(backend, "test_responses", ttl=60)
+
+    async def scenario():
+        await responses.set("courses?page=1", [1], tags=["courses"])
+        await responses.set("blog?page=1", [2], tags=["blog"])
+
+        await responses.invalidate("courses")
+        assert await responses.get("courses?page=1") is None
+        assert await responses.get("blog?page=1") == [2]
+
+        await responses.clear()
+        assert await responses.get("blog?page=1") is None
+
+    asyncio.run(scenario())
+    assert responses.stats()["hits"] == 1
+    assert responses.stats()["invalidations"] == 2
@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+# server.py mounts ./uploads, so import it from backend/ as uvicorn would
+_cwd = os.getcwd()
+os.chdir(BACKEND)
+try:
+    import server
+    from server import COURSE_CARD_PROJECTION, Course, CourseCard
+finally:
+    os.chdir(_cwd)
+
+HEAVY_FIELDS = ("faqs", "requirements", "outcomes", "meta_keywords", "meta_description")
+
+
+def full_course() -> dict:
+    course = Course(
+        instructor_id="instructor-1",
+        title="Master Python in 30 Days",
+        description="From variables to web apps, one project at a time.",
+        category="Programming",
+        price=49.0,
+        thumbnail="https://cdn.example.com/python.png",
+        requirements=[f"Requirement {i}: a computer with internet access" for i in range(8)],
+        outcomes=[f"Outcome {i}: build and deploy a real Python project" for i in range(12)],
+        faqs=[{"question": f"Question {i}?", "answer": "A detailed answer. " * 20} for i in range(10)],
+        meta_keywords="python, programming, beginners, web development",
+        meta_description="Learn Python from scratch with hands-on projects. " * 3,
+    ).model_dump(mode="json")
+    course["course_stats"] = server.course_stats.empty_stats()
+    return course
+
+
+def project(document: dict, projection: dict) -> dict:
+    """Apply an inclusion projection the way MongoDB would"""
+    return {field: value for field, value in document.items() if projection.get(field)}
+
+
+def test_projection_excludes_heavy_fields():
+    for field in HEAVY_FIELDS:
+        assert field not in COURSE_CARD_PROJECTION
+        assert field not in CourseCard.model_fields
+    assert COURSE_CARD_PROJECTION["_id"] == 0
+
+
+def test_card_payload_is_smaller_than_full_course():
+    document = full_course()
+    card = CourseCard(**project(document, COURSE_CARD_PROJECTION)).model_dump(mode="json")
+
+    assert not set(HEAVY_FIELDS) & set(card)
+    assert len(json.dumps(card)) < len(json.dumps(document)) / 2